@@ -0,0 +1,270 @@
+# arrivals.py - Mode muat online: antrian kedatangan, heuristik lookahead dan latensi keputusan
+import csv
+import io
+import json
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from clearance import clearance_margins
+from decks import pack_deck
+from placement import GridPlacer, LanePacker
+
+# Jumlah kendaraan antrian yang boleh "diintip" saat memutuskan kendaraan terdepan
+DEFAULT_LOOKAHEAD = 3
+
+# Anggaran waktu keputusan per kendaraan (milidetik)
+DEFAULT_BUDGET_MS = 5.0
+
+# Jumlah kandidat posisi bottom-left yang dinilai per kendaraan (mode grid)
+MAX_CANDIDATES = 24
+
+# Jumlah footprint terakhir yang peta titik layaknya disimpan selain milik antrian (mode grid)
+MAX_WINDOWS = 8
+
+
+# Fungsi untuk normalisasi satu kedatangan
+def _arrival(record):
+    return {
+        'name': str(record.get('name') or record.get('type') or "Kendaraan"),
+        'type': str(record.get('type') or 'custom'),
+        'length': float(record['length']),
+        'width': float(record['width']),
+        'weight': float(record['weight']) if record.get('weight') not in (None, '') else None,
+        'port': int(record.get('port') or 1)
+    }
+
+# Fungsi untuk membaca antrian kedatangan dari teks file (CSV, JSON atau JSON Lines)
+def parse_arrivals(text):
+    """
+    CSV memakai header name,type,length,width[,weight,port]. JSON boleh
+    berupa array objek atau satu objek per baris.
+    """
+    stripped = text.strip()
+    if not stripped:
+        return []
+    if stripped.startswith('['):
+        return [_arrival(record) for record in json.loads(stripped)]
+    if stripped.startswith('{'):
+        return [_arrival(json.loads(line)) for line in stripped.splitlines() if line.strip()]
+    return [_arrival(record) for record in csv.DictReader(io.StringIO(stripped))]
+
+# Fungsi untuk membaca kedatangan dari socket lokal (satu objek JSON per baris)
+def iter_socket_arrivals(host, port, timeout=5.0):
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        for line in connection.makefile('r', encoding='utf-8'):
+            if line.strip():
+                yield _arrival(json.loads(line))
+
+# Fungsi untuk server pengganti gerbang terminal: memutar ulang kedatangan lewat socket lokal
+def start_replay_server(arrivals, host='127.0.0.1', port=0, interval=0.0):
+    """
+    Melayani satu koneksi di thread latar belakang lalu berhenti.
+    interval: jeda antar kedatangan (detik). Mengembalikan (host, port).
+    """
+    server = socket.create_server((host, port))
+
+    def serve():
+        with server:
+            connection, _ = server.accept()
+            with connection:
+                for arrival in arrivals:
+                    connection.sendall((json.dumps(arrival) + "\n").encode('utf-8'))
+                    if interval:
+                        time.sleep(interval)
+
+    threading.Thread(target=serve, name="arrival-replay", daemon=True).start()
+    return server.getsockname()[:2]
+
+
+class OnlineLoader:
+    """
+    Memuat kendaraan satu per satu sesuai urutan kedatangan. Kendaraan
+    terdepan diputuskan begitu antrian berisi lebih dari `lookahead`
+    kendaraan, dengan melihat footprint kendaraan yang menunggu di belakangnya.
+
+    Mode grid: kandidat bottom-left dinilai berdasarkan jumlah titik layak
+    yang hilang bagi kendaraan lookahead. Penilaian berhenti saat anggaran
+    waktu habis dan kandidat terbaik sejauh ini dipakai. Anggaran bukan
+    jaminan: pencarian kandidat pertama dan pembaruan raster tetap
+    dikerjakan, dan keputusan yang melewatinya dilaporkan di over_budget.
+    Pencarian kandidat memindai pita baris terbatas (contact_positions) dan
+    raster GridPlacer dibatasi MAX_RASTER_CELLS, sehingga biaya per keputusan
+    tidak tumbuh dengan luas dek. Peta titik layak untuk footprint baru
+    dihitung saat kendaraan masuk antrian; hanya peta milik antrian dan
+    MAX_WINDOWS footprint terakhir yang disimpan.
+
+    Mode lajur: best-fit LanePacker, tetapi lajur yang sisanya menjadi terlalu
+    pendek untuk kendaraan lookahead dihindari bila ada pilihan lain.
+    """
+
+    def __init__(self, ship_layout, existing_vehicles=(), mode='grid', grid_step=1.0,
+                 lookahead=DEFAULT_LOOKAHEAD, budget_ms=DEFAULT_BUDGET_MS, max_candidates=MAX_CANDIDATES):
+        self.ship_layout = ship_layout
+        self.existing = list(existing_vehicles)
+        self.mode = mode
+        self.grid_step = grid_step
+        self.lookahead = max(0, int(lookahead))
+        self.budget = budget_ms / 1000.0
+        self.max_candidates = max(1, int(max_candidates))
+
+        if mode == 'lane':
+            self.packer = LanePacker.from_vehicles(ship_layout, self.existing, grid_step)
+        else:
+            self.packer = GridPlacer.from_vehicles(ship_layout, self.existing, grid_step)
+
+        self.queue = deque()
+        self._recent = {}  # footprint terakhir (urut masuk) yang peta titik layaknya disimpan
+        self.placed = []
+        self.rejected = []
+        self.latencies = []  # milidetik per keputusan
+
+    def push(self, vehicle):
+        """Menambah kedatangan; mengembalikan keputusan [(kendaraan, ditempatkan)] yang sudah bisa diambil"""
+        self.queue.append(vehicle)
+        if self.mode != 'lane':
+            footprint = self.packer.footprint(vehicle)
+            self._recent.pop(footprint, None)
+            self._recent[footprint] = None
+            if len(self._recent) > MAX_WINDOWS:
+                del self._recent[next(iter(self._recent))]
+            self.packer.retain(list(self._recent) + [self.packer.footprint(other) for other in self.queue])
+            self.packer.prepare(footprint)
+        decisions = []
+        while len(self.queue) > self.lookahead:
+            decisions.append(self._decide())
+        return decisions
+
+    def flush(self):
+        """Memutuskan sisa antrian (akhir arus kedatangan)"""
+        decisions = []
+        while self.queue:
+            decisions.append(self._decide())
+        return decisions
+
+    def _decide(self):
+        vehicle = self.queue.popleft()
+        start = time.perf_counter()
+        if self.mode == 'lane':
+            placed = self._place_lane(vehicle)
+        else:
+            placed = self._place_grid(vehicle, start + self.budget)
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        (self.placed if placed else self.rejected).append(vehicle)
+        return vehicle, placed
+
+    def _place_lane(self, vehicle):
+        clearances = self.packer.clearances
+        upcoming = []
+        for other in self.queue:
+            _, dy = clearance_margins(other, clearances)
+            if other['width'] <= self.packer.lane_width:
+                # Paling sedikit panjang + jarak bebas belakang di belakang zona kendaraan sebelumnya
+                upcoming.append(other['length'] + dy)
+        if upcoming:
+            shortest = min(upcoming)
+            _, dy = clearance_margins(vehicle, clearances)
+            # Hindari sisa lajur yang tidak bisa dipakai kendaraan berikutnya
+            tail = lambda candidate: self.packer.deck_length - candidate['y'] - candidate['length'] - dy
+            keeps_room = lambda candidate: tail(candidate) < 1e-9 or tail(candidate) >= shortest
+            if self.packer.place(vehicle, keeps_room):
+                return True
+        return self.packer.place(vehicle)
+
+    def _place_grid(self, vehicle, deadline):
+        footprint = self.packer.footprint(vehicle)
+        rows, cols = self.packer.contact_positions(footprint, self.max_candidates)
+        if len(rows) == 0:
+            return False
+
+        footprints = [self.packer.footprint(other) for other in self.queue]
+        best, best_lost = 0, None
+        if footprints:
+            for index in range(len(rows)):
+                if best_lost is not None and time.perf_counter() >= deadline:
+                    break
+                lost = self.packer.windows_lost(rows[index], cols[index], footprint, footprints)
+                if best_lost is None or lost < best_lost:
+                    best, best_lost = index, lost
+        self.packer.place_at(vehicle, rows[best], cols[best])
+        return True
+
+    def latency_percentiles(self):
+        if not self.latencies:
+            return {}
+        values = np.percentile(self.latencies, (50, 95, 99))
+        return {'p50': float(values[0]), 'p95': float(values[1]), 'p99': float(values[2]),
+                'max': float(max(self.latencies))}
+
+    def report(self, arrivals=None, compare_offline=False):
+        """
+        Ringkasan pemuatan online. Jika arrivals diberikan, dibandingkan dengan
+        batas atas luas, yang juga merupakan batas atas optimum sebenarnya.
+        compare_offline=True juga menghitung referensi offline (seluruh
+        manifest diketahui sebelumnya); ini mem-packing ulang seluruh
+        kedatangan sehingga hanya dijalankan jika diminta.
+        """
+        deck_area = self.ship_layout['length'] * self.ship_layout['width']
+        existing_area = sum(v['length'] * v['width'] for v in self.existing)
+        online_area = sum(v['length'] * v['width'] for v in self.placed)
+        report = {
+            'placed': len(self.placed),
+            'rejected': len(self.rejected),
+            'utilization': (existing_area + online_area) / deck_area * 100 if deck_area > 0 else 0,
+            'latency': self.latency_percentiles(),
+            'over_budget': sum(latency > self.budget * 1000 for latency in self.latencies)
+        }
+
+        if arrivals is not None:
+            arrival_area = sum(v['length'] * v['width'] for v in arrivals)
+            report['area_bound_utilization'] = min(deck_area, existing_area + arrival_area) / deck_area * 100 \
+                if deck_area > 0 else 0
+            if compare_offline:
+                offline_placed = offline_reference(self.ship_layout, self.existing, arrivals,
+                                                   self.mode, self.grid_step)
+                offline_area = sum(v['length'] * v['width'] for v in offline_placed)
+                report['offline_placed'] = len(offline_placed)
+                report['offline_utilization'] = (existing_area + offline_area) / deck_area * 100 \
+                    if deck_area > 0 else 0
+                report['online_vs_offline'] = online_area / offline_area * 100 if offline_area > 0 else 100.0
+        return report
+
+
+# Fungsi untuk referensi offline: hasil terbaik jika seluruh manifest diketahui sebelumnya
+def offline_reference(ship_layout, existing_vehicles, arrivals, mode='grid', grid_step=1.0):
+    """
+    Optimum sebenarnya NP-hard; sebagai gantinya dipakai hasil terbaik dari
+    packing decreasing (terbesar dulu) dengan mesin penempatan yang sama:
+    pack_deck dan, untuk mode grid, bottom-left decreasing.
+    """
+    offline = [dict(arrival, id=-1 - index, x=0.0, y=0.0) for index, arrival in enumerate(arrivals)]
+    best, _ = pack_deck(ship_layout, existing_vehicles, [dict(v) for v in offline], mode, grid_step)
+    if mode != 'lane':
+        loader = OnlineLoader(ship_layout, existing_vehicles, mode, grid_step, lookahead=0, budget_ms=float('inf'))
+        for vehicle in sorted(offline, key=lambda v: v['length'] * v['width'], reverse=True):
+            loader.push(vehicle)
+        if sum(v['length'] * v['width'] for v in loader.placed) > sum(v['length'] * v['width'] for v in best):
+            best = loader.placed
+    return best
+
+# Fungsi untuk menjalankan seluruh arus kedatangan
+def run_stream(arrivals, loader, on_decision=None):
+    """
+    Mengonsumsi iterable kedatangan (list dari file atau generator socket).
+    on_decision(kendaraan, ditempatkan) dipanggil untuk setiap keputusan.
+    Mengembalikan daftar kedatangan yang sudah dikonsumsi.
+    """
+    consumed = []
+    for index, arrival in enumerate(arrivals):
+        vehicle = dict(arrival, id=arrival.get('id', -1 - index), x=0.0, y=0.0)
+        consumed.append(arrival)
+        for decided, placed in loader.push(vehicle):
+            if on_decision:
+                on_decision(decided, placed)
+    for decided, placed in loader.flush():
+        if on_decision:
+            on_decision(decided, placed)
+    return consumed
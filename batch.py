@@ -0,0 +1,131 @@
+# batch.py - Operasi massal: pilih banyak kendaraan dan validasi kelompok sekaligus
+import numpy as np
+
+from clearance import clearance_margins
+from decks import pack_deck
+from occupancy import SparseOccupancy
+
+# Batas elemen matriks tumpang-tindih per potongan (baris kelompok × kendaraan lain)
+OVERLAP_CHUNK_CELLS = 4_000_000
+
+# Toleransi agar kendaraan yang tepat bersentuhan (galat float) tidak dianggap bertumpuk
+TOUCH_TOLERANCE = 1e-6
+
+
+# Fungsi untuk array footprint kendaraan (x0, y0, x1, y1): badan, atau zona bebas jika clearances diberikan
+def footprint_arrays(vehicles, clearances=None):
+    boxes = np.array([(v['x'], v['y'], v['width'], v['length']) for v in vehicles], dtype=float).reshape(-1, 4)
+    margins = np.array([clearance_margins(v, clearances) for v in vehicles], dtype=float).reshape(-1, 2)
+    x0 = boxes[:, 0] - margins[:, 0]
+    y0 = boxes[:, 1] - margins[:, 1]
+    return np.column_stack([x0, y0, x0 + boxes[:, 2] + 2 * margins[:, 0], y0 + boxes[:, 3] + 2 * margins[:, 1]])
+
+# Fungsi untuk baris yang melanggar aturan clearance.too_close terhadap salah satu baris b
+def _too_close_rows(bodies, zones, other_bodies, other_zones, exclude_diagonal=False, clearances=None):
+    hits = _overlapping_rows(zones, other_bodies, exclude_diagonal)
+    if clearances:
+        hits |= _overlapping_rows(bodies, other_zones, exclude_diagonal)
+    return hits
+
+# Fungsi untuk baris footprint yang keluar batas dek
+def _outside(boxes, ship_layout):
+    return ((boxes[:, 0] < -1e-9) | (boxes[:, 1] < -1e-9) |
+            (boxes[:, 2] > ship_layout['width'] + 1e-9) | (boxes[:, 3] > ship_layout['length'] + 1e-9))
+
+# Fungsi untuk mask kendaraan yang keluar batas kapal (satu perbandingan NumPy)
+def out_of_bounds(vehicles, ship_layout):
+    return _outside(footprint_arrays(vehicles, ship_layout.get('clearances')), ship_layout)
+
+# Fungsi untuk memilih kendaraan berdasarkan tipe
+def select_by_types(vehicles, types):
+    types = set(types)
+    return [v['id'] for v in vehicles if v.get('type') in types]
+
+# Fungsi untuk memilih kendaraan di dalam area persegi (x0, y0) - (x1, y1)
+def select_in_region(vehicles, x0, y0, x1, y1, fully_inside=True):
+    """fully_inside=False: cukup beririsan dengan area"""
+    if not vehicles:
+        return []
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    boxes = footprint_arrays(vehicles)
+    if fully_inside:
+        mask = (boxes[:, 0] >= x0) & (boxes[:, 2] <= x1) & (boxes[:, 1] >= y0) & (boxes[:, 3] <= y1)
+    else:
+        mask = (boxes[:, 0] < x1) & (boxes[:, 2] > x0) & (boxes[:, 1] < y1) & (boxes[:, 3] > y0)
+    return [vehicles[i]['id'] for i in np.flatnonzero(mask)]
+
+# Fungsi untuk baris a yang bertumpuk dengan salah satu baris b (dipotong per blok agar memori terbatas)
+def _overlapping_rows(a, b, exclude_diagonal=False):
+    hits = np.zeros(len(a), dtype=bool)
+    if len(a) == 0 or len(b) == 0:
+        return hits
+    step = max(1, OVERLAP_CHUNK_CELLS // len(b))
+    for start in range(0, len(a), step):
+        block = a[start:start + step]
+        overlap = ((block[:, None, 0] < b[None, :, 2] - TOUCH_TOLERANCE) &
+                   (b[None, :, 0] < block[:, None, 2] - TOUCH_TOLERANCE) &
+                   (block[:, None, 1] < b[None, :, 3] - TOUCH_TOLERANCE) &
+                   (b[None, :, 1] < block[:, None, 3] - TOUCH_TOLERANCE))
+        if exclude_diagonal:
+            rows = np.arange(len(block))
+            overlap[rows, start + rows] = False
+        hits[start:start + step] = overlap.any(axis=1)
+    return hits
+
+# Fungsi untuk validasi kelompok kendaraan (posisi/ukuran baru) dalam satu pemeriksaan tervektorisasi
+def batch_conflicts(group, others, ship_layout, grid_step=1.0, index=None):
+    """
+    Id kendaraan kelompok yang keluar batas kapal, menimpa rintangan, atau
+    bertumpuk / kurang jarak bebas dengan kendaraan lain maupun sesama
+    kelompok. others: kendaraan di luar kelompok (posisi tetap).
+    index: SparseOccupancy dek (opsional, hanya dipakai untuk cek rintangan).
+    """
+    if not group:
+        return set()
+    clearances = ship_layout.get('clearances')
+    bodies = footprint_arrays(group)
+    boxes = footprint_arrays(group, clearances)
+
+    invalid = _outside(boxes, ship_layout)
+
+    # Hanya kendaraan lain yang zonanya menyentuh kotak pembatas zona kelompok yang perlu dibandingkan
+    if others:
+        other_bodies = footprint_arrays(others)
+        other_boxes = footprint_arrays(others, clearances)
+        near = ((other_boxes[:, 0] < boxes[:, 2].max()) & (other_boxes[:, 2] > boxes[:, 0].min()) &
+                (other_boxes[:, 1] < boxes[:, 3].max()) & (other_boxes[:, 3] > boxes[:, 1].min()))
+        invalid |= _too_close_rows(bodies, boxes, other_bodies[near], other_boxes[near], clearances=clearances)
+    invalid |= _too_close_rows(bodies, boxes, bodies, boxes, exclude_diagonal=True, clearances=clearances)
+
+    if ship_layout.get('obstacles'):
+        if index is None:
+            index = SparseOccupancy.from_vehicles(ship_layout, [], grid_step)
+        for i, (x0, y0, x1, y1) in enumerate(boxes):
+            if not invalid[i] and index.hits_obstacle(x0 + TOUCH_TOLERANCE, y0 + TOUCH_TOLERANCE,
+                                                      x1 - x0 - 2 * TOUCH_TOLERANCE,
+                                                      y1 - y0 - 2 * TOUCH_TOLERANCE):
+                invalid[i] = True
+    return {group[i]['id'] for i in np.flatnonzero(invalid)}
+
+# Fungsi untuk salinan kelompok yang digeser (dx, dy) meter
+def translated(group, dx, dy):
+    return [dict(v, x=v['x'] + dx, y=v['y'] + dy) for v in group]
+
+# Fungsi untuk rencana penyesuaian armada setelah ukuran dek berubah
+def plan_resize(ship_layout, vehicles, mode='grid', grid_step=1.0, seed=0):
+    """
+    Kendaraan yang keluar batas dek baru dicari sekaligus, lalu ditempatkan
+    ulang dalam satu pass pengepakan di sekitar kendaraan yang tetap; dek
+    yang terlalu besar untuk raster penuh memakai jalur sparse pack_deck.
+    Armada tidak diubah. Mengembalikan (dipindah: salinan dengan posisi baru,
+    id yang tidak muat).
+    """
+    outside = out_of_bounds(vehicles, ship_layout)
+    if not outside.any():
+        # Tidak ada yang perlu dipindah: packer tidak perlu dibangun sama sekali
+        return [], []
+    kept = [v for v, out in zip(vehicles, outside) if not out]
+    displaced = [dict(v) for v, out in zip(vehicles, outside) if out]
+    placed, rejected = pack_deck(ship_layout, kept, displaced, mode, grid_step, seed)
+    return placed, [v['id'] for v in rejected]
@@ -0,0 +1,167 @@
+# booking.py - Simulasi Monte Carlo booking: berapa kendaraan yang muat jika campuran kedatangan tidak pasti
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from clearance import clearance_margins
+from placement import GridPlacer, LanePacker
+
+# Jumlah pelayaran simulasi per tugas di process pool (mengurangi overhead antar proses)
+CHUNK_SIZE = 100
+
+# Di bawah jumlah simulasi ini, semua dijalankan di proses utama
+PARALLEL_MIN_SIMULATIONS = 400
+
+
+# Fungsi untuk spesifikasi booking satu tipe kendaraan
+def booking_spec(vehicle_type, booked, show_rate, length, width, length_sd=0.0):
+    """
+    booked: jumlah booking yang diterima
+    show_rate: peluang setiap booking benar-benar datang (0–1)
+    length_sd: simpangan baku panjang kendaraan (meter) di sekitar panjang rata-rata
+    """
+    return {
+        'type': vehicle_type,
+        'booked': int(booked),
+        'show_rate': float(show_rate),
+        'length': float(length),
+        'width': float(width),
+        'length_sd': float(length_sd)
+    }
+
+# Fungsi untuk sampling semua manifest sekaligus (tervektorisasi)
+def sample_manifests(specs, simulations, seed=0):
+    """
+    Setiap baris adalah satu pelayaran: slot booking diacak urutan
+    kedatangannya, lalu ditandai datang/tidak dan diberi panjang acak.
+    Mengembalikan (tipe, panjang, lebar, datang), masing-masing berbentuk
+    (simulasi, total_booking) dalam urutan kedatangan.
+    """
+    rng = np.random.default_rng(seed)
+    slot_type = np.repeat(np.arange(len(specs)), [spec['booked'] for spec in specs])
+    slots = len(slot_type)
+
+    show_rate = np.array([spec['show_rate'] for spec in specs])[slot_type]
+    mean_length = np.array([spec['length'] for spec in specs])[slot_type]
+    length_sd = np.array([spec['length_sd'] for spec in specs])[slot_type]
+    width = np.array([spec['width'] for spec in specs])[slot_type]
+
+    # Urutan kedatangan acak per pelayaran
+    order = np.argsort(rng.random((simulations, slots)), axis=1)
+    types = slot_type[order]
+
+    shows = rng.random((simulations, slots)) < show_rate[order]
+    lengths = mean_length[order] + rng.standard_normal((simulations, slots)) * length_sd[order]
+    lengths = np.round(np.clip(lengths, 0.5 * mean_length[order], None), 1)
+    widths = np.broadcast_to(width[order], (simulations, slots)) if slots else width[order]
+    return types, lengths, np.array(widths), shows
+
+# Fungsi untuk mensimulasikan sekelompok pelayaran (dijalankan di proses terpisah)
+def simulate_chunk(layout, existing_vehicles, mode, grid_step, type_names, types, lengths, widths, shows, seed):
+    """
+    Memuat setiap manifest sesuai urutan kedatangan, satu per satu seperti
+    add_vehicle: mode lajur memakai LanePacker.place, mode grid memakai
+    GridPlacer. Mengembalikan (datang, muat) per pelayaran per tipe.
+    """
+    type_count = len(type_names)
+    clearances = layout.get('clearances')
+    simulations = types.shape[0]
+    arrived = np.zeros((simulations, type_count), dtype=np.int32)
+    fitted = np.zeros((simulations, type_count), dtype=np.int32)
+    rng = random.Random(seed)
+
+    if mode == 'lane':
+        base = LanePacker.from_vehicles(layout, existing_vehicles, grid_step)
+    else:
+        base = GridPlacer.from_vehicles(layout, existing_vehicles, grid_step)
+
+    for sim in range(simulations):
+        packer = base.copy()
+
+        # Ukuran dan jarak bebas yang sudah gagal: kendaraan yang tidak lebih kecil di semua itu pasti gagal juga
+        failed = []
+        for slot in np.flatnonzero(shows[sim]):
+            vehicle_type = types[sim, slot]
+            arrived[sim, vehicle_type] += 1
+            vehicle = {'id': -1 - int(slot), 'type': type_names[vehicle_type], 'length': float(lengths[sim, slot]),
+                       'width': float(widths[sim, slot]), 'x': 0.0, 'y': 0.0}
+            footprint = (vehicle['length'], vehicle['width']) + clearance_margins(vehicle, clearances)
+            if any(all(size >= other for size, other in zip(footprint, smaller)) for smaller in failed):
+                continue
+            if mode == 'lane':
+                placed = packer.place(vehicle)
+            else:
+                placed = packer.place(vehicle, rng)
+            if placed:
+                fitted[sim, vehicle_type] += 1
+            else:
+                failed.append(footprint)
+    return arrived, fitted
+
+# Fungsi untuk menjalankan simulasi booking lengkap
+def simulate_bookings(layout, specs, simulations=1000, existing_vehicles=(), mode='grid', grid_step=1.0,
+                      seed=0, max_workers=None):
+    """
+    Mengambil sampel manifest secara tervektorisasi lalu memuat setiap
+    pelayaran di process pool (per kelompok CHUNK_SIZE). Mengembalikan
+    array datang/muat berbentuk (simulasi, tipe); ringkasannya lewat summarize().
+    """
+    types, lengths, widths, shows = sample_manifests(specs, simulations, seed)
+    existing_vehicles = list(existing_vehicles)
+    chunks = [(start, min(start + CHUNK_SIZE, simulations)) for start in range(0, simulations, CHUNK_SIZE)]
+    jobs = [(layout, existing_vehicles, mode, grid_step, [spec['type'] for spec in specs],
+             types[start:end], lengths[start:end], widths[start:end], shows[start:end], seed * 1_000_003 + start)
+            for start, end in chunks]
+
+    workers = max_workers or os.cpu_count() or 1
+    if simulations >= PARALLEL_MIN_SIMULATIONS and workers > 1:
+        # Spawn: aman dipanggil dari server Streamlit yang multi-thread
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(simulate_chunk, *zip(*jobs)))
+    else:
+        results = [simulate_chunk(*job) for job in jobs]
+
+    if not results:
+        empty = np.zeros((0, len(specs)), dtype=np.int32)
+        return empty, empty
+    arrived = np.concatenate([result[0] for result in results])
+    fitted = np.concatenate([result[1] for result in results])
+    return arrived, fitted
+
+# Fungsi untuk ringkasan distribusi dan risiko overbooking
+def summarize(specs, arrived, fitted):
+    """
+    Risiko overbooking = peluang setidaknya satu kendaraan yang datang
+    tidak mendapat tempat.
+    """
+    denied = arrived - fitted
+    total_fitted = fitted.sum(axis=1)
+    total_denied = denied.sum(axis=1)
+    simulations = len(total_fitted)
+    if simulations == 0:
+        return {'simulations': 0, 'overbooking_risk': 0.0, 'fitted_total': total_fitted, 'per_type': [],
+                'fitted_percentiles': {}, 'denied_percentiles': {}}
+
+    percentiles = (5, 50, 95)
+    per_type = []
+    for index, spec in enumerate(specs):
+        per_type.append({
+            'type': spec['type'],
+            'booked': spec['booked'],
+            'arrived_mean': float(arrived[:, index].mean()),
+            'fitted_mean': float(fitted[:, index].mean()),
+            'denied_mean': float(denied[:, index].mean()),
+            'denied_risk': float((denied[:, index] > 0).mean())
+        })
+
+    return {
+        'simulations': simulations,
+        'overbooking_risk': float((total_denied > 0).mean()),
+        'fitted_total': total_fitted,
+        'fitted_percentiles': dict(zip(percentiles, np.percentile(total_fitted, percentiles).tolist())),
+        'denied_percentiles': dict(zip(percentiles, np.percentile(total_denied, percentiles).tolist())),
+        'per_type': per_type
+    }
@@ -0,0 +1,262 @@
+# capacity.py - Estimasi "berapa lagi yang muat" per tipe kendaraan
+import math
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from clearance import body, inflate
+from obstacles import obstacle_mask
+
+# Batas jumlah sel raster agar simulasi tetap ringan untuk kapal sangat besar
+MAX_RASTER_CELLS = 250_000
+
+
+# Fungsi untuk batas atas instan berdasarkan luas bebas
+def area_upper_bound(free_area, length, width):
+    footprint = length * width
+    if footprint <= 0:
+        return 0
+    return max(0, int(free_area // footprint))
+
+# Fungsi untuk batas atas mode lajur (eksak untuk kendaraan berukuran sama tanpa tetangga samping)
+def lane_upper_bound(lane_packer, length, width, margins=(0.0, 0.0)):
+    """margins: jarak bebas (samping, depan/belakang) tipe ini"""
+    dx, dy = margins
+    if width > lane_packer.lane_width or length <= 0:
+        return 0
+    total = 0
+    for lane, front in enumerate(lane_packer.frontier):
+        # Kendaraan di tengah lajur; tepi dek samping butuh jarak bebas penuh
+        x = lane * lane_packer.lane_width + (lane_packer.lane_width - width) / 2
+        if x < dx - 1e-9 or x + width > lane_packer.deck_width - dx + 1e-9:
+            continue
+        # Ruas bebas di antara rintangan lajur, sampai ujung dek (start: y badan pertama)
+        start = max(lane_packer.rear[lane] + dy, front)
+        for block_start, block_end in lane_packer.blocked[lane] + [(lane_packer.deck_length,) * 2]:
+            if block_end <= start - dy:
+                continue
+            total += int(max(0.0, block_start - start) // (length + dy))
+            start = max(start, block_end + dy)
+    return total
+
+# Fungsi untuk memperluas mask sejauh (baris, kolom) sel ke setiap arah
+def _dilate(mask, rows, cols):
+    if rows == 0 and cols == 0:
+        return mask
+    padded = np.pad(mask, ((rows, rows), (cols, cols)))
+    integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.int64)
+    integral[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+    h, w = 2 * rows + 1, 2 * cols + 1
+    return (integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]) > 0
+
+
+class CapacityEstimator:
+    """
+    Estimasi kapasitas tersisa per tipe kendaraan di atas raster okupansi dek.
+
+    Untuk setiap tipe disimpan penempatan "bayangan" (ghost) yang layak
+    bersama armada nyata. Saat armada berubah, hanya bayangan yang tertabrak
+    kendaraan baru yang dibuang; ruang yang dibebaskan diisi ulang oleh
+    refill() yang boleh dijalankan di thread latar belakang.
+
+    Jarak bebas mengikuti clearance.too_close: raster occupancy memuat badan
+    kendaraan nyata dan rintangan, raster zones memuat zonanya. Badan
+    bayangan harus bebas dari zona nyata dan berjarak sejauh jarak bebas
+    tipenya dari badan lain, rintangan dan tepi dek.
+    """
+
+    def __init__(self, ship_layout, grid_density):
+        self.length = float(ship_layout['length'])
+        self.width = float(ship_layout['width'])
+        self.ship_area = self.length * self.width
+
+        # Resolusi raster: mengikuti grid density, diperkasar untuk kapal besar
+        self.resolution = max(float(grid_density), math.sqrt(self.ship_area / MAX_RASTER_CELLS))
+        self.rows = max(1, int(self.length // self.resolution))
+        self.cols = max(1, int(self.width // self.resolution))
+
+        # Jumlah badan dan zona kendaraan nyata yang menyentuh setiap sel
+        self.occupancy = np.zeros((self.rows, self.cols), dtype=np.uint16)
+        self.zones = np.zeros((self.rows, self.cols), dtype=np.uint16)
+        self.used_area = 0.0
+
+        # Rintangan kapal menempati sel secara permanen
+        static = obstacle_mask(ship_layout.get('obstacles'), self.rows, self.cols, self.resolution)
+        self.occupancy += static
+        self.obstacle_area = float(static.sum()) * self.resolution ** 2
+        self.clearances = ship_layout.get('clearances')
+        self.version = 0
+
+        self._fleet = {}       # id -> (badan, zona)
+        self._ghosts = {}      # key -> {'cells': (h, w, celah_h, celah_w), 'mask': bool array badan, 'slots': set}
+        self._lock = threading.Lock()
+
+    # Fungsi untuk rentang sel yang disentuh kendaraan (konservatif)
+    def _cell_span(self, x, y, width, length):
+        r0 = max(0, int(math.floor(y / self.resolution)))
+        r1 = min(self.rows, int(math.ceil((y + length) / self.resolution - 1e-9)))
+        c0 = max(0, int(math.floor(x / self.resolution)))
+        c1 = min(self.cols, int(math.ceil((x + width) / self.resolution - 1e-9)))
+        return r0, r1, c0, c1
+
+    def _footprint_cells(self, length, width):
+        return (max(1, math.ceil(length / self.resolution - 1e-9)),
+                max(1, math.ceil(width / self.resolution - 1e-9)))
+
+    # Fungsi untuk jarak bebas dalam sel (dibulatkan ke atas)
+    def _gap_cells(self, dx, dy):
+        return max(0, math.ceil(dy / self.resolution - 1e-9)), max(0, math.ceil(dx / self.resolution - 1e-9))
+
+    # Fungsi untuk luas yang "dimiliki" kendaraan: badan plus setengah jarak bebas di setiap sisi
+    @staticmethod
+    def _owned_area(rects):
+        (_, _, body_w, body_l), (_, _, zone_w, zone_l) = rects
+        return (body_w + zone_w) / 2 * (body_l + zone_l) / 2
+
+    def sync(self, vehicles):
+        """
+        Menyamakan status dengan armada saat ini. Hanya kendaraan yang
+        ditambah, dihapus atau dipindah yang diproses.
+        """
+        current = {v['id']: (body(v), inflate(v, self.clearances)) for v in vehicles}
+        if current == self._fleet:
+            return False
+
+        with self._lock:
+            removed = [key for key, rects in self._fleet.items() if current.get(key) != rects]
+            added = [key for key, rects in current.items() if self._fleet.get(key) != rects]
+
+            for key in removed:
+                rects = self._fleet.pop(key)
+                r0, r1, c0, c1 = self._cell_span(*rects[0])
+                self.occupancy[r0:r1, c0:c1] -= 1
+                z0, z1, zc0, zc1 = self._cell_span(*rects[1])
+                self.zones[z0:z1, zc0:zc1] -= 1
+                self.used_area -= self._owned_area(rects)
+
+            for key in added:
+                rects = self._fleet[key] = current[key]
+                r0, r1, c0, c1 = self._cell_span(*rects[0])
+                self.occupancy[r0:r1, c0:c1] += 1
+                z0, z1, zc0, zc1 = self._cell_span(*rects[1])
+                self.zones[z0:z1, zc0:zc1] += 1
+                self.used_area += self._owned_area(rects)
+
+                # Buang bayangan yang badannya masuk zona kendaraan baru atau terlalu dekat dengan badannya
+                for state in self._ghosts.values():
+                    h, w, gap_h, gap_w = state['cells']
+                    top, bottom = min(z0, r0 - gap_h), max(z1, r1 + gap_h)
+                    left, right = min(zc0, c0 - gap_w), max(zc1, c1 + gap_w)
+                    if not state['mask'][max(0, top):bottom, max(0, left):right].any():
+                        continue
+                    for slot in [s for s in state['slots']
+                                 if s[0] < bottom and s[0] + h > top and s[1] < right and s[1] + w > left]:
+                        state['slots'].discard(slot)
+                        state['mask'][slot[0]:slot[0] + h, slot[1]:slot[1] + w] = False
+
+            self.version += 1
+        return True
+
+    @property
+    def free_area(self):
+        return max(0.0, self.ship_area - self.used_area - self.obstacle_area)
+
+    def estimate(self, key):
+        """Jumlah bayangan saat ini untuk tipe ini, atau None jika belum disimulasikan"""
+        state = self._ghosts.get(key)
+        return None if state is None else len(state['slots'])
+
+    def is_current(self, key):
+        state = self._ghosts.get(key)
+        return state is not None and state.get('filled_version') == self.version
+
+    def retain(self, keys):
+        """
+        Membuang bayangan tipe di luar keys (misalnya ukuran kustom lama).
+        Refill yang masih berjalan untuk tipe yang dibuang tidak menyimpan hasilnya.
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in [key for key in self._ghosts if key not in keys]:
+                del self._ghosts[key]
+
+    def memory_bytes(self):
+        """Perkiraan memori raster okupansi dan mask bayangan (byte)"""
+        return self.occupancy.nbytes + self.zones.nbytes + sum(state['mask'].nbytes + 64 * len(state['slots'])
+                                           for state in list(self._ghosts.values()))
+
+    def _blocked(self, state):
+        """Sel yang tidak boleh disentuh badan bayangan baru"""
+        h, w, gap_h, gap_w = state['cells']
+        blocked = (self.zones > 0) | _dilate((self.occupancy > 0) | state['mask'], gap_h, gap_w)
+        # Tepi dek mendapat jarak bebas penuh
+        blocked[:gap_h] = True
+        blocked[self.rows - gap_h:] = True
+        blocked[:, :gap_w] = True
+        blocked[:, self.cols - gap_w:] = True
+        return blocked
+
+    def refill(self, key, length, width, margins=(0.0, 0.0)):
+        """
+        Mengisi ruang bebas dengan bayangan tipe ini (greedy depan-ke-belakang,
+        kiri-ke-kanan). length/width: ukuran badan, margins: jarak bebas
+        (samping, depan/belakang). Aman dijalankan di thread latar belakang.
+        """
+        cells = self._footprint_cells(length, width) + self._gap_cells(*margins)
+        h, w, gap_h, gap_w = cells
+        with self._lock:
+            state = self._ghosts.get(key)
+            if state is None or state['cells'] != cells:
+                state = {'cells': cells, 'mask': np.zeros_like(self.occupancy, dtype=bool), 'slots': set()}
+                self._ghosts[key] = state
+            blocked = self._blocked(state)
+            version = self.version
+
+        slots = _greedy_fill(blocked, h, w, gap_h, gap_w)
+
+        with self._lock:
+            # Tipe ini dibuang oleh retain() selama simulasi
+            if self._ghosts.get(key) is not state:
+                return len(slots)
+            # Armada berubah selama simulasi: pertahankan bayangan yang masih bebas
+            if version != self.version:
+                blocked = self._blocked(state)
+                slots = [s for s in slots if not blocked[s[0]:s[0] + h, s[1]:s[1] + w].any()]
+            for row, col in slots:
+                if state['mask'][row:row + h, col:col + w].any():
+                    continue
+                state['mask'][row:row + h, col:col + w] = True
+                state['slots'].add((row, col))
+            state['filled_version'] = self.version
+            return len(state['slots'])
+
+
+# Fungsi untuk pengisian greedy footprint seragam pada raster (gap: celah sel antar bayangan)
+def _greedy_fill(blocked, h, w, gap_h=0, gap_w=0):
+    rows, cols = blocked.shape
+    if h > rows or w > cols:
+        return []
+
+    # Jendela h×w yang seluruhnya bebas, lewat summed-area table
+    integral = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+    integral[1:, 1:] = blocked.cumsum(axis=0).cumsum(axis=1)
+    window = (integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]) == 0
+
+    # Baris terakhir (eksklusif) yang sudah ditutup bayangan baru per kolom
+    column_block = np.zeros(cols, dtype=np.int64)
+    slots = []
+    for row in range(window.shape[0]):
+        candidates = window[row]
+        if not candidates.any():
+            continue
+        reach = sliding_window_view(column_block, w).max(axis=1)
+        free = np.flatnonzero(candidates & (reach <= row))
+        next_col = -1
+        for col in free:
+            if col < next_col:
+                continue
+            slots.append((row, int(col)))
+            column_block[max(0, col - gap_w):col + w + gap_w] = row + h + gap_h
+            next_col = col + w + gap_w
+    return slots
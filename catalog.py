@@ -0,0 +1,77 @@
+# catalog.py - Katalog kendaraan bersama (read-only, sekali per proses) dan interning string
+import sys
+from types import MappingProxyType
+
+from stability import DEFAULT_WEIGHTS
+
+# Modul ini hanya dievaluasi sekali per proses server, sedangkan main.py
+# dijalankan ulang setiap rerun. Semua katalog di bawah immutable sehingga
+# aman dibagi oleh semua sesi tanpa salinan per sesi.
+
+# Warna untuk kendaraan (di-intern agar warna dari file impor menjadi objek yang sama)
+VEHICLE_COLORS = tuple(sys.intern(color) for color in (
+    '#FF6B6B', '#4ECDC4', '#FFD166', '#06D6A0',
+    '#118AB2', '#EF476F', '#7209B7', '#073B4C',
+    '#F72585', '#3A86FF', '#FB5607', '#8338EC',
+    '#3A86FF', '#FF006E', '#FFBE0B', '#FB5607'
+))
+
+# Ikon untuk tipe kendaraan
+VEHICLE_ICONS = MappingProxyType({vehicle_type: sys.intern(icon) for vehicle_type, icon in {
+    'motor': '🏍️',
+    'car': '🚗',
+    'truck': '🚚',
+    'bus': '🚌',
+    'custom': '🚙'
+}.items()})
+
+# Field string kendaraan yang di-intern (nilainya berulang di ribuan kendaraan)
+INTERNED_FIELDS = ('name', 'type', 'icon', 'color')
+
+
+# Fungsi untuk membuat template tipe kendaraan (read-only)
+def vehicle_template(name, length, width, vehicle_type, icon):
+    return MappingProxyType({
+        'name': sys.intern(name),
+        'length': float(length),
+        'width': float(width),
+        'type': sys.intern(vehicle_type),
+        'icon': sys.intern(icon),
+        'weight': DEFAULT_WEIGHTS.get(vehicle_type, DEFAULT_WEIGHTS['custom'])
+    })
+
+# Kendaraan default dengan ukuran sebenarnya (tombol tambah cepat)
+VEHICLE_PRESETS = (
+    vehicle_template("Motor", 2.0, 0.8, 'motor', '🏍️'),
+    vehicle_template("Mobil Sedang", 5.0, 2.0, 'car', '🚗'),
+    vehicle_template("Mobil Kecil", 4.5, 1.8, 'car', '🚙'),
+    vehicle_template("Truk", 10.0, 2.5, 'truck', '🚚'),
+    vehicle_template("Bus", 12.0, 2.5, 'bus', '🚌'),
+)
+
+# Ukuran acuan per tipe kendaraan (untuk estimasi kapasitas dan ganti tipe): preset pertama tiap tipe
+VEHICLE_CATALOG = MappingProxyType({
+    vehicle_type: next(preset for preset in VEHICLE_PRESETS if preset['type'] == vehicle_type)
+    for vehicle_type in ('motor', 'car', 'truck', 'bus')
+})
+
+# String katalog milik proses: dibagi semua sesi, jadi tidak dihitung sebagai memori sesi
+SHARED_STRINGS = tuple(VEHICLE_COLORS) + tuple(VEHICLE_ICONS.values()) + tuple(
+    preset[field] for preset in VEHICLE_PRESETS for field in ('name', 'type', 'icon'))
+
+
+# Fungsi untuk intern kunci dan string kendaraan (satu objek string per nilai untuk semua sesi)
+def intern_vehicle(vehicle):
+    """Mengembalikan dict baru; kunci dari JSON/SQLite menjadi objek yang sama dengan literal kode"""
+    interned = {}
+    for key, value in vehicle.items():
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        interned[sys.intern(key)] = value
+    return interned
+
+# Fungsi untuk intern seluruh kendaraan semua dek (di tempat, daftar dek tetap sama)
+def intern_decks(decks):
+    for deck in decks:
+        deck['vehicles'] = [intern_vehicle(v) for v in deck['vehicles']]
+    return decks
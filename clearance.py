@@ -0,0 +1,62 @@
+# clearance.py - Jarak bebas (clearance) per tipe kendaraan: pintu pengemudi dan celah lashing
+#
+# Zona bebas kendaraan adalah badannya yang diperbesar jarak bebas penuh
+# tipenya di setiap sisi. Aturannya:
+#   - zona harus berada di dalam dek dan tidak menimpa rintangan, jadi tepi
+#     dek dan rintangan mendapat jarak bebas penuh;
+#   - zona kendaraan tidak boleh menimpa badan kendaraan lain (too_close),
+#     jadi per sumbu celah antar dua kendaraan >= yang lebih besar dari
+#     jarak bebas keduanya.
+# Semua pemeriksa (check_collision, SparseOccupancy, GridPlacer, LanePacker,
+# batch, estimator kapasitas) memakai aturan yang sama.
+
+# Jarak bebas bawaan per tipe (meter): (depan/belakang, samping)
+DEFAULT_CLEARANCES = {
+    'motor': (0.3, 0.5),
+    'car': (0.3, 0.6),
+    'truck': (0.5, 0.6),
+    'bus': (0.5, 0.6),
+    'custom': (0.3, 0.6)
+}
+
+
+# Fungsi untuk normalisasi pengaturan jarak bebas (dict tipe -> [depan/belakang, samping])
+def normalize_clearances(clearances):
+    if not clearances:
+        return None
+    return {str(vehicle_type): [float(fore_aft), float(side)]
+            for vehicle_type, (fore_aft, side) in clearances.items()}
+
+# Fungsi untuk kunci jarak bebas (hashable, repr stabil antar proses)
+def clearances_key(clearances):
+    if not clearances:
+        return ()
+    return tuple(sorted((vehicle_type, float(fore_aft), float(side))
+                        for vehicle_type, (fore_aft, side) in clearances.items()))
+
+# Fungsi untuk jarak bebas kendaraan (dx samping, dy depan/belakang)
+def clearance_margins(vehicle, clearances):
+    if not clearances:
+        return 0.0, 0.0
+    fore_aft, side = clearances.get(vehicle.get('type'), clearances.get('custom', (0.0, 0.0)))
+    return float(side), float(fore_aft)
+
+# Fungsi untuk persegi badan kendaraan (x, y, lebar, panjang)
+def body(vehicle):
+    return (vehicle['x'], vehicle['y'], vehicle['width'], vehicle['length'])
+
+# Fungsi untuk zona bebas kendaraan (x, y, lebar, panjang): badan diperbesar jarak bebas penuh
+def inflate(vehicle, clearances):
+    dx, dy = clearance_margins(vehicle, clearances)
+    return (vehicle['x'] - dx, vehicle['y'] - dy, vehicle['width'] + 2 * dx, vehicle['length'] + 2 * dy)
+
+# Fungsi untuk cek irisan dua persegi (x, y, lebar, panjang) dengan luas positif
+def rects_overlap(a, b, tolerance=0.0):
+    """tolerance: irisan setipis ini diabaikan (kendaraan yang tepat bersentuhan, galat float)"""
+    return not (a[0] + a[2] <= b[0] + tolerance or b[0] + b[2] <= a[0] + tolerance or
+                a[1] + a[3] <= b[1] + tolerance or b[1] + b[3] <= a[1] + tolerance)
+
+# Fungsi untuk aturan jarak bebas antar dua kendaraan (badan dan zona masing-masing)
+def too_close(body1, zone1, body2, zone2, tolerance=0.0):
+    """Zona salah satu kendaraan menimpa badan kendaraan lainnya"""
+    return rects_overlap(zone1, body2, tolerance) or rects_overlap(body1, zone2, tolerance)
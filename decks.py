@@ -0,0 +1,201 @@
+# decks.py - Model multi-dek / multi-kapal dan alokasi manifest per dek
+import math
+import random
+
+from occupancy import SparseOccupancy
+from placement import (GridPlacer, LanePacker, default_lane_count, find_empty_position, raster_step,
+                       MAX_SEARCH_POINTS)
+
+# Di bawah biaya ini (sel raster × kendaraan), overhead proses lebih mahal dari packing-nya
+PARALLEL_MIN_WORK = 50_000_000
+
+
+# Fungsi untuk membuat dek baru
+def new_deck(ship, name, length, width, lanes=None):
+    return {
+        'ship': ship,
+        'name': name,
+        'layout': {
+            'length': float(length),
+            'width': float(width),
+            'lanes': int(lanes) if lanes else default_lane_count(width)
+        },
+        'vehicles': []
+    }
+
+# Fungsi untuk label dek (Kapal / Dek)
+def deck_label(deck):
+    return f"{deck['ship']} / {deck['name']}"
+
+# Fungsi untuk utilisasi satu dek
+def deck_utilization(deck):
+    layout = deck['layout']
+    deck_area = layout['length'] * layout['width']
+    used_area = sum(v['length'] * v['width'] for v in deck['vehicles'])
+    return {
+        'ship': deck['ship'],
+        'deck': deck['name'],
+        'deck_area': deck_area,
+        'used_area': used_area,
+        'usage_percentage': (used_area / deck_area) * 100 if deck_area > 0 else 0,
+        'vehicle_count': len(deck['vehicles'])
+    }
+
+# Fungsi untuk utilisasi per dek, per kapal dan total
+def fleet_utilization(decks):
+    per_deck = [deck_utilization(deck) for deck in decks]
+
+    per_ship = {}
+    for row in per_deck:
+        ship = per_ship.setdefault(row['ship'], {'deck_area': 0.0, 'used_area': 0.0, 'vehicle_count': 0})
+        ship['deck_area'] += row['deck_area']
+        ship['used_area'] += row['used_area']
+        ship['vehicle_count'] += row['vehicle_count']
+    for ship in per_ship.values():
+        ship['usage_percentage'] = (ship['used_area'] / ship['deck_area']) * 100 if ship['deck_area'] > 0 else 0
+
+    total_area = sum(row['deck_area'] for row in per_deck)
+    total_used = sum(row['used_area'] for row in per_deck)
+    return {
+        'decks': per_deck,
+        'ships': per_ship,
+        'total': {
+            'deck_area': total_area,
+            'used_area': total_used,
+            'usage_percentage': (total_used / total_area) * 100 if total_area > 0 else 0,
+            'vehicle_count': sum(row['vehicle_count'] for row in per_deck)
+        }
+    }
+
+# Fungsi untuk perkiraan biaya packing satu dek (operasi sel)
+def packing_work(layout, vehicles, mode='grid', grid_step=1.0):
+    """Dipakai untuk memutuskan dek mana yang layak di-packing di proses terpisah"""
+    if mode == 'lane':
+        return len(vehicles)
+    step = raster_step(layout, grid_step)
+    if step > grid_step:
+        # Pencarian sampel per kendaraan pada indeks sparse
+        return len(vehicles) * MAX_SEARCH_POINTS
+    return len(vehicles) * math.ceil(layout['length'] / step) * math.ceil(layout['width'] / step)
+
+# Fungsi untuk mem-packing satu dek (bisa dijalankan di proses terpisah)
+def pack_deck(layout, existing_vehicles, vehicles, mode='grid', grid_step=1.0, seed=0):
+    """
+    Menempatkan kendaraan ke satu dek tanpa memindahkan kendaraan yang sudah ada.
+    Mode grid memakai satu GridPlacer untuk seluruh pass (jendela bebas per
+    footprint diperbarui lokal), mode lajur LanePacker. Dek yang rasternya
+    harus diperkasar pada grid density ini dicari per kendaraan lewat
+    SparseOccupancy, sehingga memori tidak bergantung pada luas dek. Hasilnya
+    deterministik untuk seed yang sama. Mengembalikan (ditempatkan, tidak_muat).
+    """
+    if mode == 'lane':
+        packer = LanePacker.from_vehicles(layout, existing_vehicles, grid_step)
+        return packer.pack(vehicles)
+
+    placed, rejected = [], []
+    rng = random.Random(seed)
+    order = sorted(vehicles, key=lambda v: v['length'] * v['width'], reverse=True)
+    if raster_step(layout, grid_step) > grid_step:
+        occupied = list(existing_vehicles)
+        index = SparseOccupancy.from_vehicles(layout, occupied, grid_step)
+        for vehicle in order:
+            if find_empty_position(vehicle, layout, occupied, grid_step, index=index, rng=rng):
+                occupied.append(vehicle)
+                index.add(vehicle)
+                placed.append(vehicle)
+            else:
+                rejected.append(vehicle)
+        return placed, rejected
+
+    placer = GridPlacer.from_vehicles(layout, existing_vehicles, grid_step)
+    for vehicle in order:
+        if placer.place(vehicle, rng):
+            placed.append(vehicle)
+        else:
+            rejected.append(vehicle)
+    return placed, rejected
+
+# Fungsi untuk membagi manifest ke dek berdasarkan sisa luas
+def split_manifest(manifest, decks, mode='grid', excluded=None):
+    """
+    Greedy luas terbesar dulu: setiap kendaraan masuk ke dek dengan sisa
+    luas terbesar yang dimensinya cukup. excluded: id kendaraan -> indeks dek
+    yang sudah menolaknya. Mengembalikan (bagian_per_dek, tidak_ada_dek).
+    """
+    excluded = excluded or {}
+    budgets = []
+    for deck in decks:
+        usage = deck_utilization(deck)
+        budgets.append(usage['deck_area'] - usage['used_area'])
+    shares = [[] for _ in decks]
+    unassigned = []
+
+    for vehicle in sorted(manifest, key=lambda v: v['length'] * v['width'], reverse=True):
+        candidates = []
+        for index, deck in enumerate(decks):
+            if index in excluded.get(vehicle['id'], ()):
+                continue
+            layout = deck['layout']
+            if vehicle['length'] > layout['length'] or vehicle['width'] > layout['width']:
+                continue
+            if mode == 'lane' and vehicle['width'] > layout['width'] / layout.get('lanes', default_lane_count(layout['width'])):
+                continue
+            candidates.append(index)
+
+        if not candidates:
+            unassigned.append(vehicle)
+            continue
+
+        target = max(candidates, key=lambda index: budgets[index])
+        shares[target].append(vehicle)
+        budgets[target] -= vehicle['length'] * vehicle['width']
+    return shares, unassigned
+
+# Fungsi untuk alokasi manifest ke beberapa dek
+def allocate_manifest(manifest, decks, mode='grid', grid_step=1.0, rounds=3, seed=0, executor=None):
+    """
+    Membagi manifest ke semua dek lalu mem-packing setiap dek. Kendaraan
+    yang tidak muat di dek pilihannya ditawarkan ke dek lain pada ronde
+    berikutnya. Jika executor (process pool) diberikan dan paling sedikit
+    dua dek berbiaya di atas PARALLEL_MIN_WORK, dek-dek berat itu di-packing
+    paralel; dek ringan tetap di proses ini.
+
+    Mengembalikan (ditempatkan_per_dek, tidak_muat). Kendaraan yang sudah
+    ada di dek tidak dipindahkan.
+    """
+    placed_per_deck = [[] for _ in decks]
+    remaining = list(manifest)
+    excluded = {}
+    unplaced = []
+
+    for _ in range(rounds):
+        if not remaining:
+            break
+
+        working = [dict(deck, vehicles=list(deck['vehicles']) + placed_per_deck[index])
+                   for index, deck in enumerate(decks)]
+        shares, unassigned = split_manifest(remaining, working, mode, excluded)
+        jobs = [(index, working[index]['layout'], working[index]['vehicles'], share)
+                for index, share in enumerate(shares) if share]
+
+        heavy = [job for job in jobs if packing_work(job[1], job[3], mode, grid_step) >= PARALLEL_MIN_WORK]
+        futures = {}
+        if executor is not None and len(heavy) > 1:
+            futures = {index: executor.submit(pack_deck, layout, existing, share, mode, grid_step, seed)
+                       for index, layout, existing, share in heavy}
+        results = [(index, pack_deck(layout, existing, share, mode, grid_step, seed))
+                   for index, layout, existing, share in jobs if index not in futures]
+        results.extend((index, future.result()) for index, future in futures.items())
+
+        rejected = []
+        for index, (placed, not_placed) in sorted(results, key=lambda result: result[0]):
+            placed_per_deck[index].extend(placed)
+            rejected.extend(not_placed)
+            for vehicle in not_placed:
+                excluded.setdefault(vehicle['id'], set()).add(index)
+
+        # Kendaraan tanpa dek tersisa tidak perlu dicoba lagi
+        unplaced.extend(unassigned)
+        remaining = rejected
+
+    return placed_per_deck, unplaced + remaining
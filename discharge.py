@@ -0,0 +1,143 @@
+# discharge.py - Analisis urutan bongkar: kendaraan mana yang menghalangi jalan ke ramp buritan
+from bisect import bisect_right
+
+# Ramp berada di buritan (y = panjang kapal); kendaraan keluar ke arah y membesar.
+
+
+# Fungsi untuk pelabuhan bongkar kendaraan (1 = pelabuhan pertama)
+def vehicle_port(vehicle):
+    return int(vehicle.get('port') or 1)
+
+
+class _Skyline:
+    """
+    Peta interval x yang saling lepas: untuk setiap potongan lebar dek,
+    kendaraan terdepan (paling dekat haluan) yang sudah disapu. Disimpan
+    sebagai daftar terurut sehingga query/insert memakai bisect.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.owners = []
+
+    def _first_overlap(self, x0):
+        index = bisect_right(self.starts, x0) - 1
+        if index < 0 or self.ends[index] <= x0:
+            index += 1
+        return index
+
+    def query(self, x0, x1):
+        """Pemilik semua segmen yang beririsan dengan [x0, x1)"""
+        found = []
+        index = self._first_overlap(x0)
+        while index < len(self.starts) and self.starts[index] < x1:
+            found.append(self.owners[index])
+            index += 1
+        return found
+
+    def insert(self, x0, x1, owner):
+        """Menutup [x0, x1) dengan pemilik baru, menyisakan potongan tepi segmen lama"""
+        first = self._first_overlap(x0)
+        last = first
+        while last < len(self.starts) and self.starts[last] < x1:
+            last += 1
+
+        starts, ends, owners = [], [], []
+        if first < last and self.starts[first] < x0:
+            starts.append(self.starts[first]); ends.append(x0); owners.append(self.owners[first])
+        starts.append(x0); ends.append(x1); owners.append(owner)
+        if first < last and self.ends[last - 1] > x1:
+            starts.append(x1); ends.append(self.ends[last - 1]); owners.append(self.owners[last - 1])
+
+        self.starts[first:last] = starts
+        self.ends[first:last] = ends
+        self.owners[first:last] = owners
+
+
+# Fungsi untuk membangun graf "menghalangi" antar kendaraan
+def build_blocking_graph(vehicles):
+    """
+    Sweep-line dari buritan ke haluan atas tepi depan kendaraan (y menurun).
+    Untuk setiap kendaraan, kendaraan yang terlihat di skyline pada rentang x
+    miliknya adalah penghalang langsung menuju ramp. Penghalang yang
+    tertutup penghalang lain tercakup secara transitif.
+
+    Mengembalikan (urutan_sapuan, blockers) dengan blockers: id -> [id penghalang langsung].
+    O(n log n + jumlah sisi).
+    """
+    order = sorted(vehicles, key=lambda v: v['y'], reverse=True)
+    skyline = _Skyline()
+    blockers = {}
+
+    for vehicle in order:
+        x0, x1 = vehicle['x'], vehicle['x'] + vehicle['width']
+        blockers[vehicle['id']] = list(dict.fromkeys(skyline.query(x0, x1)))
+        skyline.insert(x0, x1, vehicle['id'])
+
+    return order, blockers
+
+# Fungsi untuk analisis kedalaman bongkar dan konflik urutan pelabuhan
+def analyse_discharge(vehicles):
+    """
+    depth: jumlah lapis kendaraan yang harus keluar lebih dulu (0 = akses bebas).
+    must_shift: kendaraan pelabuhan lebih akhir yang menghalangi kendaraan
+        pelabuhan lebih awal, sehingga harus digeser/dibongkar sementara.
+    blocked: kendaraan yang terhalang kendaraan pelabuhan lebih akhir.
+    """
+    order, blockers = build_blocking_graph(vehicles)
+    ports = {v['id']: vehicle_port(v) for v in vehicles}
+
+    # Dari buritan ke haluan: penghalang selalu diproses lebih dulu
+    depth = {}
+    max_port_behind = {}
+    for vehicle in order:
+        vehicle_id = vehicle['id']
+        direct = blockers[vehicle_id]
+        depth[vehicle_id] = 1 + max((depth[b] for b in direct), default=-1)
+        max_port_behind[vehicle_id] = max((max(ports[b], max_port_behind[b]) for b in direct), default=0)
+
+    # Dari haluan ke buritan: pelabuhan paling awal yang terhalang di depan
+    blocked_by = {}
+    for vehicle_id, direct in blockers.items():
+        for blocker in direct:
+            blocked_by.setdefault(blocker, []).append(vehicle_id)
+
+    min_port_ahead = {}
+    for vehicle in reversed(order):
+        vehicle_id = vehicle['id']
+        min_port_ahead[vehicle_id] = min((min(ports[b], min_port_ahead[b]) for b in blocked_by.get(vehicle_id, [])),
+                                         default=float('inf'))
+
+    return {
+        'blockers': blockers,
+        'depth': depth,
+        'blocked': {vid for vid in ports if max_port_behind[vid] > ports[vid]},
+        'must_shift': {vid for vid in ports if min_port_ahead[vid] < ports[vid]},
+    }
+
+# Fungsi untuk memeriksa batasan urutan pelabuhan pada posisi kandidat
+def port_order_ok(vehicle, existing_vehicles):
+    """
+    Kendaraan di belakang (arah ramp) harus turun di pelabuhan yang sama atau
+    lebih awal; kendaraan di depannya harus turun di pelabuhan yang sama atau lebih akhir.
+    """
+    port = vehicle_port(vehicle)
+    x0, x1 = vehicle['x'], vehicle['x'] + vehicle['width']
+    front, rear = vehicle['y'], vehicle['y'] + vehicle['length']
+
+    for other in existing_vehicles:
+        if other['x'] >= x1 or other['x'] + other['width'] <= x0:
+            continue
+        if other['y'] >= rear and vehicle_port(other) > port:
+            return False
+        if other['y'] + other['length'] <= front and vehicle_port(other) < port:
+            return False
+    return True
+
+# Fungsi untuk target posisi y berdasarkan urutan pelabuhan
+def port_target_y(vehicle, ship_layout, port_count):
+    """Pelabuhan pertama dekat ramp buritan, pelabuhan terakhir paling dalam (dekat haluan)"""
+    port_count = max(1, port_count)
+    port = min(vehicle_port(vehicle), port_count)
+    return ship_layout['length'] * (1 - (port - 0.5) / port_count)
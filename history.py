@@ -0,0 +1,215 @@
+# history.py - Riwayat undo/redo layout berbasis delta copy-on-write
+import sys
+from collections import deque
+
+# Jumlah langkah undo bawaan
+DEFAULT_MAX_DEPTH = 50
+
+# Batas memori riwayat bawaan (byte, perkiraan)
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+# Fungsi untuk perkiraan ukuran satu rekaman kendaraan
+def _record_size(record):
+    return sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values())
+
+
+class LayoutHistory:
+    """
+    Setiap langkah hanya menyimpan salinan kendaraan yang berubah (sebelum
+    dan sesudah), bukan salinan seluruh layout. Memindah satu kendaraan
+    menambah dua rekaman kecil, O(1). Aksi massal (hapus semua, atur ulang,
+    resize) menyimpan seluruh kendaraan dek beserta urutannya.
+
+    Rekaman dibagi bersama antar langkah: rekaman "sesudah" sebuah langkah
+    dipakai ulang sebagai "sebelum" langkah berikutnya jika kendaraan itu
+    tidak berubah di antaranya. Rekaman tidak pernah dimutasi setelah dibuat.
+
+    state: dict kecil milik pemanggil (ukuran kapal, pengaturan, atau
+    referensi daftar dek untuk impor) yang disimpan apa adanya.
+    """
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+        self._latest = {}     # id -> rekaman terakhir yang dibuat (untuk berbagi struktur)
+        self._pending = None
+        self._frozen_bytes = 0
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    def _capture(self, vehicle):
+        """Rekaman immutable kendaraan; dipakai ulang jika isinya sama. Mengembalikan (rekaman, byte_baru)"""
+        latest = self._latest.get(vehicle['id'])
+        if latest is not None and latest == vehicle:
+            return latest, 0
+        record = dict(vehicle)
+        self._latest[vehicle['id']] = record
+        return record, _record_size(record)
+
+    def _snapshot(self, vehicles, ids):
+        if ids is None:
+            pairs = [(v['id'], v) for v in vehicles]
+        else:
+            by_id = {v['id']: v for v in vehicles}
+            pairs = [(vehicle_id, by_id.get(vehicle_id)) for vehicle_id in ids]
+
+        records, nbytes = {}, 0
+        for vehicle_id, vehicle in pairs:
+            if vehicle is None:
+                records[vehicle_id] = None
+                continue
+            records[vehicle_id], size = self._capture(vehicle)
+            nbytes += size
+        order = [vehicle_id for vehicle_id, _ in pairs] if ids is None else None
+        return records, order, nbytes
+
+    def freeze(self, vehicles):
+        """
+        Rekaman immutable untuk daftar kendaraan di luar dek aktif (misalnya
+        semua dek di state impor). Ukurannya dihitung ke langkah berikutnya.
+        """
+        records = []
+        for vehicle in vehicles:
+            record, size = self._capture(vehicle)
+            records.append(record)
+            self._frozen_bytes += size
+        return tuple(records)
+
+    def begin(self, label, vehicles, state=None, ids=None):
+        """
+        Dipanggil sebelum aksi. ids: id kendaraan yang akan diubah/ditambah/
+        dihapus; None = seluruh dek (aksi massal); () = hanya state.
+        """
+        ids = None if ids is None else list(ids)
+        records, order, nbytes = self._snapshot(vehicles, ids)
+        nbytes, self._frozen_bytes = nbytes + self._frozen_bytes, 0
+        self._pending = {'label': label, 'ids': ids, 'before': records, 'order_before': order,
+                         'state_before': state, 'nbytes': nbytes}
+
+    def commit(self, vehicles, state=None):
+        """Dipanggil setelah aksi; langkah tanpa perubahan dibuang. Mengembalikan True jika disimpan."""
+        entry, self._pending = self._pending, None
+        if entry is None:
+            return False
+
+        records, order, nbytes = self._snapshot(vehicles, entry['ids'])
+        nbytes, self._frozen_bytes = nbytes + self._frozen_bytes, 0
+        if records == entry['before'] and order == entry['order_before'] and state == entry['state_before']:
+            return False
+
+        entry.update({'after': records, 'order_after': order, 'state_after': state,
+                      'nbytes': entry['nbytes'] + nbytes})
+        self.undo_stack.append(entry)
+        self.nbytes += entry['nbytes']
+        dropped, self.redo_stack = self.redo_stack, []
+        self._release(dropped)
+        self.trim()
+        return True
+
+    def trim(self):
+        # Langkah tertua dibuang dulu; langkah terbaru selalu dipertahankan
+        dropped = []
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_depth or self.nbytes > self.max_bytes):
+            dropped.append(self.undo_stack.popleft())
+            self.nbytes -= dropped[-1]['nbytes']
+        self._release(dropped)
+
+    def _release(self, dropped):
+        """Melupakan rekaman terakhir yang hanya dirujuk oleh langkah yang dibuang"""
+        candidates = {}
+        for entry in dropped:
+            for records in (entry['before'], entry['after']):
+                for vehicle_id, record in records.items():
+                    if record is not None and self._latest.get(vehicle_id) is record:
+                        candidates[vehicle_id] = record
+        if not candidates:
+            return
+
+        live = list(self.undo_stack) + self.redo_stack
+        live_records = [entry['before'] for entry in live] + [entry['after'] for entry in live]
+        if self._pending is not None:
+            live_records.append(self._pending['before'])
+        for vehicle_id, record in candidates.items():
+            if not any(records.get(vehicle_id) is record for records in live_records):
+                del self._latest[vehicle_id]
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.nbytes = 0
+        self._latest = {}
+        self._pending = None
+        self._frozen_bytes = 0
+
+    @staticmethod
+    def _apply(vehicles, records, order):
+        """
+        Mengubah daftar kendaraan di tempat ke rekaman target. Objek
+        kendaraan yang masih ada dipertahankan (referensi tetap valid).
+        Mengembalikan (id berubah -> kendaraan baru atau None jika dihapus).
+        """
+        by_id = {v['id']: v for v in vehicles}
+        changes = {}
+
+        if order is not None:
+            restored = []
+            for vehicle_id in order:
+                record = records[vehicle_id]
+                current = by_id.pop(vehicle_id, None)
+                if current is None:
+                    current = dict(record)
+                    changes[vehicle_id] = current
+                elif current != record:
+                    current.clear()
+                    current.update(record)
+                    changes[vehicle_id] = current
+                restored.append(current)
+            for vehicle_id in by_id:
+                changes[vehicle_id] = None
+            vehicles[:] = restored
+            return changes
+
+        for vehicle_id, record in records.items():
+            current = by_id.get(vehicle_id)
+            if record is None:
+                if current is not None:
+                    vehicles.remove(current)
+                    changes[vehicle_id] = None
+            elif current is None:
+                current = dict(record)
+                vehicles.append(current)
+                changes[vehicle_id] = current
+            elif current != record:
+                current.clear()
+                current.update(record)
+                changes[vehicle_id] = current
+        return changes
+
+    def undo(self, vehicles):
+        """Mengembalikan (label, state_sebelum, perubahan) atau None jika tidak ada riwayat"""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.nbytes -= entry['nbytes']
+        self.redo_stack.append(entry)
+        changes = self._apply(vehicles, entry['before'], entry['order_before'])
+        return entry['label'], entry['state_before'], changes
+
+    def redo(self, vehicles):
+        """Mengembalikan (label, state_sesudah, perubahan) atau None jika tidak ada yang bisa diulang"""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        self.nbytes += entry['nbytes']
+        changes = self._apply(vehicles, entry['after'], entry['order_after'])
+        self.trim()
+        return entry['label'], entry['state_after'], changes
+
+    def labels(self):
+        return [entry['label'] for entry in self.undo_stack], [entry['label'] for entry in reversed(self.redo_stack)]
@@ -7,10 +7,34 @@ import plotly.graph_objects as go
 import plotly.express as px
 import random
 import math
+import sys
+import uuid
 from io import BytesIO
 from dataclasses import dataclass
 from typing import List, Tuple, Optional
 
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import os
+
+import placement
+from placement import fits_on_ship, LanePacker, default_lane_count, layout_violations
+from capacity import CapacityEstimator, area_upper_bound, lane_upper_bound
+from stability import StabilityTracker, DEFAULT_WEIGHTS, vehicle_weight, axle_load
+from discharge import analyse_discharge, port_order_ok, port_target_y, vehicle_port
+from decks import new_deck, deck_label, fleet_utilization, allocate_manifest, pack_deck
+from occupancy import SparseOccupancy
+from voyage_store import VoyageStore
+from booking import booking_spec, simulate_bookings, summarize
+from arrivals import OnlineLoader, parse_arrivals, iter_socket_arrivals, start_replay_server, run_stream
+from history import LayoutHistory
+from obstacles import OBSTACLE_KINDS, new_obstacle, rectangle_obstacle, parse_points, obstacles_key
+from clearance import DEFAULT_CLEARANCES, normalize_clearances, clearances_key, clearance_margins, inflate
+from batch import batch_conflicts, select_by_types, select_in_region, translated, plan_resize
+from catalog import (VEHICLE_COLORS, VEHICLE_ICONS, VEHICLE_PRESETS, VEHICLE_CATALOG, SHARED_STRINGS, intern_vehicle,
+                     intern_decks)
+from sessions import SessionArtifacts, vehicles_bytes
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Ro-Ro Layout Planner",
@@ -182,14 +206,20 @@ class Vehicle:
     y: float       # posisi y (meter dari depan)
     color: str
     icon: str
+    weight: Optional[float] = None  # dalam ton (None = berat bawaan tipe)
+    port: int = 1                   # urutan pelabuhan bongkar (1 = pertama)
 
 # Inisialisasi state session
 if 'ship_layout' not in st.session_state:
     st.session_state.ship_layout = {
         'length': 200.0,    # meter - nilai default yang lebih realistis
-        'width': 30.0       # meter - nilai default yang lebih realistis
+        'width': 30.0,      # meter - nilai default yang lebih realistis
+        'lanes': 10         # jumlah lajur (±3 meter per lajur)
     }
 
+if 'placement_mode' not in st.session_state:
+    st.session_state.placement_mode = 'grid'  # 'grid' atau 'lane'
+
 if 'grid_density' not in st.session_state:
     st.session_state.grid_density = 1.0  # meter antara titik grid
 
@@ -202,26 +232,81 @@ if 'next_vehicle_id' not in st.session_state:
 if 'selected_vehicle' not in st.session_state:
     st.session_state.selected_vehicle = None
 
-# Warna untuk kendaraan
-vehicle_colors = [
-    '#FF6B6B', '#4ECDC4', '#FFD166', '#06D6A0', 
-    '#118AB2', '#EF476F', '#7209B7', '#073B4C',
-    '#F72585', '#3A86FF', '#FB5607', '#8338EC',
-    '#3A86FF', '#FF006E', '#FFBE0B', '#FB5607'
-]
-
-# Ikon untuk tipe kendaraan
-vehicle_icons = {
-    'motor': '🏍️',
-    'car': '🚗',
-    'truck': '🚚',
-    'bus': '🚌',
-    'custom': '🚙'
-}
-
-# Fungsi untuk menghasilkan warna acak
-def get_random_color():
-    return random.choice(vehicle_colors)
+if 'placement_objective' not in st.session_state:
+    st.session_state.placement_objective = 'random'  # 'random' atau 'balance'
+
+if 'port_order_placement' not in st.session_state:
+    st.session_state.port_order_placement = False  # pelabuhan akhir ditempatkan lebih dalam
+
+if 'placement_seed' not in st.session_state:
+    st.session_state.placement_seed = 0  # seed penempatan: layout sama untuk manifest yang sama
+
+# Model multi-dek: dek aktif memakai ship_layout dan vehicles di atas
+if 'decks' not in st.session_state:
+    st.session_state.decks = [new_deck("Kapal 1", "Dek Utama", 
+                                       st.session_state.ship_layout['length'], 
+                                       st.session_state.ship_layout['width'],
+                                       st.session_state.ship_layout.get('lanes'))]
+    st.session_state.active_deck = 0
+
+# Sinkronkan dek aktif (aksi sebelumnya bisa mengganti objek ship_layout/vehicles)
+st.session_state.decks[st.session_state.active_deck]['layout'] = st.session_state.ship_layout
+st.session_state.decks[st.session_state.active_deck]['vehicles'] = st.session_state.vehicles
+
+# Nilai awal widget ukuran kapal (diperbarui saat berpindah dek)
+if 'ship_length_input' not in st.session_state:
+    st.session_state.ship_length_input = float(st.session_state.ship_layout['length'])
+    st.session_state.ship_width_input = float(st.session_state.ship_layout['width'])
+    st.session_state.lane_count_input = int(st.session_state.ship_layout.get(
+        'lanes', default_lane_count(st.session_state.ship_layout['width'])))
+
+# Jumlah momen berat untuk CoG, diperbarui inkremental
+if 'stability' not in st.session_state:
+    st.session_state.stability = StabilityTracker()
+    st.session_state.stability.recompute(st.session_state.vehicles)
+
+# Riwayat undo/redo dek aktif (delta copy-on-write, bukan salinan layout penuh)
+if 'history' not in st.session_state:
+    st.session_state.history = LayoutHistory()
+
+# Kunci sesi untuk registry artefak bersama (tidak bergantung pada API internal Streamlit)
+if 'session_key' not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex
+
+# Executor bersama untuk simulasi kapasitas di latar belakang
+@st.cache_resource
+def get_capacity_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="capacity")
+
+# Process pool bersama untuk packing paralel per dek (spawn: aman dari server multi-thread)
+@st.cache_resource
+def get_packing_executor():
+    workers = min(4, os.cpu_count() or 1)
+    if workers < 2:
+        # Satu CPU: proses tambahan hanya menambah overhead
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+# Cache LRU hasil penempatan, dipakai bersama oleh semua sesi
+@st.cache_resource
+def get_placement_cache():
+    return placement.PlacementCache()
+
+# Artefak besar semua sesi (diagram, indeks, estimator) dengan anggaran memori dan LRU
+@st.cache_resource
+def get_session_artifacts():
+    return SessionArtifacts()
+
+# Arsip pelayaran SQLite, satu koneksi untuk semua sesi
+@st.cache_resource
+def get_voyage_store():
+    return VoyageStore()
+
+# Fungsi untuk menghasilkan warna acak (deterministik per id kendaraan dan seed)
+def get_random_color(vehicle_id=None):
+    if vehicle_id is None:
+        vehicle_id = st.session_state.next_vehicle_id
+    return random.Random(f"{st.session_state.placement_seed}:{vehicle_id}").choice(VEHICLE_COLORS)
 
 # Fungsi untuk menggelapkan warna
 def darken_color(color, percent):
@@ -230,75 +315,117 @@ def darken_color(color, percent):
     rgb = tuple(max(0, min(255, int(c * (100 - percent) / 100))) for c in rgb)
     return '#%02x%02x%02x' % rgb
 
-# Fungsi untuk memeriksa tabrakan kendaraan (dalam meter)
-def check_collision(vehicle1, vehicle2):
-    x1, y1 = vehicle1['x'], vehicle1['y']
-    w1, h1 = vehicle1['width'], vehicle1['length']
-    
-    x2, y2 = vehicle2['x'], vehicle2['y']
-    w2, h2 = vehicle2['width'], vehicle2['length']
-    
-    # Check if rectangles overlap
-    return not (x1 + w1 <= x2 or x2 + w2 <= x1 or y1 + h1 <= y2 or y2 + h2 <= y1)
-
-# Fungsi untuk memeriksa apakah kendaraan cocok di kapal
-def fits_on_ship(vehicle, ship_layout):
-    # Cek apakah kendaraan berada dalam batas kapal
-    if vehicle['x'] < 0 or vehicle['x'] + vehicle['width'] > ship_layout['width']:
-        return False
-    if vehicle['y'] < 0 or vehicle['y'] + vehicle['length'] > ship_layout['length']:
-        return False
-    return True
-
 # Fungsi untuk menemukan posisi kosong untuk kendaraan
-def find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step=None):
+def find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step=None, preferred_centre=None,
+                        constraint=None, index=None):
     """
     Mencari posisi kosong untuk kendaraan dengan grid tertentu
-    grid_step: resolusi pencarian dalam meter
+    grid_step: resolusi pencarian dalam meter (bawaan: grid density sesi)
+    index: SparseOccupancy yang sinkron dengan existing_vehicles (opsional)
+    Hasil ditentukan oleh seed penempatan sesi dan diambil dari cache jika sudah pernah dicari.
     """
     if grid_step is None:
         grid_step = st.session_state.grid_density
-    
-    max_x = ship_layout['width'] - vehicle['width']
-    max_y = ship_layout['length'] - vehicle['length']
-    
-    # Jika kendaraan lebih besar dari kapal
-    if max_x < 0 or max_y < 0:
+    return placement.seeded_find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step,
+                                                st.session_state.placement_seed, preferred_centre, constraint,
+                                                index, get_placement_cache())
+
+# Fungsi untuk indeks okupansi sparse dek aktif
+def get_occupancy_index():
+    """
+    Dibuat ulang hanya jika ukuran dek, rintangan, jarak bebas atau grid
+    density berubah; selain itu disinkronkan inkremental
+    """
+    ship_layout = st.session_state.ship_layout
+    index_key = (ship_layout['length'], ship_layout['width'], obstacles_key(ship_layout.get('obstacles')),
+                 clearances_key(ship_layout.get('clearances')), st.session_state.grid_density)
+    artifacts = get_session_artifacts()
+    index = artifacts.get(st.session_state.session_key, 'occupancy_index', index_key)
+    if index is None:
+        index = artifacts.put(st.session_state.session_key, 'occupancy_index', index_key,
+                              SparseOccupancy.from_vehicles(ship_layout, [], st.session_state.grid_density),
+                              lambda index: index.memory_bytes())
+    index.sync(st.session_state.vehicles)
+    return index
+
+# Fungsi untuk status lajur dek aktif (mode lajur)
+def get_lane_packer():
+    """
+    Dibuat ulang hanya jika dek aktif, ukurannya, jumlah lajur, rintangan,
+    jarak bebas atau grid density berubah; selain itu disinkronkan inkremental
+    """
+    ship_layout = st.session_state.ship_layout
+    packer_key = (st.session_state.active_deck, ship_layout['length'], ship_layout['width'],
+                  ship_layout.get('lanes', default_lane_count(ship_layout['width'])),
+                  obstacles_key(ship_layout.get('obstacles')), clearances_key(ship_layout.get('clearances')),
+                  st.session_state.grid_density)
+    artifacts = get_session_artifacts()
+    packer = artifacts.get(st.session_state.session_key, 'lane_packer', packer_key)
+    if packer is None:
+        packer = artifacts.put(st.session_state.session_key, 'lane_packer', packer_key,
+                               LanePacker.from_vehicles(ship_layout, [], st.session_state.grid_density),
+                               lambda packer: packer.memory_bytes())
+    packer.sync(st.session_state.vehicles)
+    return packer
+
+# Fungsi untuk cek apakah kendaraan terpilih bisa berada di posisinya sekarang
+def position_is_valid(vehicle):
+    if not fits_on_ship(vehicle, st.session_state.ship_layout):
         return False
-    
-    # Generate grid points
-    x_points = np.arange(0, max_x + grid_step, grid_step)
-    y_points = np.arange(0, max_y + grid_step, grid_step)
-    
-    # Optimasi: mulai dari berbagai titik
-    search_points = []
-    for y in y_points:
-        for x in x_points:
-            search_points.append((x, y))
-    
-    # Acak urutan pencarian untuk distribusi yang lebih baik
-    random.shuffle(search_points)
-    
-    for x, y in search_points:
-        vehicle['x'] = round(x, 2)
-        vehicle['y'] = round(y, 2)
-        
-        collision = False
-        for existing in existing_vehicles:
-            if check_collision(vehicle, existing):
-                collision = True
-                break
-        
-        if not collision and fits_on_ship(vehicle, ship_layout):
-            return True
-    
-    return False
+    return not get_occupancy_index().collides(vehicle)
+
+# Fungsi untuk menggeser kendaraan ke satu arah sampai menempel (maksimal limit meter)
+def slide_vehicle(vehicle, direction, limit=None):
+    """
+    Jarak legal terjauh dihitung dengan satu query indeks okupansi; kendaraan
+    berhenti tepat saat menyentuh kendaraan lain, rintangan atau tepi dek.
+    Mengembalikan jarak yang ditempuh.
+    """
+    old_x, old_y = vehicle['x'], vehicle['y']
+    distance = get_occupancy_index().max_shift(vehicle, direction, limit)
+    # Posisi tepat menempel bisa bertumpuk sangat tipis karena galat float
+    for shift in (distance, distance - 1e-6):
+        if shift <= 0:
+            break
+        vehicle['x'] = old_x + direction[0] * shift
+        vehicle['y'] = old_y + direction[1] * shift
+        if position_is_valid(vehicle):
+            return shift
+    vehicle['x'], vehicle['y'] = old_x, old_y
+    return 0.0
+
+# Fungsi untuk merapatkan kendaraan ke tetangga, rintangan atau tepi dek terdekat
+def snap_vehicle(vehicle, max_distance):
+    contact = get_occupancy_index().nearest_contact(vehicle, max_distance)
+    if contact is None:
+        return 0.0
+    return slide_vehicle(vehicle, *contact)
+
+# Fungsi untuk target posisi sesuai objektif penempatan
+def get_preferred_centre(vehicle):
+    ship_layout = st.session_state.ship_layout
+    centre = None
+    if st.session_state.placement_objective == 'balance':
+        centre = st.session_state.stability.balance_target(vehicle, ship_layout)
+    
+    # Urutan pelabuhan: pelabuhan terakhir paling dalam (dekat haluan)
+    if st.session_state.port_order_placement:
+        port_count = max([vehicle_port(v) for v in st.session_state.vehicles] + [vehicle_port(vehicle)])
+        target_x = centre[0] if centre else ship_layout['width'] / 2
+        centre = (target_x, port_target_y(vehicle, ship_layout, port_count))
+    return centre
+
+# Fungsi untuk batasan urutan pelabuhan terhadap kendaraan lain
+def get_port_constraint(existing_vehicles):
+    if not st.session_state.port_order_placement:
+        return None
+    return lambda vehicle: port_order_ok(vehicle, existing_vehicles)
 
 # Fungsi untuk menambahkan kendaraan
-def add_vehicle(name, length, width, vehicle_type="custom", icon="🚙"):
+def add_vehicle(name, length, width, vehicle_type="custom", icon="🚙", weight=None, port=1):
     ship_layout = st.session_state.ship_layout
     
-    new_vehicle = {
+    new_vehicle = intern_vehicle({
         'id': st.session_state.next_vehicle_id,
         'name': name,
         'type': vehicle_type,
@@ -307,29 +434,86 @@ def add_vehicle(name, length, width, vehicle_type="custom", icon="🚙"):
         'x': 0,  # posisi awal dalam meter
         'y': 0,  # posisi awal dalam meter
         'color': get_random_color(),
-        'icon': icon
-    }
+        'icon': icon,
+        'weight': weight if weight is not None else DEFAULT_WEIGHTS.get(vehicle_type, DEFAULT_WEIGHTS['custom']),
+        'port': int(port)
+    })
     
     # Cek apakah kendaraan lebih besar dari kapal
     if new_vehicle['width'] > ship_layout['width'] or new_vehicle['length'] > ship_layout['length']:
         st.warning(f"Kendaraan {name} ({length}m × {width}m) terlalu besar untuk kapal ({ship_layout['length']}m × {ship_layout['width']}m).")
         return
     
+    # Mode lajur: pengepakan 1-D best-fit per lajur
+    if st.session_state.placement_mode == 'lane':
+        packer = get_lane_packer()
+        if new_vehicle['width'] > packer.lane_width:
+            st.warning(f"Kendaraan {name} (lebar {width}m) lebih lebar dari lajur ({packer.lane_width:.2f}m).")
+            return
+        if not packer.place(new_vehicle, get_port_constraint(st.session_state.vehicles)):
+            st.warning(f"Tidak ada lajur dengan sisa panjang cukup untuk {name} ({length}m).")
+            return
     # Temukan posisi kosong
-    if not find_empty_position(new_vehicle, ship_layout, st.session_state.vehicles):
+    elif not find_empty_position(new_vehicle, ship_layout, st.session_state.vehicles,
+                                 preferred_centre=get_preferred_centre(new_vehicle),
+                                 constraint=get_port_constraint(st.session_state.vehicles),
+                                 index=get_occupancy_index()):
         st.warning(f"Tidak ada ruang yang cukup untuk {name} di kapal. Coba ukuran yang lebih kecil atau atur ulang kendaraan.")
         return
     
+    begin_history(f"Tambah {name}", ids=[new_vehicle['id']])
     st.session_state.vehicles.append(new_vehicle)
+    st.session_state.stability.add(new_vehicle)
     st.session_state.next_vehicle_id += 1
+    commit_history()
     st.success(f"{name} berhasil ditambahkan ke kapal!")
 
 # Fungsi untuk menghapus kendaraan
 def remove_vehicle(vehicle_id):
-    st.session_state.vehicles = [v for v in st.session_state.vehicles if v['id'] != vehicle_id]
-    if st.session_state.selected_vehicle and st.session_state.selected_vehicle['id'] == vehicle_id:
+    remove_vehicles([vehicle_id])
+
+# Fungsi untuk menghapus sekelompok kendaraan dalam satu pass
+def remove_vehicles(vehicle_ids):
+    vehicle_ids = set(vehicle_ids)
+    st.session_state.vehicles = [v for v in st.session_state.vehicles if v['id'] not in vehicle_ids]
+    for vehicle_id in vehicle_ids:
+        st.session_state.stability.remove(vehicle_id)
+    if st.session_state.selected_vehicle and st.session_state.selected_vehicle['id'] in vehicle_ids:
         st.session_state.selected_vehicle = None
 
+# Fungsi untuk menerapkan perubahan sekelompok kendaraan secara atomik
+def apply_batch(label, group, candidates):
+    """
+    candidates: salinan kendaraan kelompok dengan nilai baru (urutan sama
+    dengan group). Seluruh kelompok divalidasi sekali terhadap sisa armada;
+    jika ada yang melanggar, tidak ada yang diubah. Mengembalikan id yang melanggar.
+    """
+    group_ids = {v['id'] for v in group}
+    others = [v for v in st.session_state.vehicles if v['id'] not in group_ids]
+    conflicts = batch_conflicts(candidates, others, st.session_state.ship_layout,
+                                st.session_state.grid_density, index=get_occupancy_index())
+    if conflicts:
+        return conflicts
+    
+    begin_history(label, ids=group_ids)
+    for vehicle, candidate in zip(group, candidates):
+        vehicle.update(candidate)
+        st.session_state.stability.update(vehicle)
+    commit_history()
+    return set()
+
+# Fungsi untuk menempatkan ulang sekelompok kendaraan dalam satu pass pengepakan
+def replace_batch(label, group):
+    """Kendaraan lain tidak dipindah; jika ada yang tidak muat, tidak ada yang diubah"""
+    group_ids = {v['id'] for v in group}
+    others = [v for v in st.session_state.vehicles if v['id'] not in group_ids]
+    copies = [dict(v) for v in group]
+    _, rejected = pack_deck(st.session_state.ship_layout, others, copies, st.session_state.placement_mode,
+                            st.session_state.grid_density, st.session_state.placement_seed)
+    if rejected:
+        return {v['id'] for v in rejected}
+    return apply_batch(label, group, copies)
+
 # Fungsi untuk menghitung statistik
 def calculate_statistics():
     ship_layout = st.session_state.ship_layout
@@ -358,9 +542,81 @@ def calculate_statistics():
         'vehicle_types': vehicle_types,
     }
 
+# Fungsi untuk menghitung lane-metre per lajur
+def calculate_lane_usage():
+    return get_lane_packer().lane_usage()
+
+# Fungsi untuk estimasi sisa kapasitas per tipe kendaraan
+def estimate_remaining_capacity(custom_length, custom_width):
+    """
+    Batas atas instan dari geometri ruang bebas, ditambah estimasi simulasi
+    packing yang diperbarui secara inkremental di thread latar belakang.
+    """
+    ship_layout = st.session_state.ship_layout
+    estimator_key = (ship_layout['length'], ship_layout['width'], obstacles_key(ship_layout.get('obstacles')),
+                     clearances_key(ship_layout.get('clearances')), st.session_state.grid_density)
+    
+    # Estimator dibuat ulang hanya jika ukuran kapal, rintangan, jarak bebas atau grid density berubah
+    # (atau jika artefak sesi ini dibuang karena lama menganggur)
+    artifacts = get_session_artifacts()
+    cached = artifacts.get(st.session_state.session_key, 'capacity_estimator', estimator_key)
+    if cached is None:
+        cached = artifacts.put(st.session_state.session_key, 'capacity_estimator', estimator_key,
+                               (CapacityEstimator(ship_layout, st.session_state.grid_density), {}),
+                               lambda cached: cached[0].memory_bytes())
+    estimator, jobs = cached
+    estimator.sync(st.session_state.vehicles)
+    
+    lane_packer = None
+    if st.session_state.placement_mode == 'lane':
+        lane_packer = get_lane_packer()
+    
+    catalog = dict(VEHICLE_CATALOG)
+    catalog['custom'] = {'name': 'Kustom', 'length': custom_length, 'width': custom_width}
+    
+    rows = []
+    for vehicle_type, spec in catalog.items():
+        # Kapasitas dihitung dengan jarak bebas tipe ini
+        margins = clearance_margins({'type': vehicle_type}, ship_layout.get('clearances'))
+        length, width = spec['length'], spec['width']
+        key = (vehicle_type, length, width)
+        
+        if lane_packer is not None:
+            # Mode lajur: batas atas sudah eksak
+            upper = lane_upper_bound(lane_packer, length, width, margins)
+            simulated = upper
+        else:
+            # Setiap kendaraan memiliki badan plus setengah jarak bebasnya di setiap sisi
+            upper = area_upper_bound(estimator.free_area, length + margins[1], width + margins[0])
+            job = jobs.get(key)
+            if not estimator.is_current(key) and (job is None or job.done()):
+                jobs[key] = get_capacity_executor().submit(estimator.refill, key, length, width, margins)
+            simulated = estimator.estimate(key)
+        
+        rows.append({
+            'type': vehicle_type,
+            'name': spec['name'],
+            'length': spec['length'],
+            'width': spec['width'],
+            'upper_bound': upper,
+            'simulated': simulated,
+            'pending': lane_packer is None and not estimator.is_current(key)
+        })
+    
+    # Hanya tipe katalog dan ukuran kustom saat ini yang disimpan; ukuran kustom lama dibuang
+    current_keys = {(row['type'], row['length'], row['width']) for row in rows}
+    estimator.retain(current_keys)
+    for key in [key for key in jobs if key not in current_keys]:
+        jobs.pop(key).cancel()
+    return rows
+
 # Fungsi untuk membuat diagram sederhana dengan titik grid
-def create_grid_diagram():
-    """Membuat diagram grid dengan titik-titik dan kendaraan"""
+def create_grid_diagram(highlight_ids=None):
+    """
+    Membuat diagram grid dengan titik-titik dan kendaraan
+    highlight_ids: id kendaraan yang diberi garis tepi merah (misalnya harus digeser)
+    """
+    highlight_ids = highlight_ids or set()
     ship_layout = st.session_state.ship_layout
     vehicles = st.session_state.vehicles
     grid_density = st.session_state.grid_density
@@ -406,6 +662,31 @@ def create_grid_diagram():
             showlegend=False
         ))
     
+    # Kapal sangat besar: tampilkan tile okupansi aktif sebagai latar (tile kosong tidak disimpan)
+    if ship_area > 100000 and vehicles:
+        index = get_occupancy_index()
+        for full in (True, False):
+            tile_x, tile_y = [], []
+            for row, col, is_full in index.active_tiles():
+                if is_full != full:
+                    continue
+                x0, y0 = col * index.tile_size, row * index.tile_size
+                x1 = min(x0 + index.tile_size, ship_layout['width'])
+                y1 = min(y0 + index.tile_size, ship_layout['length'])
+                tile_x += [x0, x1, x1, x0, x0, None]
+                tile_y += [y0, y0, y1, y1, y0, None]
+            if tile_x:
+                fig.add_trace(go.Scatter(
+                    x=tile_x,
+                    y=tile_y,
+                    mode='lines',
+                    fill='toself',
+                    fillcolor='rgba(26, 41, 128, 0.25)' if full else 'rgba(26, 41, 128, 0.08)',
+                    line=dict(width=0),
+                    hoverinfo='skip',
+                    showlegend=False
+                ))
+    
     # Outline kapal
     ship_x = [0, ship_layout['width'], ship_layout['width'], 0, 0]
     ship_y = [0, 0, ship_layout['length'], ship_layout['length'], 0]
@@ -420,6 +701,64 @@ def create_grid_diagram():
         name='Kapal'
     ))
     
+    # Rintangan dan zona larangan: latar statis, satu trace per jenis
+    obstacle_styles = {
+        'obstacle': ('rgba(73, 80, 87, 0.6)', dict(color='#343a40', width=1)),
+        'no_go': ('rgba(239, 71, 111, 0.15)', dict(color='#EF476F', width=2, dash='dot'))
+    }
+    for kind, (fillcolor, line) in obstacle_styles.items():
+        obstacle_x, obstacle_y, obstacle_text = [], [], []
+        for obstacle in ship_layout.get('obstacles') or ():
+            if obstacle['kind'] != kind:
+                continue
+            points = obstacle['points'] + obstacle['points'][:1]
+            obstacle_x += [point[0] for point in points] + [None]
+            obstacle_y += [point[1] for point in points] + [None]
+            obstacle_text += [f"{OBSTACLE_KINDS[kind]}: {obstacle['name']}"] * len(points) + [None]
+        if obstacle_x:
+            fig.add_trace(go.Scatter(
+                x=obstacle_x,
+                y=obstacle_y,
+                mode='lines',
+                fill='toself',
+                fillcolor=fillcolor,
+                line=line,
+                text=obstacle_text,
+                hoverinfo='text',
+                showlegend=False
+            ))
+    
+    # Garis lajur (hanya mode lajur)
+    if st.session_state.placement_mode == 'lane':
+        lane_count = ship_layout.get('lanes', default_lane_count(ship_layout['width']))
+        lane_width = ship_layout['width'] / lane_count
+        for lane in range(1, lane_count):
+            fig.add_trace(go.Scatter(
+                x=[lane * lane_width, lane * lane_width],
+                y=[0, ship_layout['length']],
+                mode='lines',
+                line=dict(color='rgba(26, 41, 128, 0.4)', width=1, dash='dash'),
+                hoverinfo='skip',
+                showlegend=False
+            ))
+    
+    # Footprint jarak bebas (garis putus-putus di sekitar kendaraan), satu trace
+    clearances = ship_layout.get('clearances')
+    if clearances and vehicles:
+        clearance_x, clearance_y = [], []
+        for vehicle in vehicles:
+            x0, y0, width, length = inflate(vehicle, clearances)
+            clearance_x += [x0, x0 + width, x0 + width, x0, x0, None]
+            clearance_y += [y0, y0, y0 + length, y0 + length, y0, None]
+        fig.add_trace(go.Scatter(
+            x=clearance_x,
+            y=clearance_y,
+            mode='lines',
+            line=dict(color='rgba(26, 41, 128, 0.5)', width=1, dash='dot'),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+    
     # Tambahkan kendaraan
     for vehicle in vehicles:
         # Hitung posisi dalam grid
@@ -435,7 +774,8 @@ def create_grid_diagram():
             mode='lines+markers',
             fill='toself',
             fillcolor=vehicle['color'],
-            line=dict(color=darken_color(vehicle['color'], 30), width=2),
+            line=dict(color='red', width=4) if vehicle['id'] in highlight_ids
+                 else dict(color=darken_color(vehicle['color'], 30), width=2),
             marker=dict(size=0),  # Tidak menampilkan marker di sudut
             name=vehicle['name'],
             text=f"{vehicle['name']}<br>{vehicle['length']}m × {vehicle['width']}m",
@@ -457,6 +797,20 @@ def create_grid_diagram():
                 showlegend=False
             ))
     
+    # Titik berat gabungan (CoG) terhadap tengah dek
+    stability = st.session_state.stability
+    if stability.total_mass > 0:
+        fig.add_trace(go.Scatter(
+            x=[ship_layout['width'] / 2, stability.tcg],
+            y=[ship_layout['length'] / 2, stability.lcg],
+            mode='markers',
+            marker=dict(size=[10, 14], symbol=['cross-thin-open', 'x'], color=['gray', 'red'],
+                        line=dict(width=2, color=['gray', 'red'])),
+            text=["Tengah dek", f"CoG ({stability.tcg:.1f}, {stability.lcg:.1f})"],
+            hoverinfo='text',
+            showlegend=False
+        ))
+    
     # Konfigurasi layout
     fig.update_layout(
         title="Diagram Grid Kapal",
@@ -480,28 +834,285 @@ def create_grid_diagram():
     
     return fig
 
+# Fungsi untuk perkiraan memori figure Plotly (byte)
+def figure_bytes(fig):
+    total = 0
+    for trace in fig.data:
+        # Setiap trace: overhead objek + 8 byte per nilai x/y/teks
+        total += 1024
+        for attribute in ('x', 'y', 'text'):
+            values = getattr(trace, attribute, None)
+            if values is not None and not isinstance(values, str):
+                total += 8 * len(values)
+    return total
+
+# Fungsi untuk diagram dek aktif, diambil dari registry jika isinya tidak berubah
+def get_grid_diagram(highlight_ids=None):
+    ship_layout = st.session_state.ship_layout
+    stability = st.session_state.stability
+    diagram_key = hash((
+        ship_layout['length'], ship_layout['width'], obstacles_key(ship_layout.get('obstacles')),
+        tuple((obstacle['name'], obstacle['kind']) for obstacle in ship_layout.get('obstacles') or ()),
+        clearances_key(ship_layout.get('clearances')), st.session_state.grid_density,
+        frozenset(highlight_ids or ()), stability.total_mass, stability.tcg, stability.lcg,
+        tuple((v['id'], v['x'], v['y'], v['length'], v['width'], v['name'], v['color'], v['icon'], v.get('type'))
+              for v in st.session_state.vehicles)
+    ))
+    artifacts = get_session_artifacts()
+    fig = artifacts.get(st.session_state.session_key, 'diagram', diagram_key)
+    if fig is None:
+        fig = create_grid_diagram(highlight_ids)
+        artifacts.put(st.session_state.session_key, 'diagram', diagram_key, fig, figure_bytes(fig))
+    return fig
+
+# Fungsi untuk perkiraan memori sesi ini per komponen (byte)
+def session_memory():
+    artifact_names = {'diagram': "Diagram", 'occupancy_index': "Indeks okupansi", 'lane_packer': "Status lajur",
+                      'capacity_estimator': "Estimator kapasitas", 'export': "JSON ekspor"}
+    usage = get_session_artifacts().usage(st.session_state.session_key)
+    # String katalog dibagi semua sesi; string lain yang sama dihitung sekali untuk semua dek
+    seen = {id(value) for value in SHARED_STRINGS}
+    rows = [
+        {'Komponen': "Kendaraan (semua dek)",
+         'Byte': sum(vehicles_bytes(deck['vehicles'], seen) for deck in st.session_state.decks)},
+        {'Komponen': "Riwayat undo/redo", 'Byte': st.session_state.history.nbytes}
+    ]
+    rows += [{'Komponen': f"{label} (bisa dibuang)", 'Byte': usage.get(name, 0)}
+             for name, label in artifact_names.items()]
+    return rows
+
 # Fungsi untuk ekspor layout ke JSON
 def export_layout():
-    export_data = {
-        'ship_layout': st.session_state.ship_layout,
-        'vehicles': st.session_state.vehicles,
-        'next_vehicle_id': st.session_state.next_vehicle_id,
-        'grid_density': st.session_state.grid_density
-    }
-    return json.dumps(export_data, indent=2)
+    """
+    String JSON ekspor, disimpan di registry artefak dengan kunci isi
+    sehingga rerun tanpa perubahan layout tidak membuatnya ulang
+    """
+    decks = st.session_state.decks
+    export_key = hash((
+        st.session_state.next_vehicle_id, st.session_state.grid_density, st.session_state.placement_mode,
+        st.session_state.placement_seed, st.session_state.active_deck,
+        tuple((deck.get('ship'), deck['name'], deck['layout']['length'], deck['layout']['width'],
+               deck['layout'].get('lanes'), obstacles_key(deck['layout'].get('obstacles')),
+               tuple((obstacle['name'], obstacle['kind']) for obstacle in deck['layout'].get('obstacles') or ()),
+               clearances_key(deck['layout'].get('clearances')),
+               tuple(tuple(v.items()) for v in deck['vehicles']))
+              for deck in decks)
+    ))
+    artifacts = get_session_artifacts()
+    export_json = artifacts.get(st.session_state.session_key, 'export', export_key)
+    if export_json is None:
+        export_data = {
+            'ship_layout': st.session_state.ship_layout,
+            'vehicles': st.session_state.vehicles,
+            'next_vehicle_id': st.session_state.next_vehicle_id,
+            'grid_density': st.session_state.grid_density,
+            'placement_mode': st.session_state.placement_mode,
+            'placement_seed': st.session_state.placement_seed,
+            'decks': decks,
+            'active_deck': st.session_state.active_deck
+        }
+        export_json = json.dumps(export_data, indent=2)
+        artifacts.put(st.session_state.session_key, 'export', export_key, export_json, sys.getsizeof(export_json))
+    return export_json
 
 # Fungsi untuk impor layout dari JSON
 def import_layout(json_str):
     try:
         import_data = json.loads(json_str)
-        st.session_state.ship_layout = import_data.get('ship_layout', st.session_state.ship_layout)
-        st.session_state.vehicles = import_data.get('vehicles', [])
+        if import_data.get('decks'):
+            # Format multi-dek: dek aktif menjadi ship_layout/vehicles
+            st.session_state.decks = intern_decks(import_data['decks'])
+            st.session_state.active_deck = min(int(import_data.get('active_deck', 0)), len(st.session_state.decks) - 1)
+            for deck in st.session_state.decks:
+                deck['layout'].setdefault('lanes', default_lane_count(deck['layout']['width']))
+            active_deck = st.session_state.decks[st.session_state.active_deck]
+            st.session_state.ship_layout = active_deck['layout']
+            st.session_state.vehicles = active_deck['vehicles']
+        else:
+            st.session_state.ship_layout = import_data.get('ship_layout', st.session_state.ship_layout)
+            st.session_state.vehicles = [intern_vehicle(v) for v in import_data.get('vehicles', [])]
+            st.session_state.decks = [{'ship': "Kapal 1", 'name': "Dek Utama",
+                                       'layout': st.session_state.ship_layout,
+                                       'vehicles': st.session_state.vehicles}]
+            st.session_state.active_deck = 0
+        st.session_state.selected_vehicle = None
         st.session_state.next_vehicle_id = import_data.get('next_vehicle_id', st.session_state.next_vehicle_id + 1)
         st.session_state.grid_density = import_data.get('grid_density', 1.0)
+        st.session_state.placement_mode = import_data.get('placement_mode', 'grid')
+        st.session_state.placement_seed = int(import_data.get('placement_seed', 0))
+        st.session_state.stability.recompute(st.session_state.vehicles)
+        st.session_state.ship_layout.setdefault('lanes', default_lane_count(st.session_state.ship_layout['width']))
         return True
     except:
         return False
 
+# Fungsi untuk pengaturan layout yang disimpan bersama pelayaran
+def layout_settings():
+    return {
+        'grid_density': st.session_state.grid_density,
+        'placement_mode': st.session_state.placement_mode,
+        'placement_seed': st.session_state.placement_seed,
+        'next_vehicle_id': st.session_state.next_vehicle_id,
+        'active_deck': st.session_state.active_deck
+    }
+
+# Fungsi untuk memuat pelayaran dari arsip
+def load_voyage(voyage_id):
+    """Harus dipanggil sebelum widget ukuran kapal dibuat pada run yang sama"""
+    voyage = get_voyage_store().load_voyage(voyage_id)
+    settings = voyage['settings']
+    st.session_state.decks = intern_decks(voyage['decks'])
+    for deck in st.session_state.decks:
+        if not deck['layout'].get('lanes'):
+            deck['layout']['lanes'] = default_lane_count(deck['layout']['width'])
+    
+    max_id = max((v['id'] for deck in st.session_state.decks for v in deck['vehicles']), default=0)
+    st.session_state.next_vehicle_id = max(int(settings.get('next_vehicle_id', 1)), max_id + 1)
+    st.session_state.grid_density = settings.get('grid_density', st.session_state.grid_density)
+    st.session_state.placement_mode = settings.get('placement_mode', st.session_state.placement_mode)
+    st.session_state.placement_seed = int(settings.get('placement_seed', st.session_state.placement_seed))
+    switch_deck(min(int(settings.get('active_deck', 0)), len(st.session_state.decks) - 1))
+    return voyage
+
+# Fungsi untuk berpindah dek aktif
+def switch_deck(index, keep_history=False):
+    """Harus dipanggil sebelum widget ukuran kapal dibuat pada run yang sama"""
+    deck = st.session_state.decks[index]
+    st.session_state.active_deck = index
+    st.session_state.ship_layout = deck['layout']
+    st.session_state.vehicles = deck['vehicles']
+    st.session_state.selected_vehicle = None
+    st.session_state.stability.recompute(deck['vehicles'])
+    if not keep_history:
+        st.session_state.history.clear()
+    
+    # Widget ukuran kapal mengikuti dek yang baru
+    st.session_state.ship_length_input = float(deck['layout']['length'])
+    st.session_state.ship_width_input = float(deck['layout']['width'])
+    st.session_state.lane_count_input = int(deck['layout'].get('lanes', default_lane_count(deck['layout']['width'])))
+
+# Fungsi untuk state kecil yang ikut disimpan di riwayat undo/redo
+def layout_state(include_decks=False):
+    state = {
+        'ship_layout': dict(st.session_state.ship_layout),
+        'grid_density': st.session_state.grid_density,
+        'next_vehicle_id': st.session_state.next_vehicle_id
+    }
+    if include_decks:
+        # Impor mengganti semua dek: simpan rekaman immutable semua dek (dibagi dengan langkah lain)
+        history = st.session_state.history
+        state['decks'] = tuple(dict(deck, layout=dict(deck['layout']), vehicles=history.freeze(deck['vehicles']))
+                               for deck in st.session_state.decks)
+        state['active_deck'] = st.session_state.active_deck
+        state['placement_mode'] = st.session_state.placement_mode
+        state['placement_seed'] = st.session_state.placement_seed
+    return state
+
+# Fungsi untuk mencatat awal aksi di riwayat (ids None = seluruh dek, () = hanya state)
+def begin_history(label, ids=None, include_decks=False):
+    st.session_state.history.begin(label, st.session_state.vehicles, layout_state(include_decks), ids)
+
+# Fungsi untuk menutup aksi di riwayat (langkah tanpa perubahan dibuang)
+def commit_history(include_decks=False):
+    st.session_state.history.commit(st.session_state.vehicles, layout_state(include_decks))
+
+# Fungsi untuk menerapkan hasil undo/redo tanpa membangun ulang indeks dan statistik
+def restore_history(result):
+    """Harus dipanggil sebelum widget ukuran kapal dibuat pada run yang sama"""
+    label, state, changes = result
+    if 'decks' in state:
+        st.session_state.decks = [dict(deck, layout=dict(deck['layout']),
+                                       vehicles=[dict(record) for record in deck['vehicles']])
+                                  for deck in state['decks']]
+        st.session_state.placement_mode = state['placement_mode']
+        st.session_state.placement_seed = state['placement_seed']
+        st.session_state.grid_density = state['grid_density']
+        st.session_state.next_vehicle_id = state['next_vehicle_id']
+        switch_deck(state['active_deck'], keep_history=True)
+        return label
+    
+    if state['ship_layout'] != st.session_state.ship_layout:
+        st.session_state.ship_layout = dict(state['ship_layout'])
+        st.session_state.ship_length_input = float(state['ship_layout']['length'])
+        st.session_state.ship_width_input = float(state['ship_layout']['width'])
+        st.session_state.lane_count_input = int(state['ship_layout'].get(
+            'lanes', default_lane_count(state['ship_layout']['width'])))
+    st.session_state.grid_density = state['grid_density']
+    st.session_state.next_vehicle_id = state['next_vehicle_id']
+    
+    # Hanya kendaraan yang berubah yang diperbarui di statistik; indeks okupansi menyusul lewat sync
+    for vehicle_id, vehicle in changes.items():
+        if vehicle is None:
+            st.session_state.stability.remove(vehicle_id)
+        else:
+            st.session_state.stability.update(vehicle)
+    selected = st.session_state.selected_vehicle
+    if selected is not None and changes.get(selected['id'], selected) is None:
+        st.session_state.selected_vehicle = None
+    return label
+
+# Fungsi untuk mengganti batasan dek aktif (rintangan, jarak bebas); kendaraan yang melanggar dicarikan posisi baru
+def set_layout_constraints(label, **changes):
+    begin_history(label)
+    st.session_state.ship_layout = dict(st.session_state.ship_layout, **changes)
+    
+    # Indeks disinkronkan sekali; kendaraan yang dipindah atau dihapus diperbarui langsung di indeks
+    ship_layout = st.session_state.ship_layout
+    index = get_occupancy_index()
+    vehicles_to_remove = []
+    for vehicle in st.session_state.vehicles:
+        if fits_on_ship(vehicle, ship_layout) and not index.collides(vehicle):
+            continue
+        others = (v for v in st.session_state.vehicles if v['id'] != vehicle['id'] and v['id'] in index)
+        if find_empty_position(vehicle, ship_layout, others, st.session_state.grid_density, index=index):
+            index.update(vehicle)
+            st.session_state.stability.update(vehicle)
+            st.warning(f"{vehicle['name']} melanggar batasan baru dan dipindahkan.")
+        else:
+            index.remove(vehicle['id'])
+            st.error(f"Tidak ada ruang untuk {vehicle['name']}. Kendaraan akan dihapus.")
+            vehicles_to_remove.append(vehicle['id'])
+    
+    remove_vehicles(vehicles_to_remove)
+    commit_history()
+
+# Fungsi untuk kunci status dek saat rencana resize dibuat (rencana basi jika berubah)
+def resize_plan_key():
+    ship_layout = st.session_state.ship_layout
+    return hash((st.session_state.active_deck, obstacles_key(ship_layout.get('obstacles')),
+                 clearances_key(ship_layout.get('clearances')),
+                 frozenset((v['id'], v['x'], v['y'], v['width'], v['length']) for v in st.session_state.vehicles)))
+
+# Fungsi untuk menerapkan rencana resize (pindah dan hapus kendaraan sekaligus)
+def apply_resize(plan):
+    begin_history("Ubah ukuran kapal")
+    st.session_state.ship_layout = plan['layout']
+    st.session_state.grid_density = plan['grid_density']
+    
+    moved = {v['id']: v for v in plan['moved']}
+    for vehicle in st.session_state.vehicles:
+        if vehicle['id'] in moved:
+            vehicle['x'], vehicle['y'] = moved[vehicle['id']]['x'], moved[vehicle['id']]['y']
+            st.session_state.stability.update(vehicle)
+    remove_vehicles(plan['removed'])
+    commit_history()
+
+# Fungsi untuk kunci status semua dek saat rencana alokasi dibuat (rencana basi jika berubah)
+def allocation_plan_key():
+    return hash((st.session_state.placement_mode, st.session_state.grid_density, st.session_state.placement_seed,
+                 tuple((obstacles_key(deck['layout'].get('obstacles')), clearances_key(deck['layout'].get('clearances')),
+                        deck['layout']['length'], deck['layout']['width'], deck['layout'].get('lanes'),
+                        frozenset((v['id'], v['x'], v['y'], v['width'], v['length']) for v in deck['vehicles']))
+                       for deck in st.session_state.decks)))
+
+# Fungsi untuk menerapkan rencana alokasi manifest ke semua dek (satu langkah undo)
+def apply_allocation(plan):
+    begin_history("Alokasikan ulang manifest", ids=(), include_decks=True)
+    for deck, placed in zip(st.session_state.decks, plan['placed']):
+        deck['vehicles'] = [dict(vehicle) for vehicle in placed]
+    switch_deck(st.session_state.active_deck, keep_history=True)
+    commit_history(include_decks=True)
+
 # UI Header
 st.markdown('<h1 class="main-header">🚢 Ro-Ro Layout Planner</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Atur layout kapal Ro-Ro dengan diagram kartesius skala 1:1</p>', unsafe_allow_html=True)
@@ -536,6 +1147,193 @@ with st.expander("Klik untuk melihat penjelasan skala"):
 col1, col2, col3 = st.columns([1, 2, 1])
 
 with col1:
+    # Undo/redo di atas widget ukuran kapal: resize yang dibatalkan ikut mengubah nilai widget
+    history = st.session_state.history
+    col_undo, col_redo = st.columns(2)
+    with col_undo:
+        if st.button("↩️ Undo", use_container_width=True, disabled=not history.undo_stack,
+                     help=f"Batalkan: {history.undo_stack[-1]['label']}" if history.undo_stack else None):
+            label = restore_history(history.undo(st.session_state.vehicles))
+            st.toast(f"Dibatalkan: {label}")
+            st.rerun()
+    with col_redo:
+        if st.button("↪️ Redo", use_container_width=True, disabled=not history.redo_stack,
+                     help=f"Ulangi: {history.redo_stack[-1]['label']}" if history.redo_stack else None):
+            label = restore_history(history.redo(st.session_state.vehicles))
+            st.toast(f"Diulangi: {label}")
+            st.rerun()
+    
+    with st.expander(f"🕘 Riwayat ({len(history)} langkah, {history.nbytes / 1024:,.1f} KB)"):
+        undo_labels, redo_labels = history.labels()
+        if undo_labels or redo_labels:
+            st.dataframe(pd.DataFrame(
+                [{'Langkah': label, 'Status': "Bisa di-undo"} for label in reversed(undo_labels)] +
+                [{'Langkah': label, 'Status': "Bisa di-redo"} for label in redo_labels]
+            ), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Belum ada aksi yang tercatat.")
+        
+        col_hist1, col_hist2 = st.columns(2)
+        with col_hist1:
+            history.max_depth = st.number_input("Maks. langkah:", min_value=1, max_value=1000,
+                                                value=history.max_depth, step=10)
+        with col_hist2:
+            history.max_bytes = int(st.number_input("Maks. memori (MB):", min_value=1, max_value=1024,
+                                                    value=max(1, history.max_bytes // (1024 * 1024)),
+                                                    step=1) * 1024 * 1024)
+        history.trim()
+        st.caption("Setiap langkah hanya menyimpan kendaraan yang berubah. Langkah tertua dibuang "
+                   "jika batas jumlah atau memori terlampaui.")
+    
+    st.markdown("### 🛳️ Dek & Kapal")
+    
+    decks = st.session_state.decks
+    chosen_deck = st.selectbox(
+        "Dek Aktif:",
+        options=list(range(len(decks))),
+        format_func=lambda index: deck_label(decks[index]),
+        index=st.session_state.active_deck,
+        help="Setiap dek memiliki ukuran, kendaraan dan penempatan sendiri"
+    )
+    if chosen_deck != st.session_state.active_deck:
+        switch_deck(chosen_deck)
+        st.rerun()
+    
+    with st.expander("➕ Tambah Dek / Kapal"):
+        with st.form(key="add_deck_form"):
+            new_deck_ship = st.text_input("Nama Kapal:", value=decks[-1]['ship'])
+            new_deck_name = st.text_input("Nama Dek:", value=f"Dek {len(decks) + 1}")
+            col_deck1, col_deck2 = st.columns(2)
+            with col_deck1:
+                new_deck_length = st.number_input("Panjang Dek (m):", min_value=10.0, max_value=1000000.0,
+                                                  value=float(st.session_state.ship_layout['length']), step=1.0, format="%.1f")
+            with col_deck2:
+                new_deck_width = st.number_input("Lebar Dek (m):", min_value=5.0, max_value=1000000.0,
+                                                 value=float(st.session_state.ship_layout['width']), step=1.0, format="%.1f")
+            if st.form_submit_button("➕ Tambah Dek", use_container_width=True):
+                decks.append(new_deck(new_deck_ship, new_deck_name, new_deck_length, new_deck_width))
+                switch_deck(len(decks) - 1)
+                st.rerun()
+    
+    if len(decks) > 1 and st.button("🗑️ Hapus Dek Aktif", use_container_width=True):
+        decks.pop(st.session_state.active_deck)
+        switch_deck(0)
+        st.rerun()
+    
+    # Utilisasi per dek, per kapal dan total
+    utilization = fleet_utilization(decks)
+    if len(decks) > 1:
+        deck_df = pd.DataFrame([{
+            'Kapal': row['ship'],
+            'Dek': row['deck'],
+            'Kendaraan': row['vehicle_count'],
+            'Penggunaan (%)': round(row['usage_percentage'], 1)
+        } for row in utilization['decks']] + [{
+            'Kapal': ship,
+            'Dek': "(semua dek)",
+            'Kendaraan': row['vehicle_count'],
+            'Penggunaan (%)': round(row['usage_percentage'], 1)
+        } for ship, row in utilization['ships'].items()])
+        st.dataframe(deck_df, use_container_width=True, hide_index=True)
+        st.metric("Total Penggunaan Semua Dek", f"{utilization['total']['usage_percentage']:.2f}%",
+                  f"{utilization['total']['vehicle_count']} kendaraan", delta_color="off")
+        
+        if st.button("⚡ Alokasikan Ulang Manifest ke Semua Dek", use_container_width=True,
+                     help="Gabungkan semua kendaraan lalu bagi ke semua dek; dek besar di-packing paralel"):
+            # Dek aktif tidak disentuh sampai rencana diterapkan
+            manifest = [dict(vehicle) for deck in decks for vehicle in deck['vehicles']]
+            empty_decks = [dict(deck, vehicles=[]) for deck in decks]
+            with st.spinner("Mengalokasikan manifest..."):
+                placed_per_deck, unplaced = allocate_manifest(manifest, empty_decks, st.session_state.placement_mode,
+                                                              st.session_state.grid_density,
+                                                              seed=st.session_state.placement_seed,
+                                                              executor=get_packing_executor())
+            allocation_plan = {'placed': placed_per_deck, 'unplaced': unplaced, 'key': allocation_plan_key()}
+            if unplaced:
+                # Kendaraan akan hilang: tampilkan pratinjau dan minta konfirmasi
+                st.session_state.allocation_plan = allocation_plan
+            else:
+                st.session_state.allocation_plan = None
+                apply_allocation(allocation_plan)
+                st.rerun()
+        
+        # Pratinjau alokasi: kendaraan yang tidak mendapat tempat di dek mana pun
+        allocation_plan = st.session_state.get('allocation_plan')
+        if allocation_plan and allocation_plan['key'] != allocation_plan_key():
+            # Dek atau armada berubah sejak pratinjau dibuat; rencana tidak berlaku lagi
+            allocation_plan = st.session_state.allocation_plan = None
+        if allocation_plan:
+            with st.container(border=True):
+                st.markdown(f"**Pratinjau Alokasi:** {len(allocation_plan['unplaced'])} kendaraan "
+                            "tidak mendapat tempat di dek mana pun dan akan dihapus")
+                st.dataframe(pd.DataFrame([{
+                    'ID': vehicle['id'],
+                    'Nama': vehicle['name'],
+                    'Ukuran': f"{vehicle['length']:.1f}m × {vehicle['width']:.1f}m"
+                } for vehicle in allocation_plan['unplaced']]), use_container_width=True, hide_index=True)
+                
+                col_allocate1, col_allocate2 = st.columns(2)
+                with col_allocate1:
+                    if st.button("✅ Terapkan Alokasi", use_container_width=True, type="primary"):
+                        apply_allocation(allocation_plan)
+                        st.session_state.allocation_plan = None
+                        st.rerun()
+                with col_allocate2:
+                    if st.button("❌ Batalkan Alokasi", use_container_width=True):
+                        st.session_state.allocation_plan = None
+                        st.rerun()
+    
+    # Arsip pelayaran (SQLite): simpan semua dek, muat kembali pelayaran lama
+    with st.expander("🗄️ Arsip Pelayaran"):
+        voyage_store = get_voyage_store()
+        voyages = voyage_store.list_voyages()
+        with st.form(key="save_voyage_form"):
+            voyage_ship = st.text_input("Kapal:", value=decks[0]['ship'])
+            voyage_name = st.text_input("Nama Pelayaran:", value=f"Pelayaran {voyages[0]['id'] + 1 if voyages else 1}")
+            voyage_departure = st.text_input("Keberangkatan:", placeholder="mis. 2024-05-01 06:00")
+            if st.form_submit_button("💾 Simpan Pelayaran", use_container_width=True):
+                voyage_id = voyage_store.save_voyage(voyage_ship, voyage_name, decks, layout_settings(),
+                                                     voyage_departure or None)
+                st.success(f"Pelayaran #{voyage_id} tersimpan")
+                voyages = voyage_store.list_voyages()
+        
+        if voyages:
+            chosen_voyage = st.selectbox(
+                "Pelayaran Tersimpan:",
+                options=[voyage['id'] for voyage in voyages],
+                format_func=lambda voyage_id: next(
+                    f"#{v['id']} {v['ship']} – {v['name']} ({v['vehicle_count']} kendaraan)"
+                    for v in voyages if v['id'] == voyage_id)
+            )
+            col_voyage1, col_voyage2 = st.columns(2)
+            with col_voyage1:
+                if st.button("📂 Muat", use_container_width=True):
+                    load_voyage(chosen_voyage)
+                    st.rerun()
+            with col_voyage2:
+                if st.button("🗑️ Hapus", key="delete_voyage", use_container_width=True):
+                    voyage_store.delete_voyage(chosen_voyage)
+                    st.rerun()
+            
+            # Query spasial lewat R*Tree: kendaraan di rentang frame tertentu
+            col_frame1, col_frame2 = st.columns(2)
+            with col_frame1:
+                frame_from = st.number_input("Frame dari (m):", min_value=0.0, value=0.0, step=1.0)
+            with col_frame2:
+                frame_to = st.number_input("Frame sampai (m):", min_value=0.0, value=20.0, step=1.0)
+            in_frames = voyage_store.vehicles_in_frames(chosen_voyage, frame_from, frame_to)
+            st.caption(f"{len(in_frames)} kendaraan di frame {frame_from:.0f}–{frame_to:.0f} m")
+            if in_frames:
+                st.dataframe(pd.DataFrame([{
+                    'Dek': v['deck'] + 1,
+                    'Kendaraan': f"{v['icon']} {v['name']}",
+                    'Posisi': f"({v['x']:.1f}, {v['y']:.1f})"
+                } for v in in_frames[:200]]), use_container_width=True, hide_index=True)
+        else:
+            st.caption("Belum ada pelayaran tersimpan")
+    
+    st.divider()
+    
     st.markdown("### ⚙️ Kontrol Layout Kapal")
     
     # Kontrol density grid
@@ -557,7 +1355,6 @@ with col1:
         "Panjang Kapal (meter):", 
         min_value=10.0, 
         max_value=1000000.0, 
-        value=float(st.session_state.ship_layout['length']), 
         step=1.0, 
         key="ship_length_input", 
         format="%.1f",
@@ -568,13 +1365,57 @@ with col1:
         "Lebar Kapal (meter):", 
         min_value=5.0, 
         max_value=1000000.0, 
-        value=float(st.session_state.ship_layout['width']), 
         step=1.0, 
         key="ship_width_input", 
         format="%.1f",
         help="Masukkan lebar kapal dalam meter (5 - 1.000.000 meter)"
     )
     
+    lane_count = st.number_input(
+        "Jumlah Lajur:", 
+        min_value=1, 
+        max_value=10000, 
+        step=1, 
+        key="lane_count_input",
+        help="Lebar kapal dibagi rata menjadi lajur-lajur untuk mode lajur"
+    )
+    
+    # Mode penempatan kendaraan
+    placement_modes = {'grid': "Grid 2-D (bebas)", 'lane': "Lajur 1-D (lane-metre)"}
+    st.session_state.placement_mode = st.radio(
+        "Mode Penempatan:",
+        options=list(placement_modes.keys()),
+        format_func=placement_modes.get,
+        index=list(placement_modes.keys()).index(st.session_state.placement_mode),
+        horizontal=True,
+        help="Mode lajur mengisi setiap lajur dari depan ke belakang (best-fit), jauh lebih cepat untuk manifest besar"
+    )
+    
+    placement_objectives = {'random': "Acak", 'balance': "Keseimbangan berat"}
+    st.session_state.placement_objective = st.selectbox(
+        "Objektif Penempatan (mode grid):",
+        options=list(placement_objectives.keys()),
+        format_func=placement_objectives.get,
+        index=list(placement_objectives.keys()).index(st.session_state.placement_objective),
+        help="Keseimbangan berat menempatkan kendaraan baru sedekat mungkin ke posisi yang membawa CoG ke tengah dek"
+    )
+    
+    st.session_state.port_order_placement = st.checkbox(
+        "Urutkan menurut pelabuhan bongkar",
+        value=st.session_state.port_order_placement,
+        help="Kendaraan pelabuhan akhir ditempatkan lebih dalam (ke arah haluan) dan tidak boleh menghalangi pelabuhan lebih awal"
+    )
+    
+    st.session_state.placement_seed = int(st.number_input(
+        "Seed Penempatan:",
+        min_value=0,
+        value=int(st.session_state.placement_seed),
+        step=1,
+        help="Manifest dan seed yang sama selalu menghasilkan layout yang sama"
+    ))
+    placement_cache = get_placement_cache()
+    st.caption(f"Cache penempatan: {len(placement_cache)} entri · {placement_cache.hits} hit / {placement_cache.misses} miss")
+    
     # Tampilkan ukuran kapal dengan format yang mudah dibaca
     st.markdown('<div class="ship-size-display">', unsafe_allow_html=True)
     st.markdown(f'<div class="size-label">Ukuran Kapal Saat Ini</div>', unsafe_allow_html=True)
@@ -593,69 +1434,168 @@ with col1:
     
     # Update layout kapal
     if st.button("🔄 Update Layout Kapal", use_container_width=True, type="primary"):
-        st.session_state.ship_layout = {
+        new_layout = {
             'length': float(ship_length),
-            'width': float(ship_width)
+            'width': float(ship_width),
+            'lanes': int(lane_count),
+            'obstacles': st.session_state.ship_layout.get('obstacles', []),
+            'clearances': st.session_state.ship_layout.get('clearances')
         }
-        st.session_state.grid_density = float(grid_density)
-        
-        # Periksa apakah kendaraan masih muat
-        vehicles_to_remove = []
-        for vehicle in st.session_state.vehicles:
-            if not fits_on_ship(vehicle, st.session_state.ship_layout):
-                st.warning(f"Kendaraan {vehicle['name']} tidak muat setelah resize kapal!")
-                # Cari posisi baru
-                if not find_empty_position(vehicle, st.session_state.ship_layout, 
-                                         [v for v in st.session_state.vehicles if v['id'] != vehicle['id']]):
-                    st.error(f"Tidak ada ruang untuk {vehicle['name']}. Kendaraan akan dihapus.")
-                    vehicles_to_remove.append(vehicle['id'])
-        
-        # Hapus kendaraan yang tidak muat
-        for vehicle_id in vehicles_to_remove:
-            remove_vehicle(vehicle_id)
+        # Kendaraan yang keluar batas dicari sekaligus dan ditempatkan ulang dalam satu pass pengepakan
+        moved, removed = plan_resize(new_layout, st.session_state.vehicles, st.session_state.placement_mode,
+                                     float(grid_density), st.session_state.placement_seed)
+        resize_plan = {
+            'layout': new_layout,
+            'grid_density': float(grid_density),
+            'moved': moved,
+            'removed': removed,
+            'key': resize_plan_key()
+        }
+        if moved or removed:
+            # Tampilkan pratinjau dulu; layout baru diterapkan setelah dikonfirmasi
+            st.session_state.resize_plan = resize_plan
+        else:
+            st.session_state.resize_plan = None
+            apply_resize(resize_plan)
+            st.success("Layout kapal berhasil diupdate!")
+            st.rerun()
+    
+    # Pratinjau resize: kendaraan yang dipindah dan yang dihapus
+    resize_plan = st.session_state.get('resize_plan')
+    if resize_plan and resize_plan['key'] != resize_plan_key():
+        # Dek atau armada berubah sejak pratinjau dibuat; rencana tidak berlaku lagi
+        resize_plan = st.session_state.resize_plan = None
+    if resize_plan:
+        new_layout = resize_plan['layout']
+        with st.container(border=True):
+            st.markdown(f"**Pratinjau Resize:** {new_layout['length']:,.1f}m × {new_layout['width']:,.1f}m")
+            col_plan1, col_plan2 = st.columns(2)
+            with col_plan1:
+                st.metric("Dipindah", len(resize_plan['moved']))
+            with col_plan2:
+                st.metric("Dihapus", len(resize_plan['removed']))
+            
+            current = {v['id']: v for v in st.session_state.vehicles}
+            plan_rows = [{
+                'ID': v['id'],
+                'Nama': v['name'],
+                'Posisi Lama': f"({current[v['id']]['x']:.1f}, {current[v['id']]['y']:.1f})",
+                'Posisi Baru': f"({v['x']:.1f}, {v['y']:.1f})"
+            } for v in resize_plan['moved']]
+            plan_rows += [{
+                'ID': vehicle_id,
+                'Nama': current[vehicle_id]['name'],
+                'Posisi Lama': f"({current[vehicle_id]['x']:.1f}, {current[vehicle_id]['y']:.1f})",
+                'Posisi Baru': "Dihapus (tidak muat)"
+            } for vehicle_id in resize_plan['removed']]
+            st.dataframe(pd.DataFrame(plan_rows), use_container_width=True, hide_index=True)
+            
+            col_confirm1, col_confirm2 = st.columns(2)
+            with col_confirm1:
+                if st.button("✅ Terapkan Resize", use_container_width=True, type="primary"):
+                    apply_resize(resize_plan)
+                    st.session_state.resize_plan = None
+                    st.success("Layout kapal berhasil diupdate!")
+                    st.rerun()
+            with col_confirm2:
+                if st.button("❌ Batalkan", use_container_width=True):
+                    st.session_state.resize_plan = None
+                    st.rerun()
+    
+    # Rintangan tetap dan zona larangan dek aktif
+    obstacles = st.session_state.ship_layout.get('obstacles') or []
+    with st.expander(f"🚧 Rintangan & Zona Larangan ({len(obstacles)})"):
+        if obstacles:
+            st.dataframe(pd.DataFrame([{
+                'Nama': obstacle['name'],
+                'Jenis': OBSTACLE_KINDS[obstacle['kind']],
+                'Titik': "; ".join(f"{x:g},{y:g}" for x, y in obstacle['points'])
+            } for obstacle in obstacles]), use_container_width=True, hide_index=True)
+            
+            removed_obstacles = st.multiselect("Hapus rintangan:", options=list(range(len(obstacles))),
+                                               format_func=lambda index: obstacles[index]['name'])
+            if removed_obstacles and st.button("🗑️ Hapus Rintangan Terpilih", use_container_width=True):
+                set_layout_constraints("Hapus rintangan", obstacles=[obstacle for index, obstacle in enumerate(obstacles)
+                                                                     if index not in removed_obstacles])
+                st.rerun()
         
-        st.success("Layout kapal berhasil diupdate!")
-        st.rerun()
+        with st.form(key="add_obstacle_form"):
+            obstacle_name = st.text_input("Nama:", value=f"Rintangan {len(obstacles) + 1}")
+            obstacle_kind = st.selectbox("Jenis:", options=list(OBSTACLE_KINDS.keys()), format_func=OBSTACLE_KINDS.get)
+            col_obstacle1, col_obstacle2 = st.columns(2)
+            with col_obstacle1:
+                obstacle_x = st.number_input("X (m):", min_value=0.0, value=0.0, step=0.5, format="%.1f")
+                obstacle_width = st.number_input("Lebar (m):", min_value=0.1, value=1.0, step=0.5, format="%.1f")
+            with col_obstacle2:
+                obstacle_y = st.number_input("Y (m):", min_value=0.0, value=0.0, step=0.5, format="%.1f")
+                obstacle_length = st.number_input("Panjang (m):", min_value=0.1, value=1.0, step=0.5, format="%.1f")
+            obstacle_points = st.text_input("Atau poligon (x,y; x,y; x,y):", value="",
+                                            help="Jika diisi, poligon dipakai sebagai ganti persegi di atas")
+            
+            if st.form_submit_button("➕ Tambah Rintangan", use_container_width=True):
+                try:
+                    if obstacle_points.strip():
+                        obstacle = new_obstacle(obstacle_name, parse_points(obstacle_points), obstacle_kind)
+                    else:
+                        obstacle = rectangle_obstacle(obstacle_name, obstacle_x, obstacle_y,
+                                                      obstacle_width, obstacle_length, obstacle_kind)
+                except ValueError as error:
+                    st.error(f"Rintangan tidak valid: {error}")
+                else:
+                    set_layout_constraints(f"Tambah {obstacle['name']}", obstacles=obstacles + [obstacle])
+                    st.rerun()
+        st.caption("Rintangan dirasterisasi sekali per definisi kapal dan menjadi entri permanen indeks "
+                   "okupansi, sehingga setiap penempatan dan pergeseran otomatis menghindarinya.")
+    
+    # Jarak bebas per tipe kendaraan (pintu pengemudi, celah lashing)
+    clearances = st.session_state.ship_layout.get('clearances')
+    with st.expander(f"📏 Jarak Bebas ({'aktif' if clearances else 'nonaktif'})"):
+        with st.form(key="clearance_form"):
+            clearance_enabled = st.checkbox("Aktifkan jarak bebas", value=bool(clearances))
+            shown_clearances = clearances or DEFAULT_CLEARANCES
+            clearance_df = st.data_editor(pd.DataFrame([{
+                'Tipe': vehicle_type,
+                'Depan/Belakang (m)': shown_clearances.get(vehicle_type, DEFAULT_CLEARANCES[vehicle_type])[0],
+                'Samping (m)': shown_clearances.get(vehicle_type, DEFAULT_CLEARANCES[vehicle_type])[1]
+            } for vehicle_type in DEFAULT_CLEARANCES]), disabled=['Tipe'], hide_index=True,
+                use_container_width=True, key="clearance_table")
+            
+            if st.form_submit_button("💾 Terapkan Jarak Bebas", use_container_width=True):
+                new_clearances = None
+                if clearance_enabled:
+                    new_clearances = normalize_clearances({
+                        row['Tipe']: (max(0.0, row['Depan/Belakang (m)']), max(0.0, row['Samping (m)']))
+                        for row in clearance_df.to_dict('records')
+                    })
+                set_layout_constraints("Ubah jarak bebas", clearances=new_clearances)
+                st.rerun()
+        st.caption("Tepi dek dan rintangan mendapat jarak bebas penuh setiap kendaraan; celah antar dua "
+                   "kendaraan minimal jarak bebas yang lebih besar dari keduanya. "
+                   "Kendaraan yang melanggar dicarikan posisi baru.")
     
     st.divider()
     
     st.markdown("### 🚗 Kendaraan Tersedia")
     st.markdown("Pilih kendaraan untuk ditambahkan:")
     
-    # Kendaraan default dengan ukuran sebenarnya
-    col_veh1, col_veh2 = st.columns(2)
-    
-    with col_veh1:
-        if st.button(f"🏍️ Motor\n2.0m × 0.8m", 
-                    use_container_width=True, 
-                    help="Motor: Panjang 2.0m, Lebar 0.8m"):
-            add_vehicle("Motor", 2.0, 0.8, "motor", "🏍️")
-            st.rerun()
-        
-        if st.button(f"🚗 Mobil Sedang\n5.0m × 2.0m", 
-                    use_container_width=True, 
-                    help="Mobil Sedang: Panjang 5.0m, Lebar 2.0m"):
-            add_vehicle("Mobil Sedang", 5.0, 2.0, "car", "🚗")
-            st.rerun()
-    
-    with col_veh2:
-        if st.button(f"🚙 Mobil Kecil\n4.5m × 1.8m", 
-                    use_container_width=True, 
-                    help="Mobil Kecil: Panjang 4.5m, Lebar 1.8m"):
-            add_vehicle("Mobil Kecil", 4.5, 1.8, "car", "🚙")
-            st.rerun()
-        
-        if st.button(f"🚚 Truk\n10.0m × 2.5m", 
-                    use_container_width=True, 
-                    help="Truk: Panjang 10.0m, Lebar 2.5m"):
-            add_vehicle("Truk", 10.0, 2.5, "truck", "🚚")
-            st.rerun()
+    target_port = st.number_input(
+        "Pelabuhan Bongkar (urutan):", 
+        min_value=1, max_value=50, value=1, step=1,
+        help="Urutan pelabuhan tujuan kendaraan berikutnya (1 = pelabuhan pertama)"
+    )
     
-    if st.button(f"🚌 Bus\n12.0m × 2.5m", 
-                use_container_width=True, 
-                help="Bus: Panjang 12.0m, Lebar 2.5m"):
-        add_vehicle("Bus", 12.0, 2.5, "bus", "🚌")
-        st.rerun()
+    # Kendaraan default dengan ukuran sebenarnya (template bersama dari catalog.py)
+    col_veh1, col_veh2 = st.columns(2)
+    preset_slots = [col_veh1, col_veh1, col_veh2, col_veh2, st.container()]
+    
+    for preset_slot, preset in zip(preset_slots, VEHICLE_PRESETS):
+        with preset_slot:
+            if st.button(f"{preset['icon']} {preset['name']}\n{preset['length']}m × {preset['width']}m",
+                         use_container_width=True,
+                         help=f"{preset['name']}: Panjang {preset['length']}m, Lebar {preset['width']}m"):
+                add_vehicle(preset['name'], preset['length'], preset['width'], preset['type'], preset['icon'],
+                            port=target_port)
+                st.rerun()
     
     st.divider()
     
@@ -675,9 +1615,175 @@ with col1:
     with col_custom2:
         custom_icon = st.selectbox("Ikon:", ["🏍️", "🚗", "🚙", "🚚", "🚌", "🚐", "🛻"])
     
+    custom_weight = st.number_input("Berat (ton):", min_value=0.0, max_value=500.0, 
+                                    value=float(DEFAULT_WEIGHTS[custom_type]), step=0.1, format="%.2f",
+                                    key=f"custom_weight_{custom_type}",
+                                    help="Bawaan mengikuti berat tipik tipe kendaraan")
+    
     if st.button("➕ Tambah Kendaraan Kustom", use_container_width=True):
-        add_vehicle(custom_name, custom_length, custom_width, custom_type, custom_icon)
+        add_vehicle(custom_name, custom_length, custom_width, custom_type, custom_icon, custom_weight,
+                    port=target_port)
+        st.rerun()
+    
+    st.divider()
+    
+    st.markdown("### 📦 Sisa Kapasitas per Tipe")
+    capacity_rows = estimate_remaining_capacity(custom_length, custom_width)
+    capacity_df = pd.DataFrame([{
+        'Tipe': f"{VEHICLE_ICONS[row['type']]} {row['name']}",
+        'Ukuran': f"{row['length']}m × {row['width']}m",
+        'Batas Atas': row['upper_bound'],
+        'Estimasi': '…' if row['simulated'] is None else (f"±{row['simulated']}" if row['pending'] else str(row['simulated']))
+    } for row in capacity_rows])
+    st.dataframe(capacity_df, use_container_width=True, hide_index=True)
+    st.caption("Batas atas dihitung instan dari luas/lajur bebas. Estimasi berasal dari simulasi packing "
+               "di latar belakang; tanda ± berarti simulasi sedang diperbarui.")
+    if st.button("🔄 Perbarui Estimasi", use_container_width=True):
         st.rerun()
+    
+    # Simulasi booking Monte Carlo: campuran kendaraan yang datang tidak pasti
+    with st.expander("🎲 Simulasi Booking (Monte Carlo)"):
+        default_bookings = {'motor': (40, 95, 0.0), 'car': (150, 90, 0.5), 'truck': (30, 85, 1.5), 'bus': (10, 95, 0.5)}
+        booking_df = st.data_editor(pd.DataFrame([{
+            'Tipe': vehicle_type,
+            'Booking': booked,
+            'Hadir (%)': show_rate,
+            'Panjang (m)': VEHICLE_CATALOG[vehicle_type]['length'],
+            'Lebar (m)': VEHICLE_CATALOG[vehicle_type]['width'],
+            'SD Panjang (m)': length_sd
+        } for vehicle_type, (booked, show_rate, length_sd) in default_bookings.items()]),
+            disabled=['Tipe'], hide_index=True, use_container_width=True, key="booking_mix")
+        simulations = st.number_input("Jumlah pelayaran simulasi:", min_value=100, max_value=20000,
+                                      value=1000, step=100)
+        
+        if st.button("▶️ Jalankan Simulasi", use_container_width=True):
+            specs = [booking_spec(row['Tipe'], row['Booking'], row['Hadir (%)'] / 100, row['Panjang (m)'],
+                                  row['Lebar (m)'], row['SD Panjang (m)'])
+                     for row in booking_df.to_dict('records')]
+            with st.spinner(f"Mensimulasikan {simulations:,} pelayaran..."):
+                arrived, fitted = simulate_bookings(st.session_state.ship_layout, specs, int(simulations),
+                                                    st.session_state.vehicles, st.session_state.placement_mode,
+                                                    st.session_state.grid_density, st.session_state.placement_seed)
+            st.session_state.booking_result = summarize(specs, arrived, fitted)
+        
+        booking_result = st.session_state.get('booking_result')
+        if booking_result and booking_result['simulations']:
+            col_risk1, col_risk2 = st.columns(2)
+            with col_risk1:
+                st.metric("Risiko Overbooking", f"{booking_result['overbooking_risk'] * 100:.1f}%",
+                          help="Peluang setidaknya satu kendaraan yang datang tidak mendapat tempat")
+            with col_risk2:
+                st.metric("Muat (median)", f"{booking_result['fitted_percentiles'][50]:.0f}",
+                          help=f"P5–P95: {booking_result['fitted_percentiles'][5]:.0f}–"
+                               f"{booking_result['fitted_percentiles'][95]:.0f} kendaraan")
+            
+            fig_booking = px.histogram(x=booking_result['fitted_total'], nbins=30,
+                                       labels={'x': "Kendaraan yang muat"})
+            fig_booking.update_layout(height=220, margin=dict(l=0, r=0, t=10, b=0), yaxis_title="Pelayaran")
+            st.plotly_chart(fig_booking, use_container_width=True)
+            
+            st.dataframe(pd.DataFrame([{
+                'Tipe': f"{VEHICLE_ICONS.get(row['type'], '🚙')} {row['type']}",
+                'Booking': row['booked'],
+                'Datang': f"{row['arrived_mean']:.1f}",
+                'Muat': f"{row['fitted_mean']:.1f}",
+                'Ditolak': f"{row['denied_mean']:.1f}",
+                'Risiko': f"{row['denied_risk'] * 100:.1f}%"
+            } for row in booking_result['per_type']]), use_container_width=True, hide_index=True)
+            st.caption(f"{booking_result['simulations']:,} pelayaran; kendaraan datang dalam urutan acak dan "
+                       "dimuat satu per satu di atas kendaraan yang sudah ada di dek aktif.")
+    
+    # Mode muat online: kendaraan dari antrian kedatangan langsung diarahkan ke posisi
+    with st.expander("🚦 Antrian Kedatangan (Online)"):
+        arrival_sources = {'file': "File", 'replay': "Socket lokal (putar ulang file)", 'socket': "Socket (host:port)"}
+        arrival_source = st.radio("Sumber antrian:", options=list(arrival_sources.keys()),
+                                  format_func=arrival_sources.get)
+        arrival_file = None
+        socket_address = None
+        if arrival_source == 'socket':
+            socket_address = st.text_input("Alamat socket:", value="127.0.0.1:9500",
+                                           help="Satu objek JSON per baris: name, type, length, width, weight, port")
+        else:
+            arrival_file = st.file_uploader("File kedatangan (CSV/JSON)", type=["csv", "json", "jsonl"],
+                                            key="arrival_file")
+        col_online1, col_online2 = st.columns(2)
+        with col_online1:
+            lookahead = st.number_input("Lookahead:", min_value=0, max_value=20, value=3, step=1,
+                                        help="Jumlah kendaraan antrian yang dilihat sebelum memutuskan kendaraan terdepan")
+        with col_online2:
+            budget_ms = st.number_input("Anggaran (ms):", min_value=0.5, max_value=100.0, value=5.0, step=0.5,
+                                        help="Target waktu penilaian kandidat per kendaraan; keputusan yang melewatinya dilaporkan")
+        compare_offline = st.checkbox("Bandingkan dengan referensi offline", value=False,
+                                      help="Packing ulang seluruh kedatangan sekaligus; lebih lambat untuk antrian besar")
+        
+        if st.button("🚦 Muat Antrian", use_container_width=True):
+            if arrival_source == 'socket':
+                host, _, port = socket_address.strip().rpartition(':')
+                if port.isdigit() and 0 < int(port) < 65536:
+                    arrivals = iter_socket_arrivals(host or '127.0.0.1', int(port))
+                else:
+                    arrivals = None
+                    st.error("Alamat socket harus berformat host:port dengan port 1-65535.")
+            elif arrival_file is not None:
+                try:
+                    arrivals = parse_arrivals(arrival_file.getvalue().decode("utf-8"))
+                except (ValueError, KeyError) as error:
+                    arrivals = None
+                    st.error(f"File kedatangan gagal dibaca: {error}")
+                else:
+                    if arrival_source == 'replay':
+                        arrivals = iter_socket_arrivals(*start_replay_server(arrivals))
+            else:
+                arrivals = None
+                st.warning("Pilih file kedatangan terlebih dahulu.")
+            
+            if arrivals is not None:
+                loader = OnlineLoader(st.session_state.ship_layout, st.session_state.vehicles,
+                                      st.session_state.placement_mode, st.session_state.grid_density,
+                                      lookahead, budget_ms)
+                try:
+                    consumed = run_stream(arrivals, loader)
+                except (OSError, ValueError, KeyError) as error:
+                    st.error(f"Antrian kedatangan gagal dibaca: {error}")
+                else:
+                    begin_history("Muat antrian kedatangan")
+                    for vehicle in loader.placed:
+                        vehicle.update({
+                            'id': st.session_state.next_vehicle_id,
+                            'color': get_random_color(),
+                            'icon': VEHICLE_ICONS.get(vehicle['type'], '🚙'),
+                            'weight': vehicle['weight'] if vehicle['weight'] is not None
+                                      else DEFAULT_WEIGHTS.get(vehicle['type'], DEFAULT_WEIGHTS['custom'])
+                        })
+                        vehicle = intern_vehicle(vehicle)
+                        st.session_state.vehicles.append(vehicle)
+                        st.session_state.stability.add(vehicle)
+                        st.session_state.next_vehicle_id += 1
+                    commit_history()
+                    st.session_state.online_report = loader.report(consumed, compare_offline)
+                    st.rerun()
+        
+        online_report = st.session_state.get('online_report')
+        if online_report:
+            latency = online_report['latency']
+            col_report1, col_report2 = st.columns(2)
+            with col_report1:
+                st.metric("Ditempatkan", f"{online_report['placed']}",
+                          delta=f"-{online_report['rejected']} ditolak" if online_report['rejected'] else None,
+                          delta_color="inverse")
+                offline_note = (f"Offline: {online_report['offline_utilization']:.1f}% · "
+                                if 'offline_utilization' in online_report else "")
+                st.metric("Utilisasi", f"{online_report['utilization']:.1f}%",
+                          help=f"{offline_note}batas atas luas: {online_report['area_bound_utilization']:.1f}%")
+            with col_report2:
+                st.metric("Latensi p95", f"{latency.get('p95', 0):.2f} ms",
+                          help=f"p50 {latency.get('p50', 0):.2f} · p99 {latency.get('p99', 0):.2f} · "
+                               f"maks {latency.get('max', 0):.2f} ms")
+                if 'online_vs_offline' in online_report:
+                    st.metric("vs Offline", f"{online_report['online_vs_offline']:.1f}%",
+                              help=f"Offline menempatkan {online_report['offline_placed']} kendaraan dengan seluruh manifest diketahui")
+            if online_report['over_budget']:
+                st.caption(f"⚠️ {online_report['over_budget']} keputusan melewati anggaran waktu")
 
 with col2:
     st.markdown("### 🗺️ Layout Kapal")
@@ -694,10 +1800,43 @@ with col2:
         3. Kendaraan kecil mungkin tidak terlihat detailnya
         """)
     
+    # Analisis urutan bongkar (ramp di buritan, Y = panjang kapal)
+    show_discharge = st.toggle("🚪 Analisis urutan bongkar", value=False,
+                               help="Bangun graf kendaraan yang menghalangi jalan ke ramp buritan")
+    discharge = analyse_discharge(st.session_state.vehicles) if show_discharge else None
+    
+    # Kendaraan hasil impor yang melanggar batasan (hanya yang masih melanggar)
+    violation_ids = st.session_state.get('layout_violations', {}).get(st.session_state.active_deck, set())
+    violating = [v for v in st.session_state.vehicles if v['id'] in violation_ids and not position_is_valid(v)]
+    if violating:
+        st.warning(f"{len(violating)} kendaraan hasil impor keluar batas kapal, menimpa rintangan atau kurang "
+                   f"jarak bebas: {', '.join(v['name'] for v in violating[:10])}"
+                   f"{' …' if len(violating) > 10 else ''}")
+        if st.button("🔧 Tempatkan Ulang Kendaraan Bermasalah", use_container_width=True):
+            set_layout_constraints("Perbaiki pelanggaran impor")
+            st.rerun()
+    
     # Hanya tampilkan diagram grid sederhana
-    fig = create_grid_diagram()
+    highlight_ids = {v['id'] for v in violating} | (discharge['must_shift'] if discharge else set())
+    fig = get_grid_diagram(highlight_ids)
     st.plotly_chart(fig, use_container_width=True)
     
+    if discharge:
+        vehicle_names = {v['id']: v['name'] for v in st.session_state.vehicles}
+        st.markdown(f"**Kedalaman bongkar maksimum:** {max(discharge['depth'].values(), default=0)} lapis · "
+                    f"**Harus digeser:** {len(discharge['must_shift'])} kendaraan (garis merah) · "
+                    f"**Terhalang pelabuhan lain:** {len(discharge['blocked'])} kendaraan")
+        discharge_df = pd.DataFrame([{
+            'ID': v['id'],
+            'Nama': v['name'],
+            'Pelabuhan': vehicle_port(v),
+            'Kedalaman': discharge['depth'][v['id']],
+            'Dihalangi Oleh': ", ".join(f"{vehicle_names[b]} ({b})" for b in discharge['blockers'][v['id']]),
+            'Status': "Harus digeser" if v['id'] in discharge['must_shift']
+                      else ("Terhalang" if v['id'] in discharge['blocked'] else "OK")
+        } for v in sorted(st.session_state.vehicles, key=lambda v: discharge['depth'][v['id']])])
+        st.dataframe(discharge_df, use_container_width=True, hide_index=True)
+    
     # Statistik kapal
     stats = calculate_statistics()
     
@@ -736,6 +1875,45 @@ with col2:
             if len(st.session_state.vehicles) > 10:
                 st.info(f"Menampilkan 10 dari {len(st.session_state.vehicles)} kendaraan. Gunakan tabel di bawah untuk melihat semua.")
     
+    # Berat dan titik berat
+    st.markdown("### ⚖️ Berat & Titik Berat (CoG)")
+    stability_summary = st.session_state.stability.summary(ship_layout)
+    col_cog1, col_cog2, col_cog3, col_cog4 = st.columns(4)
+    with col_cog1:
+        st.metric("Total Berat", f"{stability_summary['total_mass']:,.1f} t")
+    with col_cog2:
+        lcg_text = "-" if stability_summary['lcg'] is None else f"{stability_summary['lcg']:,.1f} m"
+        st.metric("LCG (dari depan)", lcg_text, f"{stability_summary['trim_lever']:+.2f} m dari tengah",
+                  delta_color="off")
+    with col_cog3:
+        tcg_text = "-" if stability_summary['tcg'] is None else f"{stability_summary['tcg']:,.1f} m"
+        st.metric("TCG (dari kiri)", tcg_text, f"{stability_summary['heel_lever']:+.2f} m dari tengah",
+                  delta_color="off")
+    with col_cog4:
+        max_axle = max((axle_load(v) for v in st.session_state.vehicles), default=0.0)
+        st.metric("Beban Gandar Maks", f"{max_axle:.2f} t")
+    
+    trim_direction = "belakang" if stability_summary['trim_moment'] > 0 else "depan"
+    heel_direction = "kanan" if stability_summary['heel_moment'] > 0 else "kiri"
+    st.caption(f"Momen trim: {abs(stability_summary['trim_moment']):,.1f} t·m ke arah {trim_direction} · "
+               f"Momen heel: {abs(stability_summary['heel_moment']):,.1f} t·m ke arah {heel_direction}")
+    
+    # Lane-metre per lajur (mode lajur)
+    if st.session_state.placement_mode == 'lane':
+        st.markdown("### 🛣️ Penggunaan Lajur (Lane-Metre)")
+        lane_usage = calculate_lane_usage()
+        total_lane_metres = sum(lane['lane_metres_used'] for lane in lane_usage)
+        st.markdown(f"**Total Lane-Metre Terpakai:** {total_lane_metres:,.1f} m dari "
+                    f"{len(lane_usage) * ship_layout['length']:,.1f} m")
+        lane_df = pd.DataFrame([{
+            'Lajur': lane['lane'],
+            'Kendaraan': lane['vehicles'],
+            'Terpakai (m)': round(lane['lane_metres_used'], 1),
+            'Sisa (m)': round(lane['lane_metres_free'], 1),
+            'Penggunaan (%)': round(lane['usage_percentage'], 1)
+        } for lane in lane_usage])
+        st.dataframe(lane_df, use_container_width=True, hide_index=True)
+    
     # Statistik per tipe kendaraan
     if stats['vehicle_types']:
         st.markdown("### 📈 Distribusi Kendaraan")
@@ -767,6 +1945,22 @@ with col2:
         selected_vehicle = next(v for v in st.session_state.vehicles if v['id'] == selected_vehicle_id)
         st.session_state.selected_vehicle = selected_vehicle
         
+        # Opsi geser: sampai menempel dan snap ke tetangga terdekat
+        st.markdown("**Opsi Geser:**")
+        col_opt1, col_opt2 = st.columns(2)
+        with col_opt1:
+            slide_to_contact = st.toggle("Geser sampai menempel", value=False,
+                                         help="Tombol arah mengabaikan langkah dan menggeser kendaraan sampai "
+                                              "menyentuh kendaraan lain, rintangan atau tepi dek")
+        with col_opt2:
+            snap_enabled = st.toggle("🧲 Snap ke tetangga terdekat", value=False,
+                                     help="Setelah dipindah, kendaraan dirapatkan ke kendaraan, rintangan atau "
+                                          "tepi dek terdekat dalam jarak snap")
+        snap_distance = 0.0
+        if snap_enabled:
+            snap_distance = st.number_input("Jarak snap (m):", min_value=0.1, max_value=1000.0, value=2.0,
+                                            step=0.5, format="%.1f")
+        
         # Input koordinat manual
         st.markdown("**Atur Posisi Manual:**")
         col_pos1, col_pos2 = st.columns(2)
@@ -794,6 +1988,7 @@ with col2:
             )
         
         if st.button("📍 Pindah ke Posisi", use_container_width=True):
+            begin_history(f"Pindah {selected_vehicle['name']}", ids=[selected_vehicle_id])
             # Simpan posisi lama
             old_x, old_y = selected_vehicle['x'], selected_vehicle['y']
             
@@ -803,11 +1998,16 @@ with col2:
             
             # Cek tabrakan dan batas
             collision = False
+            index = get_occupancy_index()
+            colliding_ids = index.conflicts(selected_vehicle, exclude_id=selected_vehicle_id)
             for vehicle in st.session_state.vehicles:
-                if vehicle['id'] != selected_vehicle_id and check_collision(selected_vehicle, vehicle):
+                if vehicle['id'] in colliding_ids:
                     collision = True
-                    st.warning(f"Tabrakan dengan {vehicle['name']}!")
+                    st.warning(f"Tabrakan (atau jarak bebas kurang) dengan {vehicle['name']}!")
                     break
+            if not collision and index.hits_obstacle(*index.footprint(selected_vehicle)):
+                collision = True
+                st.warning("Posisi menimpa rintangan atau zona larangan!")
             
             if not fits_on_ship(selected_vehicle, st.session_state.ship_layout):
                 st.error("Posisi di luar batas kapal!")
@@ -815,7 +2015,11 @@ with col2:
             elif collision:
                 selected_vehicle['x'], selected_vehicle['y'] = old_x, old_y
             else:
+                if snap_enabled:
+                    snap_vehicle(selected_vehicle, snap_distance)
                 st.success("Posisi berhasil diubah!")
+            st.session_state.stability.update(selected_vehicle)
+            commit_history()
             st.rerun()
         
         # Tombol kontrol arah
@@ -824,38 +2028,128 @@ with col2:
         
         move_step = st.slider("Langkah pergerakan (meter):", 1.0, 100.0, 10.0, 1.0)
         
-        with col_move1:
-            if st.button("⬆️ Maju", use_container_width=True):
-                selected_vehicle['y'] += move_step
-                if not fits_on_ship(selected_vehicle, st.session_state.ship_layout) or any(check_collision(selected_vehicle, v) for v in st.session_state.vehicles if v['id'] != selected_vehicle_id):
-                    selected_vehicle['y'] -= move_step
-                st.rerun()
-        
-        with col_move2:
-            if st.button("⬅️ Kiri", use_container_width=True):
-                selected_vehicle['x'] -= move_step
-                if not fits_on_ship(selected_vehicle, st.session_state.ship_layout) or any(check_collision(selected_vehicle, v) for v in st.session_state.vehicles if v['id'] != selected_vehicle_id):
-                    selected_vehicle['x'] += move_step
-                st.rerun()
-            
-            if st.button("➡️ Kanan", use_container_width=True):
-                selected_vehicle['x'] += move_step
-                if not fits_on_ship(selected_vehicle, st.session_state.ship_layout) or any(check_collision(selected_vehicle, v) for v in st.session_state.vehicles if v['id'] != selected_vehicle_id):
-                    selected_vehicle['x'] -= move_step
-                st.rerun()
-        
-        with col_move3:
-            if st.button("⬇️ Mundur", use_container_width=True):
-                selected_vehicle['y'] -= move_step
-                if not fits_on_ship(selected_vehicle, st.session_state.ship_layout) or any(check_collision(selected_vehicle, v) for v in st.session_state.vehicles if v['id'] != selected_vehicle_id):
-                    selected_vehicle['y'] += move_step
-                st.rerun()
+        # Langkah berhenti di titik kontak jika tidak cukup ruang untuk seluruh langkah
+        move_buttons = [(col_move1, "⬆️ Maju", (0, 1)), (col_move2, "⬅️ Kiri", (-1, 0)),
+                        (col_move2, "➡️ Kanan", (1, 0)), (col_move3, "⬇️ Mundur", (0, -1))]
+        for move_column, move_label, direction in move_buttons:
+            with move_column:
+                if st.button(move_label, use_container_width=True):
+                    begin_history(f"Geser {selected_vehicle['name']}", ids=[selected_vehicle_id])
+                    slide_vehicle(selected_vehicle, direction, None if slide_to_contact else move_step)
+                    if snap_enabled:
+                        snap_vehicle(selected_vehicle, snap_distance)
+                    st.session_state.stability.update(selected_vehicle)
+                    commit_history()
+                    st.rerun()
         
         # Tombol aksi (tanpa duplikat kendaraan)
         if st.button("🗑️ Hapus Kendaraan", type="secondary", use_container_width=True):
+            begin_history(f"Hapus {selected_vehicle['name']}", ids=[selected_vehicle_id])
             remove_vehicle(selected_vehicle_id)
+            commit_history()
             st.success("Kendaraan berhasil dihapus!")
             st.rerun()
+        
+        # Operasi massal: satu validasi tervektorisasi dan satu rerun per aksi
+        with st.expander("🧺 Operasi Massal (Pilih Banyak Kendaraan)"):
+            selection_mode = st.radio("Pilih berdasarkan:", ["Daftar", "Tipe", "Area"], horizontal=True,
+                                      key="batch_selection_mode")
+            if selection_mode == "Daftar":
+                # Buang pilihan yang kendaraannya sudah tidak ada (sebelum widget dibuat)
+                vehicle_labels = {vehicle_id: label for label, vehicle_id in vehicle_options.items()}
+                if 'batch_selection_list' in st.session_state:
+                    st.session_state.batch_selection_list = [
+                        vehicle_id for vehicle_id in st.session_state.batch_selection_list
+                        if vehicle_id in vehicle_labels]
+                batch_ids = set(st.multiselect("Kendaraan:", options=list(vehicle_labels.keys()),
+                                               format_func=vehicle_labels.get, key="batch_selection_list"))
+            elif selection_mode == "Tipe":
+                present_types = sorted({v['type'] for v in st.session_state.vehicles})
+                chosen_types = st.multiselect(
+                    "Tipe kendaraan:", options=present_types,
+                    format_func=lambda t: f"{VEHICLE_ICONS.get(t, '🚙')} {VEHICLE_CATALOG.get(t, {'name': 'Kustom'})['name']}",
+                    key="batch_selection_types")
+                batch_ids = set(select_by_types(st.session_state.vehicles, chosen_types))
+            else:
+                col_area1, col_area2 = st.columns(2)
+                with col_area1:
+                    area_x0 = st.number_input("X awal (m):", min_value=0.0, max_value=float(ship_layout['width']),
+                                              value=0.0, step=1.0, key="batch_area_x0")
+                    area_y0 = st.number_input("Y awal (m):", min_value=0.0, max_value=float(ship_layout['length']),
+                                              value=0.0, step=1.0, key="batch_area_y0")
+                with col_area2:
+                    area_x1 = st.number_input("X akhir (m):", min_value=0.0, max_value=float(ship_layout['width']),
+                                              value=float(ship_layout['width']), step=1.0, key="batch_area_x1")
+                    area_y1 = st.number_input("Y akhir (m):", min_value=0.0, max_value=float(ship_layout['length']),
+                                              value=float(ship_layout['length']), step=1.0, key="batch_area_y1")
+                area_partial = st.checkbox("Termasuk kendaraan yang hanya sebagian di dalam area",
+                                           key="batch_area_partial")
+                batch_ids = set(select_in_region(st.session_state.vehicles, area_x0, area_y0, area_x1, area_y1,
+                                                 fully_inside=not area_partial))
+            
+            group = [v for v in st.session_state.vehicles if v['id'] in batch_ids]
+            st.caption(f"{len(group)} kendaraan terpilih")
+            
+            if group:
+                vehicle_names = {v['id']: v['name'] for v in st.session_state.vehicles}
+                
+                # Pesan pelanggaran; tidak ada kendaraan yang diubah sehingga tidak perlu rerun
+                def report_conflicts(conflicts, message):
+                    names = [f"{vehicle_names.get(vid, vid)} ({vid})" for vid in sorted(conflicts)]
+                    st.error(f"{message}: {', '.join(names[:10])}{' …' if len(names) > 10 else ''}")
+                
+                col_shift1, col_shift2 = st.columns(2)
+                with col_shift1:
+                    batch_dx = st.number_input("Geser X (m):", value=0.0, step=1.0, format="%.1f", key="batch_dx")
+                with col_shift2:
+                    batch_dy = st.number_input("Geser Y (m):", value=0.0, step=1.0, format="%.1f", key="batch_dy")
+                if st.button("↔️ Geser Kelompok", use_container_width=True):
+                    conflicts = apply_batch(f"Geser {len(group)} kendaraan", group,
+                                            translated(group, batch_dx, batch_dy))
+                    if conflicts:
+                        report_conflicts(conflicts, f"Geser kelompok dibatalkan, {len(conflicts)} kendaraan akan "
+                                                    f"keluar batas, menimpa rintangan atau bertabrakan")
+                    else:
+                        st.rerun()
+                
+                col_retype1, col_retype2 = st.columns(2)
+                with col_retype1:
+                    new_type = st.selectbox(
+                        "Ganti tipe menjadi:", options=list(VEHICLE_ICONS.keys()),
+                        format_func=lambda t: f"{VEHICLE_ICONS[t]} {VEHICLE_CATALOG.get(t, {'name': 'Kustom'})['name']}",
+                        key="batch_new_type")
+                with col_retype2:
+                    use_standard = st.checkbox("Pakai ukuran & berat standar tipe", value=True,
+                                               key="batch_standard_size")
+                if st.button("🏷️ Ganti Tipe Kelompok", use_container_width=True):
+                    changes = {'type': new_type, 'icon': VEHICLE_ICONS[new_type]}
+                    if use_standard and new_type in VEHICLE_CATALOG:
+                        spec = VEHICLE_CATALOG[new_type]
+                        changes.update(name=spec['name'], length=spec['length'], width=spec['width'],
+                                       weight=DEFAULT_WEIGHTS[new_type])
+                    conflicts = apply_batch(f"Ganti tipe {len(group)} kendaraan", group,
+                                            [dict(v, **changes) for v in group])
+                    if conflicts:
+                        report_conflicts(conflicts, f"Ganti tipe dibatalkan, {len(conflicts)} kendaraan akan "
+                                                    f"keluar batas, menimpa rintangan atau bertabrakan")
+                    else:
+                        st.rerun()
+                
+                col_batch1, col_batch2 = st.columns(2)
+                with col_batch1:
+                    if st.button("🔄 Tempatkan Ulang Kelompok", use_container_width=True):
+                        conflicts = replace_batch(f"Tempatkan ulang {len(group)} kendaraan", group)
+                        if conflicts:
+                            report_conflicts(conflicts, f"Tempatkan ulang dibatalkan, {len(conflicts)} kendaraan "
+                                                        f"tidak mendapat tempat")
+                        else:
+                            st.rerun()
+                with col_batch2:
+                    if st.button("🗑️ Hapus Kelompok", type="secondary", use_container_width=True):
+                        begin_history(f"Hapus {len(group)} kendaraan", ids=batch_ids)
+                        remove_vehicles(batch_ids)
+                        commit_history()
+                        st.rerun()
     
     else:
         st.info("Belum ada kendaraan di kapal. Tambahkan kendaraan dari panel kiri.")
@@ -877,6 +2171,8 @@ with col3:
                 • Kanan-Atas: ({vehicle['x']+vehicle['width']:.1f}, {vehicle['y']+vehicle['length']:.1f})
             </div>
             <p><strong>Luas:</strong> {vehicle['length'] * vehicle['width']:.1f} m²</p>
+            <p><strong>Pelabuhan Bongkar:</strong> {vehicle_port(vehicle)}</p>
+            <p><strong>Berat:</strong> {vehicle_weight(vehicle):.2f} t (beban gandar {axle_load(vehicle):.2f} t)</p>
             <p><strong>ID:</strong> {vehicle['id']}</p>
             <div style="display: flex; align-items: center; margin-top: 10px;">
                 <div class="vehicle-color-box" style="background-color: {vehicle['color']};"></div>
@@ -904,21 +2200,33 @@ with col3:
                                           min_value=0.5, max_value=100.0, step=0.1,
                                           format="%.1f")
             
+            new_weight = st.number_input("Berat Baru (ton):", 
+                                         value=float(vehicle_weight(vehicle)), 
+                                         min_value=0.0, max_value=500.0, step=0.1,
+                                         format="%.2f")
+            new_port = st.number_input("Pelabuhan Bongkar:", 
+                                       value=vehicle_port(vehicle), 
+                                       min_value=1, max_value=50, step=1)
+            
             if st.form_submit_button("💾 Simpan Perubahan", use_container_width=True):
+                begin_history(f"Edit {vehicle['name']}", ids=[vehicle['id']])
                 # Simpan ukuran lama
                 old_length, old_width = vehicle['length'], vehicle['width']
                 
                 # Update data kendaraan
-                vehicle['name'] = new_name
+                vehicle['name'] = sys.intern(new_name)
                 vehicle['length'] = new_length
                 vehicle['width'] = new_width
+                vehicle['weight'] = new_weight
+                vehicle['port'] = int(new_port)
                 
-                # Check if still fits
-                if not fits_on_ship(vehicle, st.session_state.ship_layout):
+                # Check if still fits (batas kapal, kendaraan lain dan rintangan)
+                if not position_is_valid(vehicle):
                     st.warning("Ukuran baru tidak muat di posisi saat ini! Mencari posisi baru...")
                     # Cari posisi baru
                     if not find_empty_position(vehicle, st.session_state.ship_layout, 
-                                             [v for v in st.session_state.vehicles if v['id'] != vehicle['id']]):
+                                             [v for v in st.session_state.vehicles if v['id'] != vehicle['id']],
+                                             index=get_occupancy_index()):
                         st.error("Tidak ada ruang yang cukup untuk ukuran baru ini!")
                         # Revert changes
                         vehicle['length'], vehicle['width'] = old_length, old_width
@@ -926,6 +2234,8 @@ with col3:
                         st.success("Kendaraan berhasil dipindahkan ke posisi baru!")
                 else:
                     st.success("Kendaraan berhasil diperbarui!")
+                st.session_state.stability.update(vehicle)
+                commit_history()
                 st.rerun()
     else:
         st.info("Pilih kendaraan untuk melihat detail")
@@ -948,40 +2258,99 @@ with col3:
     st.markdown("**Impor Layout dari JSON:**")
     uploaded_file = st.file_uploader("Pilih file JSON", type="json", label_visibility="collapsed")
     
-    if uploaded_file is not None:
+    # Satu file hanya diimpor sekali; tanpa ini impor yang di-undo langsung terulang di run berikutnya
+    if uploaded_file is not None and uploaded_file.file_id != st.session_state.get('imported_file_id'):
+        st.session_state.imported_file_id = uploaded_file.file_id
         json_str = uploaded_file.getvalue().decode("utf-8")
+        begin_history("Impor layout", ids=(), include_decks=True)
         if import_layout(json_str):
+            commit_history(include_decks=True)
+            # Validasi impor: batas kapal, rintangan dan jarak bebas per dek
+            st.session_state.layout_violations = {
+                position: layout_violations(deck['vehicles'], deck['layout'], st.session_state.grid_density)
+                for position, deck in enumerate(st.session_state.decks)
+            }
             st.success("Layout berhasil diimpor!")
             st.rerun()
         else:
             st.error("Gagal mengimpor layout. Pastikan file JSON valid.")
     
+    # Akuntansi memori: sesi ini dan artefak semua sesi di server
+    with st.expander("🧠 Memori Sesi"):
+        memory_rows = session_memory()
+        st.dataframe(pd.DataFrame([{
+            'Komponen': row['Komponen'],
+            'Perkiraan (KB)': round(row['Byte'] / 1024, 1)
+        } for row in memory_rows]), use_container_width=True, hide_index=True)
+        
+        artifacts = get_session_artifacts()
+        server_bytes = sum(sum(entries.values()) for entries in artifacts.usage().values())
+        col_memory1, col_memory2 = st.columns(2)
+        with col_memory1:
+            st.metric("Sesi dengan artefak", len(artifacts))
+        with col_memory2:
+            st.metric("Artefak server", f"{server_bytes / 1024 / 1024:.1f} / {artifacts.max_bytes / 1024 / 1024:.0f} MB")
+        st.caption(f"Artefak sesi yang paling lama tidak aktif dibuang (LRU) jika anggaran terlampaui atau sesi "
+                   f"menganggur lebih dari {artifacts.max_idle / 60:.0f} menit, lalu dibangun ulang saat sesi "
+                   f"kembali. Sudah dibuang: {artifacts.evictions} sesi. Katalog kendaraan dan string nama/tipe "
+                   f"dibagi bersama antar sesi.")
+    
     st.divider()
     
     st.markdown("### 🛠️ Alat Tambahan")
     
     if st.button("🔄 Atur Ulang Semua Kendaraan", use_container_width=True):
+        begin_history("Atur ulang semua kendaraan")
+        # Mode lajur: best-fit decreasing untuk seluruh manifest sekaligus
+        if st.session_state.placement_mode == 'lane':
+            ship_layout = st.session_state.ship_layout
+            packer = LanePacker.from_vehicles(ship_layout, [], st.session_state.grid_density)
+            # Urutan pelabuhan: pelabuhan terakhir dimuat dulu sehingga paling dalam
+            pack_key = None
+            if st.session_state.port_order_placement:
+                pack_key = lambda v: (-vehicle_port(v), -v['length'])
+            placed, rejected = packer.pack(st.session_state.vehicles, pack_key)
+            st.session_state.vehicles = placed
+            st.session_state.stability.recompute(placed)
+            commit_history()
+            for vehicle in rejected:
+                st.warning(f"Tidak ada ruang untuk {vehicle['name']}")
+            st.success("Kendaraan berhasil diatur ulang!")
+            st.rerun()
+        
         # Algoritma penempatan otomatis sederhana
         vehicles_sorted = sorted(st.session_state.vehicles, 
                                key=lambda v: v['length'] * v['width'], 
                                reverse=True)
+        if st.session_state.port_order_placement:
+            vehicles_sorted.sort(key=vehicle_port, reverse=True)
         
         st.session_state.vehicles = []
+        index = SparseOccupancy.from_vehicles(st.session_state.ship_layout, [], st.session_state.grid_density)
         
         for vehicle in vehicles_sorted:
             vehicle['x'] = 0
             vehicle['y'] = 0
-            if find_empty_position(vehicle, st.session_state.ship_layout, st.session_state.vehicles):
+            if find_empty_position(vehicle, st.session_state.ship_layout, st.session_state.vehicles,
+                                   preferred_centre=get_preferred_centre(vehicle),
+                                   constraint=get_port_constraint(st.session_state.vehicles),
+                                   index=index):
                 st.session_state.vehicles.append(vehicle)
+                index.add(vehicle)
             else:
                 st.warning(f"Tidak ada ruang untuk {vehicle['name']}")
         
+        st.session_state.stability.recompute(st.session_state.vehicles)
+        commit_history()
         st.success("Kendaraan berhasil diatur ulang!")
         st.rerun()
     
     if st.button("🗑️ Hapus Semua Kendaraan", type="secondary", use_container_width=True):
+        begin_history("Hapus semua kendaraan")
         st.session_state.vehicles = []
         st.session_state.selected_vehicle = None
+        st.session_state.stability.recompute([])
+        commit_history()
         st.success("Semua kendaraan berhasil dihapus!")
         st.rerun()
 
@@ -1014,6 +2383,11 @@ st.markdown("""
    - Gunakan grid density lebih besar (10-50m) untuk performa
    - Atur langkah pergerakan lebih besar (10-100m)
    - Gunakan kontrol posisi manual untuk presisi tinggi
+
+6. **Mode Lajur (Lane-Metre):**
+   - Lebar kapal dibagi menjadi lajur sesuai "Jumlah Lajur"
+   - Kendaraan diisi per lajur dari depan ke belakang (best-fit), cocok untuk manifest ribuan kendaraan
+   - Penggunaan setiap lajur dilaporkan dalam lane-metre
 """)
 
 # Menampilkan data kendaraan dalam tabel
@@ -1034,6 +2408,8 @@ if st.session_state.vehicles:
             'X (m)': f"{vehicle['x']:.1f}",
             'Y (m)': f"{vehicle['y']:.1f}",
             'Luas (m²)': f"{vehicle['length'] * vehicle['width']:.1f}",
+            'Berat (t)': f"{vehicle_weight(vehicle):.2f}",
+            'Pelabuhan': vehicle_port(vehicle),
             'Warna': vehicle['color']
         })
     
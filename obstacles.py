@@ -0,0 +1,148 @@
+# obstacles.py - Rintangan tetap dan zona larangan per kapal (pilar, ramp, tangga, jalur pemadam)
+import functools
+import math
+
+import numpy as np
+
+# Jenis area yang tidak boleh ditempati kendaraan
+OBSTACLE_KINDS = {
+    'obstacle': "Rintangan",      # pilar, ramp, tangga, titik lashing
+    'no_go': "Zona Larangan"      # jalur pemadam, jalur evakuasi, area kerja
+}
+
+# Jumlah raster rintangan yang disimpan di cache (per definisi kapal dan resolusi)
+MASK_CACHE_SIZE = 64
+
+# Sub-sampel per sisi sel untuk uji titik-dalam-poligon
+SUPERSAMPLE = 4
+
+
+# Fungsi untuk membuat rintangan poligon
+def new_obstacle(name, points, kind='obstacle'):
+    """points: titik sudut (x, y) dalam meter, x = lebar, y = panjang dari haluan"""
+    if kind not in OBSTACLE_KINDS:
+        raise ValueError(f"Jenis rintangan tidak dikenal: {kind}")
+    points = [[float(x), float(y)] for x, y in points]
+    if len(points) < 3:
+        raise ValueError("Poligon membutuhkan minimal 3 titik")
+    return {'name': str(name), 'kind': kind, 'points': points}
+
+# Fungsi untuk membuat rintangan persegi panjang
+def rectangle_obstacle(name, x, y, width, length, kind='obstacle'):
+    return new_obstacle(name, [(x, y), (x + width, y), (x + width, y + length), (x, y + length)], kind)
+
+# Fungsi untuk membaca titik poligon dari teks "x,y; x,y; x,y"
+def parse_points(text):
+    points = []
+    for pair in text.replace('\n', ';').split(';'):
+        if not pair.strip():
+            continue
+        values = pair.replace(' ', '').split(',')
+        if len(values) != 2:
+            raise ValueError(f"Titik tidak valid: {pair.strip()}")
+        points.append((float(values[0]), float(values[1])))
+    return points
+
+# Fungsi untuk kunci geometri rintangan (hashable, stabil antar proses)
+def obstacles_key(obstacles):
+    """Hanya geometri; nama dan jenis tidak memengaruhi penempatan"""
+    return tuple(tuple((float(x), float(y)) for x, y in obstacle['points']) for obstacle in obstacles or ())
+
+# Fungsi untuk kotak pembatas rintangan (x0, y0, x1, y1)
+def bounding_box(obstacle):
+    xs = [point[0] for point in obstacle['points']]
+    ys = [point[1] for point in obstacle['points']]
+    return min(xs), min(ys), max(xs), max(ys)
+
+# Fungsi untuk kotak pembatas yang dibulatkan keluar ke tepi sel raster (x0, y0, x1, y1)
+def cell_box(obstacle, resolution):
+    """Jangkauan sel yang sama dengan _polygon_cells: semua sel yang bisa diblokir rintangan ini"""
+    x0, y0, x1, y1 = bounding_box(obstacle)
+    c0 = math.floor(x0 / resolution)
+    c1 = max(c0 + 1, math.ceil(x1 / resolution))
+    r0 = math.floor(y0 / resolution)
+    r1 = max(r0 + 1, math.ceil(y1 / resolution))
+    return c0 * resolution, r0 * resolution, c1 * resolution, r1 * resolution
+
+# Fungsi untuk sel grid yang beririsan dengan poligon (konservatif)
+def _polygon_cells(points, resolution):
+    """
+    Sel diblokir jika salah satu sub-sampelnya berada di dalam poligon
+    (even-odd, tervektorisasi) atau dilewati tepi poligon. Tepi yang tepat
+    berada di garis grid tidak memblokir sel di luarnya, sehingga kendaraan
+    yang sejajar grid boleh menempel rintangan yang juga sejajar grid.
+    Mengembalikan (baris0, kolom0, bool array).
+    """
+    points = np.asarray(points, dtype=float)
+    c0 = math.floor(points[:, 0].min() / resolution)
+    c1 = max(c0 + 1, math.ceil(points[:, 0].max() / resolution))
+    r0 = math.floor(points[:, 1].min() / resolution)
+    r1 = max(r0 + 1, math.ceil(points[:, 1].max() / resolution))
+
+    step = resolution / SUPERSAMPLE
+    sample_x = c0 * resolution + (np.arange((c1 - c0) * SUPERSAMPLE) + 0.5) * step
+    sample_y = r0 * resolution + (np.arange((r1 - r0) * SUPERSAMPLE) + 0.5) * step
+    grid_x, grid_y = np.meshgrid(sample_x, sample_y)
+
+    inside = np.zeros(grid_x.shape, dtype=bool)
+    ends = np.roll(points, -1, axis=0)
+    for (xa, ya), (xb, yb) in zip(points, ends):
+        if ya == yb:
+            continue
+        crosses = (ya > grid_y) != (yb > grid_y)
+        inside ^= crosses & (grid_x < xa + (grid_y - ya) * (xb - xa) / (yb - ya))
+    cells = inside.reshape(r1 - r0, SUPERSAMPLE, c1 - c0, SUPERSAMPLE).any(axis=(1, 3))
+
+    # Poligon lebih tipis dari sub-sampel: tandai sel yang dilewati tepinya
+    for (xa, ya), (xb, yb) in zip(points, ends):
+        count = max(1, math.ceil(math.hypot(xb - xa, yb - ya) / step))
+        t = np.linspace(0.0, 1.0, count + 1)
+        px = (xa + (xb - xa) * t) / resolution
+        py = (ya + (yb - ya) * t) / resolution
+        off_grid = (np.abs(px - np.round(px)) > 1e-9) & (np.abs(py - np.round(py)) > 1e-9)
+        cells[np.floor(py[off_grid]).astype(int) - r0, np.floor(px[off_grid]).astype(int) - c0] = True
+
+    cells.flags.writeable = False
+    return r0, c0, cells
+
+@functools.lru_cache(maxsize=MASK_CACHE_SIZE)
+def _cached_patches(key, resolution):
+    return tuple(_polygon_cells(points, resolution) for points in key)
+
+# Fungsi untuk raster rintangan per poligon (dihitung sekali per definisi kapal dan resolusi)
+def obstacle_patches(obstacles, resolution):
+    """
+    Daftar (baris0, kolom0, sel) per rintangan, hanya seluas kotak
+    pembatasnya sehingga memori tidak bergantung pada ukuran dek. Hasil
+    di-cache dan dibagi bersama; array-nya read-only.
+    """
+    key = obstacles_key(obstacles)
+    if not key:
+        return ()
+    return _cached_patches(key, float(resolution))
+
+# Fungsi untuk mask rintangan penuh berukuran (baris, kolom)
+def obstacle_mask(obstacles, rows, cols, resolution):
+    mask = np.zeros((rows, cols), dtype=bool)
+    for r0, c0, cells in obstacle_patches(obstacles, resolution):
+        top, left = max(0, r0), max(0, c0)
+        bottom, right = min(rows, r0 + cells.shape[0]), min(cols, c0 + cells.shape[1])
+        if top < bottom and left < right:
+            mask[top:bottom, left:right] |= cells[top - r0:bottom - r0, left - c0:right - c0]
+    return mask
+
+# Fungsi untuk rentang y yang diblokir rintangan di setiap lajur (mode lajur)
+def lane_intervals(obstacles, lane_count, lane_width, resolution=1.0):
+    """
+    Memakai kotak sel rintangan (cell_box) pada resolusi indeks okupansi,
+    sehingga posisi yang diberikan mode lajur juga bebas menurut raster
+    rintangan. Mengembalikan daftar (y0, y1) terurut per lajur.
+    """
+    intervals = [[] for _ in range(lane_count)]
+    for obstacle in obstacles or ():
+        x0, y0, x1, y1 = cell_box(obstacle, resolution)
+        first = max(0, int(x0 // lane_width))
+        last = min(lane_count - 1, int((x1 - 1e-9) // lane_width))
+        for lane in range(first, last + 1):
+            intervals[lane].append((y0, y1))
+    return [sorted(lane) for lane in intervals]
@@ -0,0 +1,356 @@
+# occupancy.py - Grid okupansi sparse berbasis tile untuk kapal berukuran kilometer
+import math
+
+import numpy as np
+
+from clearance import body, inflate, too_close
+from obstacles import obstacle_patches
+
+# Jumlah sel per sisi tile (64 × 64 sel = 512 byte setelah packbits)
+TILE_CELLS = 64
+
+# Penanda tile yang seluruh selnya tertutup kendaraan
+FULL = 'full'
+
+
+# Fungsi untuk jarak persegi mover ke target di depannya pada satu sumbu (inf jika tidak segaris)
+def _gap_ahead(mover, target, axis, sign):
+    across = 1 - axis
+    if mover[across] + mover[across + 2] <= target[across] or target[across] + target[across + 2] <= mover[across]:
+        return math.inf
+    if sign > 0:
+        return target[axis] - (mover[axis] + mover[axis + 2])
+    return mover[axis] - (target[axis] + target[axis + 2])
+
+
+class SparseOccupancy:
+    """
+    Okupansi dek yang dibagi menjadi tile berukuran tetap. Tile hanya dibuat
+    di tempat yang memiliki kendaraan; tile kosong tidak disimpan dan tile
+    yang penuh disimpan sebagai penanda FULL. Tile aktif menyimpan bitmap
+    np.packbits dari sel yang *seluruhnya* tertutup kendaraan, plus id
+    kendaraan yang menyentuh tile tersebut.
+
+    Karena bit yang menyala berarti sel itu pasti berada di dalam kendaraan,
+    kandidat yang menimpa bit tersebut langsung ditolak; sisanya dicek eksak
+    hanya terhadap kendaraan anggota tile yang disentuh. Memori sebanding
+    dengan luas yang terisi, bukan luas dek.
+
+    Rintangan dan zona larangan kapal menjadi entri permanen: rasternya
+    (konservatif, dari cache obstacles.py) disimpan sebagai bitmap tile
+    statis yang dicek di loop tile yang sama, jadi tidak menambah biaya
+    per query dan tidak pernah disentuh oleh add/remove/sync.
+
+    Dengan clearances, tile dan bitmap memuat zona bebas kendaraan
+    (clearance.inflate) dan badannya disimpan terpisah: badan kandidat yang
+    menimpa bit zona langsung ditolak, sisanya dicek eksak dengan aturan
+    clearance.too_close. Zona kandidat (footprint(vehicle)) diuji terhadap
+    rintangan dan tepi dek.
+
+    contact_distance menghitung jarak geser maksimum ke satu arah dengan
+    satu query pada persegi sapuan, dipakai untuk geser-sampai-menempel dan
+    snap ke tetangga terdekat.
+    """
+
+    def __init__(self, length, width, resolution, tile_cells=TILE_CELLS, obstacles=None, clearances=None):
+        self.length = float(length)
+        self.width = float(width)
+        self.resolution = float(resolution)
+        self.tile_cells = int(tile_cells)
+        self.tile_size = self.resolution * self.tile_cells
+        self.clearances = clearances
+
+        self._tiles = {}      # (baris_tile, kolom_tile) -> bitmap packbits atau FULL
+        self._members = {}    # (baris_tile, kolom_tile) -> set id kendaraan
+        self._rects = {}      # id -> zona (x, y, lebar, panjang)
+        self._bodies = {}     # id -> badan (x, y, lebar, panjang)
+        self._static = {}     # (baris_tile, kolom_tile) -> bool array sel rintangan
+        self._add_obstacles(obstacles)
+
+    @classmethod
+    def from_vehicles(cls, ship_layout, vehicles, resolution, tile_cells=TILE_CELLS):
+        index = cls(ship_layout['length'], ship_layout['width'], resolution, tile_cells,
+                    ship_layout.get('obstacles'), ship_layout.get('clearances'))
+        for vehicle in vehicles:
+            index.add(vehicle)
+        return index
+
+    def __len__(self):
+        return len(self._rects)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._rects
+
+    def footprint(self, vehicle):
+        """Zona (x, y, lebar, panjang) kendaraan: badan termasuk jarak bebas penuh"""
+        if self.clearances:
+            return inflate(vehicle, self.clearances)
+        return body(vehicle)
+
+    def _tile_span(self, x, y, width, length):
+        """Rentang tile (inklusif) yang beririsan dengan luas positif"""
+        r0 = int(math.floor(y / self.tile_size))
+        r1 = int(math.ceil((y + length) / self.tile_size - 1e-9)) - 1
+        c0 = int(math.floor(x / self.tile_size))
+        c1 = int(math.ceil((x + width) / self.tile_size - 1e-9)) - 1
+        return r0, max(r0, r1), c0, max(c0, c1)
+
+    def _add_obstacles(self, obstacles):
+        rows = int(math.ceil(self.length / self.resolution - 1e-9))
+        cols = int(math.ceil(self.width / self.resolution - 1e-9))
+        for r0, c0, cells in obstacle_patches(obstacles, self.resolution):
+            # Potong ke batas dek, lalu bagi ke tile
+            top, left = max(0, r0), max(0, c0)
+            bottom, right = min(rows, r0 + cells.shape[0]), min(cols, c0 + cells.shape[1])
+            for tile_row in range(top // self.tile_cells, (bottom - 1) // self.tile_cells + 1):
+                for tile_col in range(left // self.tile_cells, (right - 1) // self.tile_cells + 1):
+                    row_start, col_start = tile_row * self.tile_cells, tile_col * self.tile_cells
+                    t0, t1 = max(top, row_start), min(bottom, row_start + self.tile_cells)
+                    u0, u1 = max(left, col_start), min(right, col_start + self.tile_cells)
+                    if t0 >= t1 or u0 >= u1:
+                        continue
+                    static = self._static.setdefault((tile_row, tile_col),
+                                                     np.zeros((self.tile_cells, self.tile_cells), dtype=bool))
+                    static[t0 - row_start:t1 - row_start, u0 - col_start:u1 - col_start] |= \
+                        cells[t0 - r0:t1 - r0, u0 - c0:u1 - c0]
+
+    def _tiles_of(self, x, y, width, length):
+        r0, r1, c0, c1 = self._tile_span(x, y, width, length)
+        return [(row, col) for row in range(r0, r1 + 1) for col in range(c0, c1 + 1)]
+
+    # Fungsi untuk sel (relatif terhadap tile) yang seluruhnya tertutup persegi
+    def _inner_cells(self, tile, x, y, width, length):
+        origin_y = tile[0] * self.tile_size
+        origin_x = tile[1] * self.tile_size
+        r0 = max(0, int(math.ceil((y - origin_y) / self.resolution - 1e-9)))
+        r1 = min(self.tile_cells, int(math.floor((y + length - origin_y) / self.resolution + 1e-9)))
+        c0 = max(0, int(math.ceil((x - origin_x) / self.resolution - 1e-9)))
+        c1 = min(self.tile_cells, int(math.floor((x + width - origin_x) / self.resolution + 1e-9)))
+        return r0, r1, c0, c1
+
+    # Fungsi untuk sel (relatif terhadap tile) yang beririsan dengan persegi
+    def _outer_cells(self, tile, x, y, width, length):
+        origin_y = tile[0] * self.tile_size
+        origin_x = tile[1] * self.tile_size
+        r0 = max(0, int(math.floor((y - origin_y) / self.resolution + 1e-9)))
+        r1 = min(self.tile_cells, int(math.ceil((y + length - origin_y) / self.resolution - 1e-9)))
+        c0 = max(0, int(math.floor((x - origin_x) / self.resolution + 1e-9)))
+        c1 = min(self.tile_cells, int(math.ceil((x + width - origin_x) / self.resolution - 1e-9)))
+        return r0, r1, c0, c1
+
+    def _unpack(self, tile):
+        stored = self._tiles.get(tile)
+        if stored is None:
+            return np.zeros((self.tile_cells, self.tile_cells), dtype=bool)
+        if isinstance(stored, str):
+            return np.ones((self.tile_cells, self.tile_cells), dtype=bool)
+        bits = np.unpackbits(stored, count=self.tile_cells * self.tile_cells)
+        return bits.reshape(self.tile_cells, self.tile_cells).astype(bool)
+
+    def _store(self, tile, cells):
+        if cells.all():
+            self._tiles[tile] = FULL
+        else:
+            self._tiles[tile] = np.packbits(cells)
+
+    def _rebuild_tile(self, tile):
+        members = self._members.get(tile)
+        if not members:
+            self._tiles.pop(tile, None)
+            self._members.pop(tile, None)
+            return
+        cells = np.zeros((self.tile_cells, self.tile_cells), dtype=bool)
+        for vehicle_id in members:
+            r0, r1, c0, c1 = self._inner_cells(tile, *self._rects[vehicle_id])
+            if r0 < r1 and c0 < c1:
+                cells[r0:r1, c0:c1] = True
+        self._store(tile, cells)
+
+    def add(self, vehicle):
+        if vehicle['id'] in self._rects:
+            self.remove(vehicle['id'])
+        rect = self.footprint(vehicle)
+        self._rects[vehicle['id']] = rect
+        self._bodies[vehicle['id']] = body(vehicle)
+
+        for tile in self._tiles_of(*rect):
+            self._members.setdefault(tile, set()).add(vehicle['id'])
+            stored = self._tiles.get(tile)
+            if isinstance(stored, str):
+                continue
+            r0, r1, c0, c1 = self._inner_cells(tile, *rect)
+            if stored is None:
+                cells = np.zeros((self.tile_cells, self.tile_cells), dtype=bool)
+            else:
+                cells = self._unpack(tile)
+            if r0 < r1 and c0 < c1:
+                cells[r0:r1, c0:c1] = True
+            self._store(tile, cells)
+
+    def remove(self, vehicle_id):
+        rect = self._rects.pop(vehicle_id, None)
+        if rect is None:
+            return
+        del self._bodies[vehicle_id]
+        for tile in self._tiles_of(*rect):
+            members = self._members.get(tile)
+            if members is not None:
+                members.discard(vehicle_id)
+            self._rebuild_tile(tile)
+
+    # Pindah = hapus posisi lama + tambah posisi baru
+    def update(self, vehicle):
+        self.add(vehicle)
+
+    def sync(self, vehicles):
+        """Menyamakan indeks dengan armada; hanya kendaraan yang berubah yang diproses"""
+        current = {v['id']: v for v in vehicles}
+        for vehicle_id in [vid for vid in self._rects if vid not in current]:
+            self.remove(vehicle_id)
+        for vehicle_id, vehicle in current.items():
+            if self._bodies.get(vehicle_id) != body(vehicle) or self._rects[vehicle_id] != self.footprint(vehicle):
+                self.add(vehicle)
+
+    def query(self, x, y, width, length, exclude_id=None):
+        """Id kendaraan yang zonanya beririsan (luas positif) dengan persegi yang diberikan"""
+        found = set()
+        for tile in self._tiles_of(x, y, width, length):
+            for vehicle_id in self._members.get(tile, ()):
+                if vehicle_id == exclude_id or vehicle_id in found:
+                    continue
+                ox, oy, ow, ol = self._rects[vehicle_id]
+                if not (x + width <= ox or ox + ow <= x or y + length <= oy or oy + ol <= y):
+                    found.add(vehicle_id)
+        return found
+
+    def conflicts(self, vehicle, exclude_id=None, tolerance=0.0):
+        """Id kendaraan yang bertumpuk atau kurang jarak bebas dengan kendaraan ini"""
+        zone, own = self.footprint(vehicle), body(vehicle)
+        return {vehicle_id for vehicle_id in self.query(*zone, exclude_id)
+                if too_close(own, zone, self._bodies[vehicle_id], self._rects[vehicle_id], tolerance)}
+
+    def is_free(self, vehicle, exclude_id=None):
+        """Apakah kendaraan di posisinya tidak melanggar kendaraan lain maupun rintangan"""
+        zone, own = self.footprint(vehicle), body(vehicle)
+        for tile in self._tiles_of(*zone):
+            static = self._static.get(tile)
+            if static is not None:
+                r0, r1, c0, c1 = self._outer_cells(tile, *zone)
+                if r0 < r1 and c0 < c1 and static[r0:r1, c0:c1].any():
+                    return False
+        for tile in self._tiles_of(*own):
+            stored = self._tiles.get(tile)
+            if stored is None:
+                continue
+            # Bitmap memuat kendaraan yang dikecualikan: serahkan ke cek eksak
+            if exclude_id in self._members[tile]:
+                continue
+            if isinstance(stored, str):
+                return False
+            # Bit menyala = sel di dalam zona kendaraan lain; badan tidak boleh menyentuhnya
+            r0, r1, c0, c1 = self._outer_cells(tile, *own)
+            if r0 < r1 and c0 < c1 and self._unpack(tile)[r0:r1, c0:c1].any():
+                return False
+        return not self.conflicts(vehicle, exclude_id)
+
+    def hits_obstacle(self, x, y, width, length):
+        """Apakah persegi menimpa rintangan atau zona larangan"""
+        for tile in self._tiles_of(x, y, width, length):
+            static = self._static.get(tile)
+            if static is None:
+                continue
+            r0, r1, c0, c1 = self._outer_cells(tile, x, y, width, length)
+            if r0 < r1 and c0 < c1 and static[r0:r1, c0:c1].any():
+                return True
+        return False
+
+    def _static_gap(self, swept, direction, x, y, width, length):
+        """Jarak ke sel rintangan pertama di dalam persegi sapuan (inf jika tidak ada)"""
+        gap = math.inf
+        for tile in self._tiles_of(*swept):
+            static = self._static.get(tile)
+            if static is None:
+                continue
+            r0, r1, c0, c1 = self._outer_cells(tile, *swept)
+            if r0 >= r1 or c0 >= c1:
+                continue
+            cells = static[r0:r1, c0:c1]
+            if not cells.any():
+                continue
+            row0 = tile[0] * self.tile_cells + r0
+            col0 = tile[1] * self.tile_cells + c0
+            if direction[0] > 0:
+                gap = min(gap, (col0 + np.flatnonzero(cells.any(axis=0))[0]) * self.resolution - (x + width))
+            elif direction[0] < 0:
+                gap = min(gap, x - (col0 + np.flatnonzero(cells.any(axis=0))[-1] + 1) * self.resolution)
+            elif direction[1] > 0:
+                gap = min(gap, (row0 + np.flatnonzero(cells.any(axis=1))[0]) * self.resolution - (y + length))
+            else:
+                gap = min(gap, y - (row0 + np.flatnonzero(cells.any(axis=1))[-1] + 1) * self.resolution)
+        return gap
+
+    def contact_distance(self, vehicle, direction, exclude_id=None):
+        """
+        Jarak terjauh kendaraan bisa digeser ke arah direction ((1, 0), (-1, 0),
+        (0, 1) atau (0, -1)) sebelum melanggar jarak bebas kendaraan lain,
+        rintangan atau tepi dek. Satu query pada persegi sapuan dari sisi
+        depan badan sampai tepi dek, selebar zona.
+        """
+        x, y, width, length = zone = self.footprint(vehicle)
+        own = body(vehicle)
+        axis = 0 if direction[0] else 1
+        sign = direction[axis]
+        if direction[0] > 0:
+            reach = self.width - (x + width)
+            swept = (own[0] + own[2], y, self.width - (own[0] + own[2]), length)
+            static_swept = (x + width, y, reach, length)
+        elif direction[0] < 0:
+            reach = x
+            swept = (0.0, y, own[0], length)
+            static_swept = (0.0, y, reach, length)
+        elif direction[1] > 0:
+            reach = self.length - (y + length)
+            swept = (x, own[1] + own[3], width, self.length - (own[1] + own[3]))
+            static_swept = (x, y + length, width, reach)
+        else:
+            reach = y
+            swept = (x, 0.0, width, own[1])
+            static_swept = (x, 0.0, width, reach)
+        if reach <= 1e-9:
+            return 0.0
+
+        centre = own[axis] + own[axis + 2] / 2
+        for vehicle_id in self.query(*swept, exclude_id):
+            other_body, other_zone = self._bodies[vehicle_id], self._rects[vehicle_id]
+            # Hanya kendaraan di depan arah geser yang membatasi
+            if (other_body[axis] + other_body[axis + 2] / 2 - centre) * sign <= 0:
+                continue
+            reach = min(reach, _gap_ahead(zone, other_body, axis, sign), _gap_ahead(own, other_zone, axis, sign))
+        reach = min(reach, self._static_gap(static_swept, direction, x, y, width, length))
+        return max(0.0, reach)
+
+    def max_shift(self, vehicle, direction, limit=None):
+        """Perpindahan legal terjauh kendaraan ke satu arah (dibatasi limit meter jika diberikan)"""
+        distance = self.contact_distance(vehicle, direction, vehicle['id'])
+        return distance if limit is None else min(distance, limit)
+
+    def nearest_contact(self, vehicle, max_distance):
+        """(arah, jarak) ke tetangga/rintangan/tepi dek terdekat dalam max_distance, atau None"""
+        best = None
+        for direction in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            distance = self.contact_distance(vehicle, direction, vehicle['id'])
+            if 1e-9 < distance <= max_distance and (best is None or distance < best[1]):
+                best = (direction, distance)
+        return best
+
+    def collides(self, vehicle, exclude_self=True):
+        return not self.is_free(vehicle, vehicle['id'] if exclude_self else None)
+
+    def active_tiles(self):
+        """(baris_tile, kolom_tile, penuh) untuk setiap tile yang tersimpan"""
+        return [(tile[0], tile[1], isinstance(stored, str)) for tile, stored in self._tiles.items()]
+
+    def memory_bytes(self):
+        """Perkiraan memori bitmap tile (byte)"""
+        return (sum(stored.nbytes for stored in self._tiles.values() if not isinstance(stored, str))
+                + sum(static.nbytes for static in self._static.values()))
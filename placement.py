@@ -0,0 +1,754 @@
+# placement.py - Mesin penempatan kendaraan untuk kapal Ro-Ro (tanpa Streamlit)
+import itertools
+import math
+import random
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+import numpy as np
+
+from clearance import body, clearance_margins, clearances_key, inflate, rects_overlap, too_close
+from obstacles import bounding_box, cell_box, lane_intervals, obstacle_mask, obstacles_key
+from occupancy import SparseOccupancy
+
+
+# Fungsi untuk memeriksa tabrakan kendaraan (dalam meter)
+def check_collision(vehicle1, vehicle2, clearances=None):
+    """clearances: jarak bebas per tipe; kendaraan yang terlalu dekat dianggap bertabrakan"""
+    return too_close(body(vehicle1), inflate(vehicle1, clearances), body(vehicle2), inflate(vehicle2, clearances))
+
+# Fungsi untuk memeriksa apakah kendaraan cocok di kapal
+def fits_on_ship(vehicle, ship_layout):
+    # Cek apakah kendaraan (beserta jarak bebasnya) berada dalam batas kapal
+    x, y, width, length = inflate(vehicle, ship_layout.get('clearances'))
+    if x < -1e-9 or x + width > ship_layout['width'] + 1e-9:
+        return False
+    if y < -1e-9 or y + length > ship_layout['length'] + 1e-9:
+        return False
+    return True
+
+# Fungsi untuk validasi layout (misalnya hasil impor) dalam satu pass indeks okupansi
+def layout_violations(vehicles, ship_layout, grid_step=1.0):
+    """
+    Id kendaraan yang keluar batas kapal, menimpa rintangan, atau bertumpuk /
+    kurang jarak bebas dengan kendaraan lain (kedua kendaraan dilaporkan).
+    """
+    index = SparseOccupancy.from_vehicles(ship_layout, [], grid_step)
+    violations = set()
+    for vehicle in vehicles:
+        # Dipersempit sedikit agar kendaraan yang tepat bersentuhan (galat float) tidak dilaporkan
+        x, y, width, length = index.footprint(vehicle)
+        footprint = (x + 1e-6, y + 1e-6, width - 2e-6, length - 2e-6)
+        if not fits_on_ship(vehicle, ship_layout) or index.hits_obstacle(*footprint):
+            violations.add(vehicle['id'])
+        colliding = index.conflicts(vehicle, tolerance=1e-6)
+        if colliding:
+            violations.add(vehicle['id'])
+            violations |= colliding
+        index.add(vehicle)
+    return violations
+
+# Batas titik grid yang dienumerasi penuh; di atasnya dipakai sampel acak + kandidat sudut
+MAX_SEARCH_POINTS = 400_000
+
+# Fungsi untuk kandidat sudut (x dari tepi kanan, y dari tepi belakang kendaraan lain)
+def _corner_candidates(vehicles, max_x, max_y, limit):
+    """Generator: baru dihitung jika sampel acak tidak menemukan posisi"""
+    vehicles = list(vehicles)
+    xs = sorted({0.0} | {v['x'] + v['width'] for v in vehicles if v['x'] + v['width'] <= max_x})
+    ys = sorted({0.0} | {v['y'] + v['length'] for v in vehicles if v['y'] + v['length'] <= max_y})
+    count = 0
+    for y in ys:
+        for x in xs:
+            yield x, y
+            count += 1
+            if count >= limit:
+                return
+
+# Fungsi untuk menemukan posisi kosong untuk kendaraan
+def find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step=1.0, preferred_centre=None,
+                        constraint=None, index=None, rng=None):
+    """
+    Mencari posisi kosong untuk kendaraan dengan grid tertentu
+    grid_step: resolusi pencarian dalam meter
+    preferred_centre: (x, y) yang diinginkan untuk pusat kendaraan; titik grid
+        dicoba dari yang terdekat (misalnya target keseimbangan berat)
+    constraint: fungsi tambahan constraint(vehicle) -> bool untuk posisi kandidat
+        (misalnya batasan urutan pelabuhan bongkar)
+    index: SparseOccupancy yang sudah ada; jika None dibangun dari existing_vehicles
+        (beserta rintangan ship_layout). Kendaraan itu sendiri (berdasarkan id)
+        selalu dikecualikan dari cek tabrakan.
+    rng: random.Random untuk urutan pencarian; None = generator global (tidak reprodusibel)
+
+    Titik grid adalah sudut zona kendaraan (badan diperbesar jarak bebas),
+    sehingga zona tetap bisa menempel ke tepi dek dan rintangan di grid.
+    """
+    rng = rng or random
+    clearances = ship_layout.get('clearances')
+    dx, dy = clearance_margins(vehicle, clearances)
+    footprint_width = vehicle['width'] + 2 * dx
+    footprint_length = vehicle['length'] + 2 * dy
+    max_x = ship_layout['width'] - footprint_width
+    max_y = ship_layout['length'] - footprint_length
+
+    # Jika kendaraan lebih besar dari kapal
+    if max_x < 0 or max_y < 0:
+        return False
+
+    if index is None:
+        index = SparseOccupancy.from_vehicles(ship_layout, existing_vehicles, grid_step)
+
+    count_x = int(max_x // grid_step) + 2
+    count_y = int(max_y // grid_step) + 2
+
+    if count_x * count_y <= MAX_SEARCH_POINTS:
+        # Generate grid points
+        x_points = np.arange(0, max_x + grid_step, grid_step)
+        y_points = np.arange(0, max_y + grid_step, grid_step)
+
+        if preferred_centre is None:
+            # Acak urutan pencarian untuk distribusi yang lebih baik; permutasi NumPy
+            # diturunkan dari rng sehingga tetap reprodusibel, titik dibentuk saat dibutuhkan
+            order = np.random.default_rng(rng.getrandbits(64)).permutation(len(x_points) * len(y_points))
+            columns = len(x_points)
+            search_points = ((x_points[i % columns], y_points[i // columns]) for i in order.tolist())
+        else:
+            # Urutkan titik berdasarkan jarak pusat kendaraan ke posisi yang diinginkan
+            grid_x, grid_y = np.meshgrid(x_points, y_points)
+            grid_x, grid_y = grid_x.ravel(), grid_y.ravel()
+            distance = np.hypot(grid_x + footprint_width / 2 - preferred_centre[0],
+                                grid_y + footprint_length / 2 - preferred_centre[1])
+            order = np.argsort(distance, kind='stable')
+            search_points = list(zip(grid_x[order], grid_y[order]))
+    else:
+        # Dek sangat besar: sampel titik grid acak, lalu kandidat sudut di samping
+        # kendaraan yang ada (posisi layak selalu bisa digeser ke salah satunya)
+        sampled = ((rng.randrange(count_x) * grid_step, rng.randrange(count_y) * grid_step)
+                   for _ in range(MAX_SEARCH_POINTS // 2))
+        if preferred_centre is not None:
+            target = (round((preferred_centre[0] - footprint_width / 2) / grid_step) * grid_step,
+                      round((preferred_centre[1] - footprint_length / 2) / grid_step) * grid_step)
+            sampled = sorted(itertools.chain([target], sampled),
+                             key=lambda p: math.hypot(p[0] - target[0], p[1] - target[1]))
+        # Sisi rintangan juga menjadi kandidat sudut
+        walls = [{'x': x0, 'y': y0, 'width': x1 - x0, 'length': y1 - y0}
+                 for x0, y0, x1, y1 in map(bounding_box, ship_layout.get('obstacles') or ())]
+        rects = itertools.chain(existing_vehicles, walls)
+        if clearances:
+            # Zona menempel badan atau zona tetangga (jarak bebas mana yang lebih besar belum diketahui)
+            rects = itertools.chain(rects, (dict(zip(('x', 'y', 'width', 'length'), inflate(v, clearances)))
+                                            for v in existing_vehicles))
+        search_points = itertools.chain(sampled, _corner_candidates(rects, max_x, max_y, MAX_SEARCH_POINTS // 2))
+
+    vehicle_id = vehicle.get('id')
+    for x, y in search_points:
+        vehicle['x'] = round(x + dx, 2)
+        vehicle['y'] = round(y + dy, 2)
+
+        if not fits_on_ship(vehicle, ship_layout):
+            continue
+        if not index.is_free(vehicle, vehicle_id):
+            continue
+        if constraint is None or constraint(vehicle):
+            return True
+
+    return False
+
+
+# Jumlah hasil penempatan yang disimpan di cache LRU
+PLACEMENT_CACHE_SIZE = 4096
+
+# Fungsi untuk sidik jari armada (tidak bergantung urutan, stabil antar proses)
+def fleet_fingerprint(vehicles, clearances=None):
+    return hash(frozenset(body(v) + clearance_margins(v, clearances) + (int(v.get('port') or 1),) for v in vehicles))
+
+# Fungsi untuk kunci cache penempatan
+def placement_key(vehicle, ship_layout, existing_vehicles, grid_step, seed, preferred_centre=None,
+                  constrained=False):
+    """
+    Semua masukan yang menentukan hasil find_empty_position: ukuran kapal,
+    rintangan dan jarak bebasnya, grid density, armada, footprint kendaraan
+    dan seed (plus target dan batasan pelabuhan bila dipakai).
+    """
+    if preferred_centre is not None:
+        preferred_centre = (round(preferred_centre[0], 3), round(preferred_centre[1], 3))
+    clearances = ship_layout.get('clearances')
+    return (ship_layout['length'], ship_layout['width'], hash(obstacles_key(ship_layout.get('obstacles'))),
+            clearances_key(clearances), grid_step, fleet_fingerprint(existing_vehicles, clearances),
+            vehicle['length'], vehicle['width'], clearance_margins(vehicle, clearances), int(vehicle.get('port') or 1) if constrained else None,
+            seed, preferred_centre, constrained)
+
+
+class PlacementCache:
+    """
+    Cache LRU hasil pencarian posisi: kunci placement_key -> (x, y), atau
+    None jika tidak ada ruang. Aman dipakai bersama antar sesi/thread.
+    """
+
+    def __init__(self, maxsize=PLACEMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key):
+        """Mengembalikan (ditemukan, posisi)"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+
+    def store(self, key, position):
+        with self._lock:
+            self._entries[key] = position
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+# Fungsi untuk pencarian posisi yang deterministik dan di-cache
+def seeded_find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step=1.0, seed=0,
+                               preferred_centre=None, constraint=None, index=None, cache=None):
+    """
+    Seperti find_empty_position, tetapi urutan pencarian diturunkan dari
+    kunci penempatan sehingga masukan yang sama selalu memberi posisi yang
+    sama, dan hasilnya bisa diambil dari cache tanpa mencari ulang.
+    """
+    key = placement_key(vehicle, ship_layout, existing_vehicles, grid_step, seed, preferred_centre,
+                        constraint is not None)
+    if cache is not None:
+        found, position = cache.lookup(key)
+        if found:
+            if position is None:
+                return False
+            vehicle['x'], vehicle['y'] = position
+            return True
+
+    # random.Random dengan seed string memakai sha512, jadi stabil antar proses
+    rng = random.Random(repr(key))
+    placed = find_empty_position(vehicle, ship_layout, existing_vehicles, grid_step, preferred_centre,
+                                 constraint, index, rng)
+    if cache is not None:
+        cache.store(key, (vehicle['x'], vehicle['y']) if placed else None)
+    return placed
+
+# Batas jumlah sel raster GridPlacer (memori dan waktu per penempatan sebanding dengan jumlah sel)
+MAX_RASTER_CELLS = 4_000_000
+
+# Fungsi untuk langkah raster GridPlacer: grid density, diperkasar (kelipatan grid) untuk dek sangat besar
+def raster_step(ship_layout, grid_step=1.0):
+    grid_step = float(grid_step)
+    area = float(ship_layout['length']) * float(ship_layout['width'])
+    return grid_step * max(1, math.ceil(math.sqrt(area / MAX_RASTER_CELLS) / grid_step - 1e-9))
+
+# Jumlah sel per pita baris yang dipindai contact_positions sekaligus
+CONTACT_BAND_CELLS = 65_536
+
+# Fungsi untuk jendela h×w yang seluruhnya bebas pada raster (summed-area table)
+def _free_windows(blocked, h, w):
+    integral = np.zeros((blocked.shape[0] + 1, blocked.shape[1] + 1), dtype=np.int32)
+    integral[1:, 1:] = blocked.cumsum(axis=0).cumsum(axis=1)
+    return (integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]) == 0
+
+
+class GridPlacer:
+    """
+    Versi raster dari find_empty_position untuk packing massal (misalnya
+    simulasi). Titik grid yang layak untuk sebuah footprint dihitung sekaligus
+    lewat summed-area table, lalu salah satunya dipilih acak seragam. Ini
+    sama dengan hasil pencarian acak find_empty_position (titik bebas pertama
+    dari urutan acak) selama kendaraan berada di titik grid; kendaraan yang
+    tidak sejajar grid dirasterisasi secara konservatif.
+
+    Peta jendela bebas per footprint (dalam sel) disimpan dan diperbarui
+    secara lokal setiap kali ada kendaraan baru, jadi penempatan berikutnya
+    untuk footprint yang sama tidak perlu menghitung ulang seluruh dek.
+    Rintangan ship_layout sudah terblokir sejak awal (mask dari cache).
+
+    Dengan jarak bebas, raster blocked memuat badan kendaraan dan rintangan,
+    raster zones memuat zona bebasnya: zona kandidat harus bebas di blocked
+    dan badannya bebas di zones (aturan clearance.too_close). Footprint
+    kendaraan untuk free_positions dkk. diambil dari footprint().
+
+    Raster tidak pernah melebihi sekitar MAX_RASTER_CELLS sel: untuk dek
+    sangat besar langkahnya diperkasar ke kelipatan grid_step (raster_step),
+    sehingga posisi tetap sah tetapi lebih renggang. Pemanggil yang butuh
+    posisi pada grid density penuh memakai SparseOccupancy dan
+    find_empty_position (lihat decks.pack_deck).
+    """
+
+    def __init__(self, ship_layout, grid_step=1.0):
+        self.length = float(ship_layout['length'])
+        self.width = float(ship_layout['width'])
+        self.grid_step = raster_step(ship_layout, grid_step)
+        self.rows = max(1, math.ceil(self.length / self.grid_step - 1e-9))
+        self.cols = max(1, math.ceil(self.width / self.grid_step - 1e-9))
+        self.blocked = obstacle_mask(ship_layout.get('obstacles'), self.rows, self.cols, self.grid_step)
+        self.clearances = ship_layout.get('clearances')
+        self.zones = np.zeros((self.rows, self.cols), dtype=bool) if self.clearances else None
+        self._windows = {}  # bentuk sel footprint -> bool array titik grid yang layak
+        self._first_rows = {}  # bentuk sel footprint -> baris pertama yang mungkin masih layak
+
+    @classmethod
+    def from_vehicles(cls, ship_layout, vehicles, grid_step=1.0):
+        placer = cls(ship_layout, grid_step)
+        for vehicle in vehicles:
+            placer.block(vehicle)
+        return placer
+
+    def copy(self):
+        placer = GridPlacer({'length': self.length, 'width': self.width, 'clearances': self.clearances},
+                            self.grid_step)
+        placer.blocked = self.blocked.copy()
+        if self.zones is not None:
+            placer.zones = self.zones.copy()
+        placer._windows = {shape: window.copy() for shape, window in self._windows.items()}
+        placer._first_rows = dict(self._first_rows)
+        return placer
+
+    def _cells(self, length, width):
+        return (max(1, math.ceil(length / self.grid_step - 1e-9)),
+                max(1, math.ceil(width / self.grid_step - 1e-9)))
+
+    # Fungsi untuk rentang sel (konservatif) yang disentuh persegi
+    def _cell_span(self, x, y, width, length):
+        r0 = max(0, int(math.floor(y / self.grid_step + 1e-9)))
+        r1 = min(self.rows, math.ceil((y + length) / self.grid_step - 1e-9))
+        c0 = max(0, int(math.floor(x / self.grid_step + 1e-9)))
+        c1 = min(self.cols, math.ceil((x + width) / self.grid_step - 1e-9))
+        return r0, r1, c0, c1
+
+    def footprint(self, vehicle):
+        """(panjang zona, lebar zona, dx, dy): zona termasuk jarak bebas dan jarak bebasnya"""
+        dx, dy = clearance_margins(vehicle, self.clearances)
+        return vehicle['length'] + 2 * dy, vehicle['width'] + 2 * dx, dx, dy
+
+    def _shape(self, footprint):
+        """Bentuk footprint dalam sel: (h, w) zona, lalu offset dan ukuran sel badan di dalamnya"""
+        length, width, dx, dy = footprint
+        h, w = self._cells(length, width)
+        body_row = int(math.floor(dy / self.grid_step + 1e-9))
+        body_col = int(math.floor(dx / self.grid_step + 1e-9))
+        body_h = max(1, math.ceil((length - dy) / self.grid_step - 1e-9) - body_row)
+        body_w = max(1, math.ceil((width - dx) / self.grid_step - 1e-9) - body_col)
+        return h, w, body_row, body_col, body_h, body_w
+
+    def block(self, vehicle):
+        r0, r1, c0, c1 = self._cell_span(vehicle['x'], vehicle['y'], vehicle['width'], vehicle['length'])
+        self.blocked[r0:r1, c0:c1] = True
+        if self.zones is not None:
+            z0, z1, zc0, zc1 = self._cell_span(*inflate(vehicle, self.clearances))
+            self.zones[z0:z1, zc0:zc1] = True
+
+        # Titik yang zonanya menyentuh badan baru, atau badannya menyentuh zona baru, tidak lagi layak
+        for (h, w, body_row, body_col, body_h, body_w), window in self._windows.items():
+            window[max(0, r0 - h + 1):r1, max(0, c0 - w + 1):c1] = False
+            if self.zones is not None:
+                window[max(0, z0 - body_h + 1 - body_row):max(0, z1 - body_row),
+                       max(0, zc0 - body_w + 1 - body_col):max(0, zc1 - body_col)] = False
+
+    def _window(self, shape):
+        window = self._windows.get(shape)
+        if window is None:
+            h, w, body_row, body_col, body_h, body_w = shape
+            window = _free_windows(self.blocked, h, w)
+            if self.zones is not None:
+                window &= _free_windows(self.zones, body_h, body_w)[body_row:body_row + window.shape[0],
+                                                                    body_col:body_col + window.shape[1]]
+            self._windows[shape] = window
+        return window
+
+    def _limits(self, footprint):
+        """(bentuk, baris maks, kolom maks) sudut zona; None jika footprint tidak muat di dek"""
+        length, width = footprint[:2]
+        shape = self._shape(footprint)
+        max_row = math.floor((self.length - length) / self.grid_step + 1e-9)
+        max_col = math.floor((self.width - width) / self.grid_step + 1e-9)
+        if max_row < 0 or max_col < 0 or shape[0] > self.rows or shape[1] > self.cols:
+            return None
+        return shape, max_row, max_col
+
+    def prepare(self, footprint):
+        """Menghitung peta titik layak footprint ini lebih dulu (misalnya saat kendaraan masuk antrian)"""
+        limits = self._limits(footprint)
+        if limits is not None:
+            self._window(limits[0])
+
+    def retain(self, footprints):
+        """Membuang peta titik layak selain milik footprints; membatasi memori dan biaya block()"""
+        shapes = {self._shape(footprint) for footprint in footprints}
+        for shape in [shape for shape in self._windows if shape not in shapes]:
+            del self._windows[shape]
+            self._first_rows.pop(shape, None)
+
+    def free_positions(self, footprint):
+        """Indeks (baris, kolom) titik grid tempat footprint ini muat"""
+        limits = self._limits(footprint)
+        if limits is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        shape, max_row, max_col = limits
+        window = self._window(shape)
+        if max_row + 1 < window.shape[0] or max_col + 1 < window.shape[1]:
+            window = np.ascontiguousarray(window[:max_row + 1, :max_col + 1])
+        return np.divmod(np.flatnonzero(window), window.shape[1])
+
+    def contact_positions(self, footprint, limit=None):
+        """
+        Titik layak yang menempel di sisi kiri (dinding atau kendaraan lain),
+        urut dari haluan lalu dari kiri: kandidat bottom-left untuk heuristik online.
+
+        Raster dipindai per pita baris (sekitar CONTACT_BAND_CELLS sel) mulai
+        dari baris pertama yang masih mungkin layak, dan berhenti begitu limit
+        kandidat terkumpul. Titik layak hanya bisa hilang, jadi penunjuk baris
+        per footprint hanya maju dan biaya per panggilan tidak bergantung pada
+        luas dek.
+        """
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        limits = self._limits(footprint)
+        if limits is None:
+            return empty
+        shape, max_row, max_col = limits
+        window = self._window(shape)
+        band_rows = max(1, CONTACT_BAND_CELLS // (max_col + 1))
+
+        row = first_row = self._first_rows.get(shape, 0)
+        found_rows, found_cols, count = [], [], 0
+        while row <= max_row and (limit is None or count < limit):
+            band = window[row:min(max_row + 1, row + band_rows), :max_col + 1]
+            rows, cols = np.nonzero(band)
+            if row == first_row:
+                # Baris tanpa titik layak tetap kosong selamanya
+                first_row = row + (int(rows[0]) if len(rows) else band.shape[0])
+                self._first_rows[shape] = first_row
+            touching = (cols == 0) | ~band[rows, np.maximum(cols - 1, 0)]
+            found_rows.append(rows[touching] + row)
+            found_cols.append(cols[touching])
+            count += len(found_rows[-1])
+            row += band.shape[0]
+
+        if not found_rows:
+            return empty
+        rows, cols = np.concatenate(found_rows), np.concatenate(found_cols)
+        return (rows, cols) if limit is None else (rows[:limit], cols[:limit])
+
+    def windows_lost(self, row, col, footprint, footprints):
+        """
+        Jumlah titik layak yang hilang bagi footprint lain jika kendaraan
+        ditempatkan di (row, col).
+        """
+        h, w, body_row, body_col, body_h, body_w = self._shape(footprint)
+        lost = 0
+        for other in footprints:
+            other_h, other_w, other_row, other_col, other_body_h, other_body_w = shape = self._shape(other)
+            if other_h > self.rows or other_w > self.cols:
+                continue
+            window = self._window(shape)
+            # Zona lain yang menyentuh badan baru, dan badan lain yang menyentuh zona baru
+            areas = [(row + body_row - other_h + 1, row + body_row + body_h,
+                      col + body_col - other_w + 1, col + body_col + body_w)]
+            if self.zones is not None:
+                areas.append((row - other_row - other_body_h + 1, row + h - other_row,
+                              col - other_col - other_body_w + 1, col + w - other_col))
+            top = max(0, min(area[0] for area in areas))
+            left = max(0, min(area[2] for area in areas))
+            region = window[top:max(area[1] for area in areas), left:max(area[3] for area in areas)]
+            touched = np.zeros(region.shape, dtype=bool)
+            for r0, r1, c0, c1 in areas:
+                touched[max(0, r0 - top):max(0, r1 - top), max(0, c0 - left):max(0, c1 - left)] = True
+            lost += int(np.count_nonzero(region & touched))
+        return lost
+
+    def place_at(self, vehicle, row, col):
+        """(row, col): sudut zona; kendaraan digeser sebesar jarak bebasnya"""
+        dx, dy = clearance_margins(vehicle, self.clearances)
+        vehicle['x'] = round(float(col) * self.grid_step + dx, 2)
+        vehicle['y'] = round(float(row) * self.grid_step + dy, 2)
+        self.block(vehicle)
+
+    def place(self, vehicle, rng=None):
+        rows, cols = self.free_positions(self.footprint(vehicle))
+        if len(rows) == 0:
+            return False
+        choice = (rng or random).randrange(len(rows))
+        self.place_at(vehicle, rows[choice], cols[choice])
+        return True
+
+
+# Jumlah lajur bawaan: lebar lajur Ro-Ro umumnya sekitar 3 meter
+def default_lane_count(ship_width):
+    return max(1, int(ship_width // 3.0))
+
+# Pengepakan 1-D per lajur (mode lajur)
+class LanePacker:
+    """
+    Membagi lebar dek menjadi lajur-lajur dan memperlakukan setiap lajur
+    sebagai strip 1-D yang diisi dari depan (y = 0) ke belakang.
+
+    Sisa panjang setiap lajur disimpan dalam daftar terurut (remaining, lane)
+    sehingga pencarian best-fit cukup satu bisect: O(log lajur) per kendaraan.
+    Kendaraan dicatat per lajur berdasarkan id, sehingga add/remove/sync
+    hanya menghitung ulang lajur yang disentuh; status yang sama bisa
+    disimpan antar rerun dan diperbarui inkremental seperti SparseOccupancy.
+
+    Rintangan memblokir rentang y di lajur yang dilewati kotak pembatasnya,
+    dibulatkan keluar ke sel grid_step (aturan raster yang sama dengan
+    SparseOccupancy dan layout_violations); kendaraan yang akan menimpa
+    rentang itu dimulai tepat di belakangnya.
+    Jarak bebas mengikuti aturan clearance.too_close: di dalam lajur celah
+    depan/belakang adalah yang lebih besar dari kedua kendaraan, tepi dek
+    dan rintangan mendapat jarak bebas penuh, dan kendaraan di lajur
+    tetangga yang terlalu dekat ke samping diperlakukan seperti rintangan.
+    """
+
+    def __init__(self, deck_length, deck_width, lane_count, obstacles=None, clearances=None, grid_step=1.0):
+        self.deck_length = float(deck_length)
+        self.deck_width = float(deck_width)
+        self.lane_count = max(1, int(lane_count))
+        self.lane_width = self.deck_width / self.lane_count
+
+        # Ujung terdepan yang masih kosong di setiap lajur (meter dari depan), termasuk jarak bebas
+        self.frontier = [0.0] * self.lane_count
+        # Ujung belakang badan kendaraan terakhir di setiap lajur
+        self.rear = [0.0] * self.lane_count
+        # Panjang lajur yang benar-benar terisi kendaraan
+        self.used = [0.0] * self.lane_count
+        self.counts = [0] * self.lane_count
+        self._free = [(self.deck_length, lane) for lane in range(self.lane_count)]
+        # Kendaraan per lajur: id -> (y, panjang, jarak bebas depan/belakang, badan, zona)
+        self._lanes = [{} for _ in range(self.lane_count)]
+        # id -> (kunci posisi, lajur pertama, lajur terakhir)
+        self._fleet = {}
+        # Rentang y yang diblokir rintangan per lajur (dibulatkan ke sel raster indeks okupansi)
+        self.blocked = lane_intervals(obstacles, self.lane_count, self.lane_width, grid_step)
+        # Kotak sel rintangan, untuk zona yang menjorok ke lajur tetangga
+        self._obstacle_boxes = [cell_box(obstacle, grid_step) for obstacle in obstacles or ()]
+        self.clearances = clearances
+        # Kendaraan per lajur untuk cek jarak bebas samping: (y, badan, zona), urut y
+        self._placed = [[] for _ in range(self.lane_count)]
+        self._side_reach = 0.0     # jarak bebas samping terbesar yang sudah tercatat
+        self._longest = 0.0        # panjang zona terbesar yang sudah tercatat
+
+    @classmethod
+    def from_vehicles(cls, ship_layout, vehicles, grid_step=1.0):
+        """Membangun status lajur dari kendaraan yang sudah ada di dek"""
+        packer = cls(ship_layout['length'], ship_layout['width'],
+                     ship_layout.get('lanes', default_lane_count(ship_layout['width'])),
+                     ship_layout.get('obstacles'), ship_layout.get('clearances'), grid_step)
+        for vehicle in vehicles:
+            packer.add(vehicle)
+        return packer
+
+    def copy(self):
+        packer = LanePacker(self.deck_length, self.deck_width, self.lane_count, clearances=self.clearances)
+        packer.blocked = self.blocked
+        packer._obstacle_boxes = self._obstacle_boxes
+        packer.frontier = list(self.frontier)
+        packer.rear = list(self.rear)
+        packer.used = list(self.used)
+        packer.counts = list(self.counts)
+        packer._free = list(self._free)
+        packer._lanes = [dict(entries) for entries in self._lanes]
+        packer._fleet = dict(self._fleet)
+        packer._placed = [list(placed) for placed in self._placed]
+        packer._side_reach = self._side_reach
+        packer._longest = self._longest
+        return packer
+
+    def __len__(self):
+        return len(self._fleet)
+
+    def _set_frontier(self, lane, frontier):
+        """Memperbarui ujung lajur beserta entrinya di daftar sisa panjang terurut"""
+        if frontier == self.frontier[lane]:
+            return
+        del self._free[bisect_left(self._free, (self.deck_length - self.frontier[lane], lane))]
+        self.frontier[lane] = frontier
+        insort(self._free, (self.deck_length - frontier, lane))
+
+    def add(self, vehicle):
+        """
+        Mencatat kendaraan yang sudah berposisi. Kendaraan yang menyentuh
+        rentang x suatu lajur memblokir lajur itu sampai ujung belakangnya
+        (juga berlaku untuk kendaraan mode grid).
+        """
+        vehicle_id = vehicle['id']
+        if vehicle_id in self._fleet:
+            self.remove(vehicle_id)
+        _, dy = clearance_margins(vehicle, self.clearances)
+        first = max(0, int(vehicle['x'] // self.lane_width))
+        last = min(self.lane_count - 1, int((vehicle['x'] + vehicle['width'] - 1e-9) // self.lane_width))
+        self._fleet[vehicle_id] = (self._position_key(vehicle, dy), first, last)
+
+        zone = inflate(vehicle, self.clearances) if self.clearances else None
+        entry = (vehicle['y'], vehicle['length'], dy, body(vehicle), zone)
+        for lane in range(first, last + 1):
+            self._lanes[lane][vehicle_id] = entry
+            self._set_frontier(lane, max(self.frontier[lane], vehicle['y'] + vehicle['length'] + dy))
+            self.rear[lane] = max(self.rear[lane], vehicle['y'] + vehicle['length'])
+            self.used[lane] += vehicle['length']
+            self.counts[lane] += 1
+            if zone is not None:
+                insort(self._placed[lane], (vehicle['y'], entry[3], zone))
+        if zone is not None:
+            self._side_reach = max(self._side_reach, vehicle['x'] - zone[0])
+            self._longest = max(self._longest, zone[3])
+
+    def remove(self, vehicle_id):
+        """Menghapus kendaraan; hanya lajur yang disentuhnya yang dihitung ulang"""
+        record = self._fleet.pop(vehicle_id, None)
+        if record is None:
+            return
+        _, first, last = record
+        for lane in range(first, last + 1):
+            entries = self._lanes[lane]
+            del entries[vehicle_id]
+            self._set_frontier(lane, max((y + length + dy for y, length, dy, _, _ in entries.values()), default=0.0))
+            self.rear[lane] = max((y + length for y, length, _, _, _ in entries.values()), default=0.0)
+            self.used[lane] = sum(length for _, length, _, _, _ in entries.values())
+            self.counts[lane] = len(entries)
+            if self.clearances:
+                self._placed[lane] = sorted((y, own, zone) for y, _, _, own, zone in entries.values())
+
+    @staticmethod
+    def _position_key(vehicle, dy):
+        return vehicle['x'], vehicle['y'], vehicle['width'], vehicle['length'], dy
+
+    def sync(self, vehicles):
+        """Menyamakan status dengan armada; hanya kendaraan yang ditambah, dihapus atau dipindah yang diproses"""
+        current = {v['id']: v for v in vehicles}
+        for vehicle_id in [vid for vid in self._fleet if vid not in current]:
+            self.remove(vehicle_id)
+        for vehicle_id, vehicle in current.items():
+            record = self._fleet.get(vehicle_id)
+            if record is None or record[0] != self._position_key(vehicle, clearance_margins(vehicle, self.clearances)[1]):
+                self.add(vehicle)
+
+    def memory_bytes(self):
+        """Perkiraan memori status lajur (byte)"""
+        per_vehicle = sys.getsizeof((0.0,) * 5) + (sys.getsizeof(((0.0,) * 4,) * 3) if self.clearances else 0)
+        return (sys.getsizeof(self._fleet) + sum(sys.getsizeof(entries) for entries in self._lanes)
+                + per_vehicle * sum(len(entries) for entries in self._lanes))
+
+    def best_fit(self, length):
+        """Lajur dengan sisa panjang terkecil yang masih cukup, atau None"""
+        index = bisect_left(self._free, (length, -1))
+        if index == len(self._free):
+            return None
+        return self._free[index][1]
+
+    def _side_limit(self, lane, own, zone):
+        """y badan terkecil yang tidak melanggar jarak bebas kendaraan maupun rintangan di lajur tetangga"""
+        y = own[1]
+        for x0, y0, x1, y1 in self._obstacle_boxes:
+            if rects_overlap(zone, (x0, y0, x1 - x0, y1 - y0)):
+                y = max(y, y1 + own[1] - zone[1])
+        reach = max(own[0] - zone[0], self._side_reach)
+        first = max(0, int((own[0] - reach) // self.lane_width))
+        last = min(self.lane_count - 1, int((own[0] + own[2] + reach) // self.lane_width))
+        for other_lane in range(first, last + 1):
+            if other_lane == lane:
+                continue
+            placed = self._placed[other_lane]
+            # Hanya kendaraan yang zonanya bisa menjangkau rentang y zona ini
+            for index in range(bisect_left(placed, (zone[1] + zone[3] + self._longest,)) - 1, -1, -1):
+                other_y, other_body, other_zone = placed[index]
+                if other_y + self._longest <= zone[1]:
+                    break
+                if too_close(own, zone, other_body, other_zone):
+                    y = max(y, other_body[1] + other_body[3] + own[1] - zone[1], other_zone[1] + other_zone[3])
+        return y
+
+    def _slot(self, lane, length, width=0.0, dx=0.0, dy=0.0):
+        """Posisi y badan pertama dari ujung lajur yang memenuhi jarak bebas, atau None"""
+        x = lane * self.lane_width + (self.lane_width - width) / 2
+        # Tepi dek samping mendapat jarak bebas penuh
+        if x < dx - 1e-9 or x + width > self.deck_width - dx + 1e-9:
+            return None
+        y = max(self.rear[lane] + dy, self.frontier[lane])
+        while y + length + dy <= self.deck_length + 1e-9:
+            for start, end in self.blocked[lane]:
+                if end <= y - dy:
+                    continue
+                if start >= y + length + dy:
+                    break
+                y = end + dy
+            if not self.clearances:
+                break
+            limit = self._side_limit(lane, (x, y, width, length), (x - dx, y - dy, width + 2 * dx, length + 2 * dy))
+            if limit <= y:
+                break
+            y = limit
+        return y if y + length + dy <= self.deck_length + 1e-9 else None
+
+    def place(self, vehicle, constraint=None):
+        """
+        Menempatkan kendaraan di lajur best-fit. Mengembalikan False jika tidak muat.
+        constraint: fungsi constraint(vehicle) -> bool; lajur yang menolak
+            dilewati dan lajur best-fit berikutnya dicoba.
+        """
+        dx, dy = clearance_margins(vehicle, self.clearances)
+        length = vehicle['length']
+        if vehicle['width'] > self.lane_width:
+            return False
+
+        # Sisa lajur minimal panjang + jarak bebas belakang; posisi pastinya dicek per lajur
+        lane = slot = None
+        for _, candidate in self._free[bisect_left(self._free, (length + dy, -1)):]:
+            candidate_slot = self._slot(candidate, length, vehicle['width'], dx, dy)
+            if candidate_slot is None:
+                continue
+            vehicle['x'] = candidate * self.lane_width + (self.lane_width - vehicle['width']) / 2
+            vehicle['y'] = candidate_slot
+            if constraint is None or constraint(vehicle):
+                lane, slot = candidate, candidate_slot
+                break
+        if lane is None:
+            return False
+
+        # Kendaraan berada di tengah lajur
+        vehicle['x'] = lane * self.lane_width + (self.lane_width - vehicle['width']) / 2
+        vehicle['y'] = slot
+        self.add(vehicle)
+        return True
+
+    def pack(self, vehicles, key=None):
+        """
+        Best-fit decreasing: kendaraan terpanjang ditempatkan lebih dulu.
+        key: urutan alternatif (misalnya pelabuhan terakhir lebih dulu agar berada paling dalam).
+        Mengembalikan (ditempatkan, tidak_muat).
+        """
+        if key is None:
+            key = lambda v: -v['length']
+        placed, rejected = [], []
+        for vehicle in sorted(vehicles, key=key):
+            if self.place(vehicle):
+                placed.append(vehicle)
+            else:
+                rejected.append(vehicle)
+        return placed, rejected
+
+    def lane_usage(self):
+        """Laporan lane-metre per lajur"""
+        return [
+            {
+                'lane': lane + 1,
+                'vehicles': self.counts[lane],
+                'lane_metres_used': self.used[lane],
+                'lane_metres_free': max(0.0, self.deck_length - self.frontier[lane]),
+                'usage_percentage': (self.used[lane] / self.deck_length) * 100 if self.deck_length > 0 else 0,
+            }
+            for lane in range(self.lane_count)
+        ]
@@ -0,0 +1,125 @@
+# sessions.py - Artefak besar per sesi (diagram, indeks, estimator) dengan anggaran memori dan LRU
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Anggaran memori bawaan untuk artefak semua sesi (byte, perkiraan)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Sesi yang tidak aktif selama ini (detik) kehilangan artefaknya meskipun anggaran belum penuh
+DEFAULT_MAX_IDLE = 15 * 60
+
+
+# Fungsi untuk perkiraan ukuran daftar kendaraan (setiap objek string dihitung sekali)
+def vehicles_bytes(vehicles, seen=None):
+    """
+    seen: set id objek yang sudah dihitung atau dimiliki bersama (misalnya
+    string katalog); diperbarui di tempat sehingga bisa dibagi antar panggilan
+    """
+    if seen is None:
+        seen = set()
+    total = sys.getsizeof(vehicles)
+    for vehicle in vehicles:
+        total += sys.getsizeof(vehicle)
+        for value in vehicle.values():
+            if isinstance(value, str):
+                if id(value) in seen:
+                    continue
+                seen.add(id(value))
+            total += sys.getsizeof(value)
+    return total
+
+# Fungsi untuk ukuran artefak: angka tetap atau fungsi yang mengukur nilai saat ini
+def _measure(entry):
+    size = entry['size']
+    return size(entry['value']) if callable(size) else size
+
+
+class SessionArtifacts:
+    """
+    Registry proses-wide untuk artefak besar yang bisa dibangun ulang dari
+    state sesi (figure Plotly, indeks okupansi, estimator kapasitas). Sesi
+    hanya menyimpan state kecil; artefak disimpan di sini dengan kunci isi
+    sehingga rerun tanpa perubahan tidak membangunnya ulang.
+
+    Sesi diurutkan LRU berdasarkan akses terakhir. Jika total melewati
+    max_bytes, atau sebuah sesi menganggur lebih dari max_idle detik,
+    artefak sesi tertua dibuang; sesi itu membangunnya ulang saat kembali.
+    Sesi yang sedang mengakses tidak pernah dibuang. Aman dipakai antar thread.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_idle=DEFAULT_MAX_IDLE):
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self.evictions = 0
+        self._sessions = OrderedDict()   # session_id -> {'last_access': detik, 'entries': {nama: entri}}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _touch(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {'last_access': 0.0, 'entries': {}}
+        session['last_access'] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id, name, key):
+        """Artefak jika kuncinya sama, atau None"""
+        with self._lock:
+            entry = self._touch(session_id)['entries'].get(name)
+            if entry is None or entry['key'] != key:
+                return None
+            return entry['value']
+
+    def put(self, session_id, name, key, value, size):
+        """size: byte, atau fungsi size(value) untuk artefak yang tumbuh (misalnya indeks)"""
+        with self._lock:
+            self._touch(session_id)['entries'][name] = {'key': key, 'value': value, 'size': size}
+            self._evict(session_id)
+        return value
+
+    def discard(self, session_id, name=None):
+        """Membuang satu artefak, atau semua artefak sesi jika name None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            if name is None:
+                del self._sessions[session_id]
+            else:
+                session['entries'].pop(name, None)
+
+    def _evict(self, current_id):
+        now = time.monotonic()
+        sizes = {session_id: sum(_measure(entry) for entry in session['entries'].values())
+                 for session_id, session in self._sessions.items()}
+        total = sum(sizes.values())
+        for session_id in list(self._sessions):
+            if session_id == current_id:
+                continue
+            idle = now - self._sessions[session_id]['last_access'] > self.max_idle
+            if not idle and total <= self.max_bytes:
+                break
+            total -= sizes[session_id]
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def usage(self, session_id=None):
+        """Ukuran artefak per sesi {session_id: {nama: byte}}, atau satu sesi saja"""
+        with self._lock:
+            report = {sid: {name: _measure(entry) for name, entry in session['entries'].items()}
+                      for sid, session in self._sessions.items()
+                      if session_id is None or sid == session_id}
+        if session_id is not None:
+            return report.get(session_id, {})
+        return report
+
+    def idle_seconds(self):
+        """Lama menganggur per sesi (detik)"""
+        now = time.monotonic()
+        with self._lock:
+            return {sid: now - session['last_access'] for sid, session in self._sessions.items()}
@@ -0,0 +1,145 @@
+# stability.py - Pelacakan berat, beban gandar dan titik berat (CoG) dek
+import numpy as np
+
+# Berat bawaan per tipe kendaraan (ton)
+DEFAULT_WEIGHTS = {
+    'motor': 0.25,
+    'car': 1.5,
+    'truck': 20.0,
+    'bus': 15.0,
+    'custom': 2.0
+}
+
+# Jumlah gandar bawaan per tipe kendaraan
+DEFAULT_AXLES = {
+    'motor': 2,
+    'car': 2,
+    'truck': 3,
+    'bus': 2,
+    'custom': 2
+}
+
+
+# Fungsi untuk berat kendaraan (memakai berat bawaan tipe jika kosong)
+def vehicle_weight(vehicle):
+    weight = vehicle.get('weight')
+    if weight is None:
+        return DEFAULT_WEIGHTS.get(vehicle['type'], DEFAULT_WEIGHTS['custom'])
+    return float(weight)
+
+# Fungsi untuk beban per gandar (ton)
+def axle_load(vehicle):
+    return vehicle_weight(vehicle) / DEFAULT_AXLES.get(vehicle['type'], DEFAULT_AXLES['custom'])
+
+
+class StabilityTracker:
+    """
+    Menyimpan jumlah massa dan momen (massa × titik tengah) seluruh kendaraan
+    sehingga LCG/TCG diperbarui dalam O(1) saat kendaraan ditambah, dihapus
+    atau dipindah. recompute() menghitung ulang semuanya sekaligus dengan NumPy.
+
+    Sumbu mengikuti diagram: x = lebar (transversal), y = panjang (longitudinal).
+    """
+
+    def __init__(self):
+        self.total_mass = 0.0
+        self.moment_x = 0.0
+        self.moment_y = 0.0
+        self._entries = {}  # id -> (massa, pusat_x, pusat_y)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _contribution(vehicle):
+        return (vehicle_weight(vehicle),
+                vehicle['x'] + vehicle['width'] / 2,
+                vehicle['y'] + vehicle['length'] / 2)
+
+    def add(self, vehicle):
+        if vehicle['id'] in self._entries:
+            self.remove(vehicle['id'])
+        mass, cx, cy = self._contribution(vehicle)
+        self._entries[vehicle['id']] = (mass, cx, cy)
+        self.total_mass += mass
+        self.moment_x += mass * cx
+        self.moment_y += mass * cy
+
+    def remove(self, vehicle_id):
+        entry = self._entries.pop(vehicle_id, None)
+        if entry is None:
+            return
+        mass, cx, cy = entry
+        self.total_mass -= mass
+        self.moment_x -= mass * cx
+        self.moment_y -= mass * cy
+        # Hindari sisa pembulatan floating point saat dek kosong
+        if not self._entries:
+            self.total_mass = self.moment_x = self.moment_y = 0.0
+
+    # Pindah atau ubah ukuran/berat = hapus kontribusi lama + tambah yang baru
+    def update(self, vehicle):
+        self.add(vehicle)
+
+    def recompute(self, vehicles):
+        """Menghitung ulang seluruh momen dalam satu pass tervektorisasi"""
+        self._entries = {}
+        self.total_mass = self.moment_x = self.moment_y = 0.0
+        if not vehicles:
+            return
+
+        ids = [v['id'] for v in vehicles]
+        mass = np.array([vehicle_weight(v) for v in vehicles], dtype=float)
+        cx = np.array([v['x'] for v in vehicles], dtype=float) + np.array([v['width'] for v in vehicles], dtype=float) / 2
+        cy = np.array([v['y'] for v in vehicles], dtype=float) + np.array([v['length'] for v in vehicles], dtype=float) / 2
+
+        self._entries = dict(zip(ids, zip(mass.tolist(), cx.tolist(), cy.tolist())))
+        self.total_mass = float(mass.sum())
+        self.moment_x = float(mass @ cx)
+        self.moment_y = float(mass @ cy)
+
+    @property
+    def tcg(self):
+        """Titik berat transversal (meter dari sisi kiri), None jika dek kosong"""
+        return self.moment_x / self.total_mass if self.total_mass > 0 else None
+
+    @property
+    def lcg(self):
+        """Titik berat longitudinal (meter dari depan), None jika dek kosong"""
+        return self.moment_y / self.total_mass if self.total_mass > 0 else None
+
+    def balance_target(self, vehicle, ship_layout):
+        """
+        Posisi pusat kendaraan yang membuat CoG gabungan tepat di tengah dek.
+        Jarak pusat kendaraan ke titik ini sebanding dengan pergeseran CoG
+        dari tengah, jadi meminimalkan jarak = meminimalkan ketidakseimbangan.
+        """
+        mass = vehicle_weight(vehicle)
+        if mass <= 0:
+            return ship_layout['width'] / 2, ship_layout['length'] / 2
+        combined = self.total_mass + mass
+        target_x = (combined * ship_layout['width'] / 2 - self.moment_x) / mass
+        target_y = (combined * ship_layout['length'] / 2 - self.moment_y) / mass
+        return target_x, target_y
+
+    def summary(self, ship_layout):
+        """Indikator trim/heel relatif terhadap tengah dek"""
+        if self.total_mass <= 0:
+            return {
+                'total_mass': 0.0, 'lcg': None, 'tcg': None,
+                'trim_lever': 0.0, 'heel_lever': 0.0,
+                'trim_moment': 0.0, 'heel_moment': 0.0
+            }
+
+        trim_lever = self.lcg - ship_layout['length'] / 2
+        heel_lever = self.tcg - ship_layout['width'] / 2
+        return {
+            'total_mass': self.total_mass,
+            'lcg': self.lcg,
+            'tcg': self.tcg,
+            # Positif = CoG ke arah belakang (trim by stern) / ke kanan (heel ke kanan)
+            'trim_lever': trim_lever,
+            'heel_lever': heel_lever,
+            'trim_moment': self.total_mass * trim_lever,
+            'heel_moment': self.total_mass * heel_lever,
+        }
@@ -0,0 +1,278 @@
+# voyage_store.py - Penyimpanan kapal, pelayaran dan penempatan kendaraan di SQLite (dengan R*Tree)
+#
+# Bisa dipakai dari halaman Streamlit maupun dari skrip:
+#
+#     with VoyageStore("voyages.db") as store:
+#         voyage_id = store.save_voyage("KMP Nusa", "Merak-Bakauheni 06:00", decks)
+#         in_frames = store.vehicles_in_frames(voyage_id, 40, 60)
+import json
+import sqlite3
+import threading
+
+from clearance import normalize_clearances
+
+# Lokasi database bawaan (relatif terhadap direktori kerja aplikasi)
+DEFAULT_DB_PATH = "voyages.db"
+
+# Jumlah kendaraan per halaman saat memuat layout besar
+PAGE_SIZE = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ships (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS voyages (
+    id INTEGER PRIMARY KEY,
+    ship_id INTEGER NOT NULL REFERENCES ships(id),
+    name TEXT NOT NULL,
+    departure TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    settings TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS decks (
+    id INTEGER PRIMARY KEY,
+    voyage_id INTEGER NOT NULL REFERENCES voyages(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ship TEXT NOT NULL,
+    name TEXT NOT NULL,
+    length REAL NOT NULL,
+    width REAL NOT NULL,
+    lanes INTEGER,
+    obstacles TEXT NOT NULL DEFAULT '[]',
+    clearances TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS placements (
+    id INTEGER PRIMARY KEY,
+    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    vehicle_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    length REAL NOT NULL,
+    width REAL NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    color TEXT,
+    icon TEXT,
+    weight REAL,
+    port INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS voyages_ship ON voyages(ship_id, id);
+CREATE INDEX IF NOT EXISTS decks_voyage ON decks(voyage_id, position);
+CREATE INDEX IF NOT EXISTS placements_deck ON placements(deck_id, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS placements_rtree USING rtree(id, min_voyage, max_voyage, min_x, max_x, min_y, max_y);
+"""
+
+_PLACEMENT_COLUMNS = ("vehicle_id", "name", "type", "length", "width", "x", "y", "color", "icon", "weight", "port")
+
+
+# Fungsi untuk mengubah baris placements menjadi dict kendaraan (format session_state)
+def _vehicle_from_row(row):
+    vehicle = dict(zip(_PLACEMENT_COLUMNS, row))
+    vehicle['id'] = vehicle.pop('vehicle_id')
+    return vehicle
+
+
+class VoyageStore:
+    """
+    Arsip pelayaran lokal. Setiap pelayaran menyimpan dek-deknya (format
+    yang sama dengan st.session_state.decks) dan penempatan kendaraan.
+    Kotak setiap kendaraan juga dimasukkan ke R*Tree bawaan SQLite sehingga
+    query wilayah (misalnya frame 40–60 m) tidak perlu memindai seluruh layout.
+
+    Satu koneksi dipakai bersama; semua operasi dikunci sehingga objek ini
+    aman dibagi antar sesi Streamlit lewat st.cache_resource.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+            # Database lama: kolom rintangan / jarak bebas belum ada
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(decks)")}
+            if 'obstacles' not in columns:
+                self._conn.execute("ALTER TABLE decks ADD COLUMN obstacles TEXT NOT NULL DEFAULT '[]'")
+            if 'clearances' not in columns:
+                self._conn.execute("ALTER TABLE decks ADD COLUMN clearances TEXT NOT NULL DEFAULT '{}'")
+            # Database lama: R*Tree tanpa dimensi pelayaran dibangun ulang dari placements
+            rtree_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(placements_rtree)")}
+            if 'min_voyage' not in rtree_columns:
+                with self._conn:
+                    self._conn.execute("DROP TABLE placements_rtree")
+                    self._conn.execute("CREATE VIRTUAL TABLE placements_rtree USING "
+                                       "rtree(id, min_voyage, max_voyage, min_x, max_x, min_y, max_y)")
+                    self._conn.execute(
+                        "INSERT INTO placements_rtree (id, min_voyage, max_voyage, min_x, max_x, min_y, max_y) "
+                        "SELECT p.id, d.voyage_id, d.voyage_id, p.x, p.x + p.width, p.y, p.y + p.length "
+                        "FROM placements p JOIN decks d ON d.id = p.deck_id")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _ship_id(self, name):
+        self._conn.execute("INSERT OR IGNORE INTO ships (name) VALUES (?)", (name,))
+        return self._conn.execute("SELECT id FROM ships WHERE name = ?", (name,)).fetchone()[0]
+
+    def save_voyage(self, ship, name, decks, settings=None, departure=None):
+        """
+        Menyimpan semua dek dan kendaraan dalam satu transaksi (executemany
+        untuk penempatan, satu INSERT ... SELECT untuk R*Tree per dek).
+        Mengembalikan id pelayaran.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO voyages (ship_id, name, departure, settings) VALUES (?, ?, ?, ?)",
+                (self._ship_id(ship), name, departure, json.dumps(settings or {})))
+            voyage_id = cursor.lastrowid
+
+            for position, deck in enumerate(decks):
+                layout = deck['layout']
+                deck_id = self._conn.execute(
+                    "INSERT INTO decks (voyage_id, position, ship, name, length, width, lanes, obstacles, clearances) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (voyage_id, position, deck.get('ship', ship), deck['name'],
+                     layout['length'], layout['width'], layout.get('lanes'),
+                     json.dumps(layout.get('obstacles') or []),
+                     json.dumps(layout.get('clearances') or {}))).lastrowid
+
+                self._conn.executemany(
+                    "INSERT INTO placements (deck_id, vehicle_id, name, type, length, width, x, y, color, icon, weight, port) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((deck_id, v['id'], v['name'], v['type'], v['length'], v['width'], v['x'], v['y'],
+                      v.get('color'), v.get('icon'), v.get('weight'), int(v.get('port') or 1))
+                     for v in deck['vehicles']))
+                self._conn.execute(
+                    "INSERT INTO placements_rtree (id, min_voyage, max_voyage, min_x, max_x, min_y, max_y) "
+                    "SELECT id, ?, ?, x, x + width, y, y + length FROM placements WHERE deck_id = ?",
+                    (voyage_id, voyage_id, deck_id))
+        return voyage_id
+
+    def delete_voyage(self, voyage_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM placements_rtree WHERE id IN "
+                "(SELECT p.id FROM placements p JOIN decks d ON d.id = p.deck_id WHERE d.voyage_id = ?)",
+                (voyage_id,))
+            self._conn.execute(
+                "DELETE FROM placements WHERE deck_id IN (SELECT id FROM decks WHERE voyage_id = ?)",
+                (voyage_id,))
+            self._conn.execute("DELETE FROM decks WHERE voyage_id = ?", (voyage_id,))
+            self._conn.execute("DELETE FROM voyages WHERE id = ?", (voyage_id,))
+
+    def list_voyages(self, ship=None, limit=50, offset=0):
+        """Ringkasan pelayaran terbaru lebih dulu (berhalaman)"""
+        query = (
+            "SELECT v.id, s.name, v.name, v.departure, v.created_at, "
+            "(SELECT COUNT(*) FROM decks d WHERE d.voyage_id = v.id), "
+            "(SELECT COUNT(*) FROM placements p JOIN decks d ON d.id = p.deck_id WHERE d.voyage_id = v.id) "
+            "FROM voyages v JOIN ships s ON s.id = v.ship_id"
+        )
+        params = []
+        if ship is not None:
+            query += " WHERE s.name = ?"
+            params.append(ship)
+        query += " ORDER BY v.id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{'id': row[0], 'ship': row[1], 'name': row[2], 'departure': row[3], 'created_at': row[4],
+                 'deck_count': row[5], 'vehicle_count': row[6]} for row in rows]
+
+    def load_decks(self, voyage_id):
+        """Dek pelayaran tanpa kendaraan, beserta id dek di database"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, ship, name, length, width, lanes, obstacles, clearances FROM decks WHERE voyage_id = ? "
+                "ORDER BY position", (voyage_id,)).fetchall()
+        # Jarak bebas kosong ('{}') berarti nonaktif (None, seperti di session_state)
+        return [{'deck_id': row[0], 'ship': row[1], 'name': row[2],
+                 'layout': {'length': row[3], 'width': row[4], 'lanes': row[5], 'obstacles': json.loads(row[6]),
+                            'clearances': normalize_clearances(json.loads(row[7]))},
+                 'vehicles': []}
+                for row in rows]
+
+    def load_page(self, deck_id, after=0, limit=PAGE_SIZE):
+        """
+        Satu halaman kendaraan dek (keyset pagination pada id baris).
+        Mengembalikan (kendaraan, kursor_berikutnya); kursor None = halaman terakhir.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_PLACEMENT_COLUMNS)} FROM placements "
+                "WHERE deck_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (deck_id, after, limit)).fetchall()
+        cursor = rows[-1][0] if len(rows) == limit else None
+        return [_vehicle_from_row(row[1:]) for row in rows], cursor
+
+    def iter_vehicles(self, deck_id, page_size=PAGE_SIZE):
+        """Kendaraan dek per halaman, tanpa membaca seluruh layout sekaligus"""
+        after = 0
+        while after is not None:
+            page, after = self.load_page(deck_id, after, page_size)
+            if page:
+                yield page
+
+    def load_voyage(self, voyage_id):
+        """Pelayaran lengkap dalam format session_state (decks + pengaturan)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT s.name, v.name, v.departure, v.settings FROM voyages v "
+                "JOIN ships s ON s.id = v.ship_id WHERE v.id = ?", (voyage_id,)).fetchone()
+        if row is None:
+            raise KeyError(voyage_id)
+
+        decks = self.load_decks(voyage_id)
+        for deck in decks:
+            for page in self.iter_vehicles(deck.pop('deck_id')):
+                deck['vehicles'].extend(page)
+        return {'id': voyage_id, 'ship': row[0], 'name': row[1], 'departure': row[2],
+                'settings': json.loads(row[3]), 'decks': decks}
+
+    def vehicles_in_region(self, voyage_id, x_min, x_max, y_min, y_max, deck_position=None):
+        """
+        Kendaraan yang beririsan dengan kotak [x_min, x_max] × [y_min, y_max]
+        (meter), lewat R*Tree. Pelayaran juga menjadi dimensi R*Tree sehingga
+        pencarian hanya menyentuh kotak pelayaran ini. Koordinat R*Tree
+        berpresisi float32 dan dibulatkan keluar, jadi hasilnya disaring ulang
+        dengan koordinat asli dan id pelayaran.
+        """
+        query = (
+            f"SELECT d.position, {', '.join('p.' + column for column in _PLACEMENT_COLUMNS)} "
+            "FROM placements_rtree r "
+            "JOIN placements p ON p.id = r.id "
+            "JOIN decks d ON d.id = p.deck_id "
+            "WHERE r.max_voyage >= ? AND r.min_voyage <= ? "
+            "AND r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ? "
+            "AND d.voyage_id = ? "
+            "AND p.x + p.width >= ? AND p.x <= ? AND p.y + p.length >= ? AND p.y <= ?"
+        )
+        params = [voyage_id, voyage_id, x_min, x_max, y_min, y_max, voyage_id, x_min, x_max, y_min, y_max]
+        if deck_position is not None:
+            query += " AND d.position = ?"
+            params.append(deck_position)
+
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY p.id", params).fetchall()
+        found = []
+        for row in rows:
+            vehicle = _vehicle_from_row(row[1:])
+            vehicle['deck'] = row[0]
+            found.append(vehicle)
+        return found
+
+    def vehicles_in_frames(self, voyage_id, y_from, y_to, deck_position=None):
+        """Kendaraan di rentang frame memanjang (meter dari haluan), seluruh lebar dek"""
+        return self.vehicles_in_region(voyage_id, float('-inf'), float('inf'), y_from, y_to, deck_position)